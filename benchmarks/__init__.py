@@ -0,0 +1,42 @@
+"""
+Performance benchmarks
+
+Each module is runnable with ``python -m benchmarks.<name>`` from the
+project root. Benchmarks run against a throwaway test database created
+from the configured settings (SQLite in memory or PostgreSQL with
+USE_POSTGRES=True), so they never touch development data.
+"""
+import os
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mini_erp.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database(verbosity=0):
+    """Create the test databases for the duration of the block"""
+    setup_django()
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=verbosity)
+
+
+def print_table(headers, rows):
+    """Print rows as a fixed-width table"""
+    widths = [
+        max(len(str(value)) for value in column)
+        for column in zip(headers, *rows)
+    ]
+    line = '  '.join(f'{{:>{width}}}' for width in widths)
+    print(line.format(*headers))
+    for row in rows:
+        print(line.format(*row))
@@ -0,0 +1,103 @@
+"""
+Latency of the payables aging of open purchase invoices: balances
+computed in Python over every invoice (what clients had to do while
+``financial_report`` failed on ``Sum('balance')``) versus the grouped
+conditional aggregates of ``aging_report``.
+
+    python -m benchmarks.aging_report [--rows 200000] [--suppliers 500]
+"""
+import argparse
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from benchmarks import print_table, test_database
+
+
+def create_invoices(rows, suppliers):
+    from datetime import timedelta
+    from django.utils import timezone
+    from purchases.models import PurchaseInvoice, Supplier
+
+    partners = Supplier.objects.bulk_create(
+        [Supplier(name=f'Supplier {n}', email=f'supplier{n}@example.com') for n in range(suppliers)]
+    )
+    today = timezone.localdate()
+    rng = random.Random(42)
+    statuses = ['pending', 'partial', 'paid']
+    PurchaseInvoice.objects.bulk_create(
+        [
+            PurchaseInvoice(
+                invoice_number=f'BENCH-{n}', supplier=rng.choice(partners),
+                invoice_date=today - timedelta(days=rng.randint(30, 200)),
+                due_date=today - timedelta(days=rng.randint(-30, 150)),
+                amount=Decimal(rng.randint(100, 100000)) / 100,
+                paid_amount=Decimal(rng.randint(0, 50)), status=rng.choice(statuses),
+            )
+            for n in range(rows)
+        ],
+        batch_size=5000,
+    )
+
+
+def python_aging():
+    from django.utils import timezone
+    from core.aggregation import AGING_BUCKETS
+    from purchases.models import PurchaseInvoice
+
+    today = timezone.localdate()
+    totals = {bucket: 0 for bucket, _, _ in AGING_BUCKETS}
+    for invoice in PurchaseInvoice.objects.filter(status__in=['pending', 'partial']):
+        days = (today - invoice.due_date).days
+        for bucket, first, last in AGING_BUCKETS:
+            if (first is None or days >= first) and (last is None or days <= last):
+                totals[bucket] += invoice.balance
+                break
+    return totals
+
+
+def database_aging():
+    from reports import payloads
+    return payloads.aging_report()['payables']
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run(rows, suppliers, repeat):
+    create_invoices(rows, suppliers)
+    python_totals = python_aging()
+    # SQLite sums decimals as floats: compare cents
+    database_totals = {
+        row['bucket']: row['balance'].quantize(Decimal('0.01')) for row in database_aging()['aging']
+    }
+    assert python_totals == database_totals, (python_totals, database_totals)
+
+    print_table(
+        ['mode', 'ms'],
+        [
+            ('python (every invoice)', f'{measure(python_aging, repeat):.1f}'),
+            ('database (aging_report)', f'{measure(database_aging, repeat):.1f}'),
+        ],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--suppliers', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    with test_database():
+        run(args.rows, args.suppliers, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
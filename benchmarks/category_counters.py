@@ -0,0 +1,100 @@
+"""
+Latency of the per-category product totals: aggregating the products
+table on every request (what ``categories_summary`` and the category list
+did) versus reading the counters maintained on ``categories``.
+
+    python -m benchmarks.category_counters [--products 200000] [--categories 50]
+"""
+import argparse
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from benchmarks import print_table, test_database
+
+
+def create_products(products, categories):
+    from inventory.counters import rebuild
+    from inventory.models import Category, Product
+    from users.models import User
+
+    user = User.objects.create_user(username='bench', password='bench', email='bench@example.com')
+    groups = Category.objects.bulk_create([Category(name=f'Category {n}') for n in range(categories)])
+    rng = random.Random(42)
+    Product.objects.bulk_create(
+        [
+            Product(
+                name=f'Product {n}', sku=f'SKU-{n:07d}', category=rng.choice(groups),
+                price=Decimal('10.00'), cost_price=Decimal(rng.randint(100, 10000)) / 100,
+                stock_quantity=rng.randint(0, 500), is_active=rng.random() < 0.9, created_by=user,
+            )
+            for n in range(products)
+        ],
+        batch_size=5000,
+    )
+    rebuild()
+
+
+def aggregated():
+    from django.db.models import Count, F, Q, Sum
+    from inventory.models import Category
+
+    return {
+        category.pk: (category.products_count, category.active, category.stock, category.value)
+        for category in Category.objects.annotate(
+            products_count=Count('products'),
+            active=Count('products', filter=Q(products__is_active=True)),
+            stock=Sum('products__stock_quantity'),
+            value=Sum(F('products__stock_quantity') * F('products__cost_price')),
+        )
+    }
+
+
+def counters():
+    from inventory.models import Category
+
+    return {
+        category.pk: (category.product_count, category.active_product_count,
+                      category.total_stock, category.total_stock_value)
+        for category in Category.objects.all()
+    }
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run(products, categories, repeat):
+    create_products(products, categories)
+    # SQLite sums decimals as floats: compare cents
+    expected = {pk: (*values[:3], Decimal(str(values[3])).quantize(Decimal('0.01')))
+                for pk, values in aggregated().items()}
+    assert expected == counters()
+
+    print_table(
+        ['mode', 'ms'],
+        [
+            ('aggregate products', f'{measure(aggregated, repeat):.1f}'),
+            ('category counters', f'{measure(counters, repeat):.1f}'),
+        ],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=200000)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    with test_database():
+        run(args.products, args.categories, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
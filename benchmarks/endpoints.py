@@ -0,0 +1,191 @@
+"""
+Latency and query count of every read endpoint over a large dataset.
+
+By default a throwaway test database is filled with ``generate_dataset``
+(scaled with ``--scale``); ``--existing`` measures the configured database
+instead, e.g. after ``manage.py generate_dataset`` at full size. Only GET
+requests are issued.
+
+    python -m benchmarks.endpoints [--scale 0.01] [--seed 42] [--repeat 10]
+        [--existing] [--output results.json] [--compare baseline.json]
+
+``--output`` stores the results as JSON so runs can be committed and
+compared; ``--compare`` prints the p50 change against a previous run.
+"""
+import argparse
+import io
+import json
+import logging
+import statistics
+import subprocess
+import time
+from contextlib import nullcontext
+
+from benchmarks import print_table, setup_django, test_database
+
+
+def first_pk(model, **ordering):
+    from django.db.models import Count
+    queryset = model.objects.all()
+    if ordering:
+        # The busiest row, the worst case for nested endpoints
+        queryset = queryset.annotate(weight=Count(ordering['count'])).order_by('-weight', 'pk')
+    else:
+        queryset = queryset.order_by('pk')
+    return queryset.values_list('pk', flat=True).first()
+
+
+def endpoints():
+    """``(name, url, params)`` of the read endpoints"""
+    from django.urls import reverse
+    from inventory.models import Category, Product, StockMovement
+    from purchases.models import PurchaseInvoice, Supplier
+    from sales.models import Customer, Invoice, SaleOrder, SaleOrderItem
+    from users.models import User
+
+    details = {
+        'user': first_pk(User),
+        'category': first_pk(Category, count='products'),
+        'product': first_pk(Product),
+        'stockmovement': first_pk(StockMovement),
+        'customer': first_pk(Customer, count='orders'),
+        'saleorder': first_pk(SaleOrder),
+        'saleorderitem': first_pk(SaleOrderItem),
+        'invoice': first_pk(Invoice),
+        'supplier': first_pk(Supplier),
+        'purchaseinvoice': first_pk(PurchaseInvoice),
+    }
+    search = {'search': Product.objects.order_by('pk').values_list('name', flat=True).first() or 'a'}
+
+    urls = []
+    for basename, pk in details.items():
+        urls.append((f'{basename}-list', reverse(f'{basename}-list'), {}))
+        if pk is not None:
+            urls.append((f'{basename}-detail', reverse(f'{basename}-detail', args=[pk]), {}))
+    urls += [
+        ('product-list search', reverse('product-list'), search),
+        ('stockmovement-list keyset', reverse('stockmovement-list'), {'pagination': 'keyset'}),
+        ('saleorder-list keyset', reverse('saleorder-list'), {'pagination': 'keyset'}),
+        ('saleorder-list approximate', reverse('saleorder-list'), {'count': 'approximate'}),
+        ('product-low-stock', reverse('product-low-stock'), {}),
+        ('product-stock-summary', reverse('product-stock-summary'), {}),
+        ('stockmovement-recent-movements', reverse('stockmovement-recent-movements'), {}),
+        ('saleorder-sales-summary', reverse('saleorder-sales-summary'), {}),
+        ('invoice-overdue', reverse('invoice-overdue'), {}),
+        ('purchaseinvoice-purchase-summary', reverse('purchaseinvoice-purchase-summary'), {}),
+        ('user-profile', reverse('user-profile'), {}),
+    ]
+    if details['category'] is not None:
+        urls.append(('category-products', reverse('category-products', args=[details['category']]), {}))
+    if details['customer'] is not None:
+        urls.append(('customer-orders', reverse('customer-orders', args=[details['customer']]), {}))
+    for report in ('dashboard_summary', 'sales_report', 'inventory_report', 'customer_report',
+                   'supplier_report', 'financial_report'):
+        name = f"report-{report.replace('_', '-')}"
+        urls.append((name, reverse(name), {}))
+    return urls
+
+
+def measure(client, url, params, repeat):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(url, params)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+    return {
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(p95, 2),
+        'queries': len(queries),
+        'status': response.status_code,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options):
+    from django.core.management import call_command
+    from django.db import connection
+    from rest_framework.test import APIClient
+    from users.models import User
+
+    if not options.existing:
+        call_command('generate_dataset', scale=options.scale, seed=options.seed, stdout=io.StringIO())
+    user = User.objects.filter(is_superuser=True).order_by('pk').first() or User.objects.order_by('pk').first()
+    if user is None:
+        raise SystemExit('The database has no users, run generate_dataset first')
+
+    # Failing endpoints are reported through their status, not tracebacks
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    client = APIClient(raise_request_exception=False)
+    client.force_authenticate(user)
+    results = {}
+    for name, url, params in endpoints():
+        client.get(url, params)  # warm up
+        results[name] = measure(client, url, params, options.repeat)
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'vendor': connection.vendor,
+            'dataset': 'existing' if options.existing else {'scale': options.scale, 'seed': options.seed},
+            'repeat': options.repeat,
+        },
+        'results': results,
+    }
+
+
+def report(data, baseline=None):
+    headers = ['endpoint', 'status', 'queries', 'p50 ms', 'p95 ms']
+    if baseline:
+        headers.append('p50 change')
+    rows = []
+    for name, result in sorted(data['results'].items()):
+        row = [name, result['status'], result['queries'], f"{result['p50_ms']:.2f}", f"{result['p95_ms']:.2f}"]
+        if baseline:
+            old = baseline['results'].get(name)
+            row.append(f"{(result['p50_ms'] / old['p50_ms'] - 1) * 100:+.0f}%" if old and old['p50_ms'] else '-')
+        rows.append(row)
+    print_table(headers, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scale', type=float, default=0.01, help='generate_dataset scale')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--existing', action='store_true', help='measure the configured database')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='previous JSON results to compare with')
+    options = parser.parse_args()
+
+    if options.existing:
+        setup_django()
+    with nullcontext() if options.existing else test_database():
+        data = run(options)
+
+    baseline = None
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+    report(data, baseline)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
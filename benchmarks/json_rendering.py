@@ -0,0 +1,97 @@
+"""
+Render/parse time and allocations of the stock DRF JSON renderer and parser
+versus the orjson based ones (core/renderers.py).
+
+Payloads are serializer output for products and sale orders (with items)
+and the inventory report, built from a generated dataset.
+
+    python -m benchmarks.json_rendering [--rows 1000] [--repeat 20]
+"""
+import argparse
+import io
+import statistics
+import time
+import tracemalloc
+
+from benchmarks import print_table, test_database
+
+
+def payloads(rows):
+    from django.core.management import call_command
+    from rest_framework.test import APIClient
+    from core.query_plans import apply_query_plan
+    from inventory.models import Product
+    from inventory.serializers import ProductSerializer
+    from sales.models import SaleOrder
+    from sales.serializers import SaleOrderSerializer
+    from users.models import User
+
+    call_command(
+        'generate_dataset', products=rows, customers=max(rows // 10, 1), orders=rows,
+        purchase_invoices=10, movements=rows, stdout=io.StringIO()
+    )
+    client = APIClient()
+    client.force_authenticate(User.objects.order_by('pk').first())
+    products = apply_query_plan(Product.objects.order_by('pk')[:rows], ProductSerializer)
+    orders = apply_query_plan(SaleOrder.objects.order_by('pk')[:rows], SaleOrderSerializer)
+    return [
+        ('ProductSerializer', ProductSerializer(products, many=True).data),
+        ('SaleOrderSerializer', SaleOrderSerializer(orders, many=True).data),
+        ('inventory_report', client.get('/api/reports/reports/inventory_report/').data),
+    ]
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def peak_kib(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run(rows, repeat):
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from core.renderers import FastJSONParser, FastJSONRenderer, orjson
+
+    if orjson is None:
+        print('orjson is not installed: FastJSONRenderer falls back to JSONRenderer')
+
+    implementations = [
+        ('DRF json', JSONRenderer(), JSONParser()),
+        ('orjson', FastJSONRenderer(), FastJSONParser()),
+    ]
+    results = []
+    for name, data in payloads(rows):
+        for label, renderer, parser in implementations:
+            rendered = renderer.render(data)
+            results.append((
+                name, label, len(rendered) // 1024,
+                f'{timed(lambda r=renderer, d=data: r.render(d), repeat):.2f}',
+                peak_kib(lambda r=renderer, d=data: r.render(d)),
+                f'{timed(lambda p=parser, b=rendered: p.parse(io.BytesIO(b)), repeat):.2f}',
+            ))
+    print_table(['payload', 'implementation', 'KiB', 'render ms', 'render peak KiB', 'parse ms'], results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000, help='products and sale orders per payload')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    with test_database():
+        run(args.rows, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
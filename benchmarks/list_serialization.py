@@ -0,0 +1,78 @@
+"""
+Serialization throughput (rows/sec) of the full list representation versus
+the compact ones (?view=compact and a ?fields= sparse fieldset).
+
+Full rows go through the serializer with its query plan; compact rows are
+read with values() (core/compact.py). Times include the queries and the
+JSON rendering.
+
+    python -m benchmarks.list_serialization [--rows 10000] [--repeat 3]
+"""
+import argparse
+import io
+import statistics
+import time
+
+from benchmarks import print_table, test_database
+
+
+def cases():
+    from core.compact import compact_values
+    from core.query_plans import apply_query_plan
+    from inventory.models import Product
+    from inventory.serializers import ProductSerializer
+    from inventory.views import ProductViewSet
+    from sales.models import SaleOrder
+    from sales.serializers import SaleOrderSerializer
+    from sales.views import SaleOrderViewSet
+
+    for model, serializer_class, viewset, sparse in [
+        (Product, ProductSerializer, ProductViewSet, ['id', 'name', 'price']),
+        (SaleOrder, SaleOrderSerializer, SaleOrderViewSet, ['id', 'order_number', 'total_amount']),
+    ]:
+        queryset = model.objects.order_by('-created_at')
+        fields = viewset.compact_fields
+        yield model.__name__, 'full', lambda q=queryset, s=serializer_class: s(
+            apply_query_plan(q, s), many=True
+        ).data
+        yield model.__name__, 'view=compact', lambda q=queryset, f=fields: list(
+            compact_values(q, f, list(f))
+        )
+        yield model.__name__, f"fields={','.join(sparse)}", lambda q=queryset, f=fields, c=sparse: list(
+            compact_values(q, f, c)
+        )
+
+
+def run(rows, repeat):
+    from django.core.management import call_command
+    from core.renderers import FastJSONRenderer
+
+    call_command(
+        'generate_dataset', products=rows, customers=max(rows // 10, 1), orders=rows,
+        purchase_invoices=10, movements=10, max_items=5, stdout=io.StringIO()
+    )
+    renderer = FastJSONRenderer()
+    results = []
+    for model, mode, build in cases():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = build()
+            renderer.render(data)
+            timings.append(time.perf_counter() - started)
+        elapsed = statistics.median(timings)
+        results.append((model, mode, len(data), f'{elapsed * 1000:.0f}', f'{len(data) / elapsed:,.0f}'))
+    print_table(['model', 'representation', 'rows', 'ms', 'rows/sec'], results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='products and sale orders')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    with test_database():
+        run(args.rows, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Requests/sec of the API under ``manage.py runserver`` versus gunicorn.
+
+Each server is started on a local port against the configured database
+(load data first, e.g. ``manage.py generate_dataset --scale 0.01``), then
+``--concurrency`` clients with keep-alive connections send a mix of read
+requests for ``--duration`` seconds, authenticated as the first active
+user. Gunicorn runs with gunicorn.conf.py, so its worker count follows
+the CPUs unless ``--workers`` is given.
+
+    python -m benchmarks.load_test [--servers runserver gunicorn]
+        [--concurrency 16] [--duration 20] [--workers N]
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+from benchmarks import print_table, setup_django
+
+HOST = '127.0.0.1'
+
+
+def requests_mix():
+    """``(path, headers)`` of the requests and the auth headers"""
+    from django.urls import reverse
+    from rest_framework_simplejwt.tokens import AccessToken
+    from users.models import User
+
+    user = User.objects.filter(is_active=True).order_by('pk').first()
+    if user is None:
+        sys.exit('No users in the configured database: load data first (manage.py generate_dataset)')
+    headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+    paths = [
+        reverse('product-list'),
+        f"{reverse('product-list')}?{urlencode({'view': 'compact'})}",
+        reverse('category-list'),
+        reverse('customer-list'),
+        f"{reverse('saleorder-list')}?{urlencode({'pagination': 'keyset'})}",
+        reverse('stockmovement-list'),
+        reverse('product-stock-summary'),
+        reverse('report-dashboard-summary'),
+    ]
+    return paths, headers
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, port, workers):
+    if server == 'runserver':
+        return [sys.executable, 'manage.py', 'runserver', f'{HOST}:{port}', '--noreload']
+    command = [
+        sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+        '--bind', f'{HOST}:{port}', '--access-logfile', '/dev/null',
+    ]
+    if workers:
+        command += ['--workers', str(workers)]
+    return command + ['mini_erp.wsgi:application']
+
+
+def wait_until_ready(port, path, headers, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(HOST, port, timeout=5)
+            connection.request('GET', path, headers=headers)
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server on port {port} did not answer {path}')
+
+
+def client(port, paths, headers, offset, deadline, results):
+    connection = http.client.HTTPConnection(HOST, port, timeout=30)
+    latencies, errors = [], 0
+    index = offset
+    while time.monotonic() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection(HOST, port, timeout=30)
+        latencies.append((time.perf_counter() - started) * 1000)
+    connection.close()
+    results.append((latencies, errors))
+
+
+def load(port, paths, headers, concurrency, duration):
+    deadline = time.monotonic() + duration
+    results = []
+    threads = [
+        threading.Thread(target=client, args=(port, paths, headers, n, deadline, results))
+        for n in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies = sorted(latency for thread_latencies, _ in results for latency in thread_latencies)
+    errors = sum(thread_errors for _, thread_errors in results)
+    return latencies, errors
+
+
+def run(servers, concurrency, duration, workers):
+    paths, headers = requests_mix()
+    rows = []
+    for server in servers:
+        port = free_port()
+        process = subprocess.Popen(
+            server_command(server, port, workers),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=os.environ.copy(),
+        )
+        try:
+            wait_until_ready(port, paths[0], headers)
+            load(port, paths, headers, concurrency, min(duration, 3))  # warm up every worker
+            latencies, errors = load(port, paths, headers, concurrency, duration)
+        finally:
+            process.terminate()
+            process.wait(timeout=60)
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+        rows.append((
+            server, len(latencies), f'{len(latencies) / duration:.1f}',
+            f'{statistics.median(latencies) if latencies else 0:.1f}', f'{p95:.1f}', errors,
+        ))
+    print_table(['server', 'requests', 'req/s', 'p50 ms', 'p95 ms', 'errors'], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--servers', nargs='+', choices=['runserver', 'gunicorn'], default=['runserver', 'gunicorn'])
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=int, default=20, help='seconds of load per server')
+    parser.add_argument('--workers', type=int, help='gunicorn workers (default: gunicorn.conf.py)')
+    args = parser.parse_args()
+    setup_django()
+    run(args.servers, args.concurrency, args.duration, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Latency of a deep page of stock movements with page number pagination
+(COUNT(*) + OFFSET) versus keyset pagination on (created_at, id).
+
+    python -m benchmarks.pagination [--rows 50000] [--page 1000]
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import print_table, test_database
+
+PAGE_SIZE = 20
+
+
+def create_movements(rows):
+    from datetime import timedelta
+    from decimal import Decimal
+    from django.utils import timezone
+    from inventory.models import Product, StockMovement
+    from users.models import User
+
+    user = User.objects.create_user(username='bench', email='bench@example.com', password='bench')
+    product = Product.objects.create(name='Bench', sku='BENCH-1', price=Decimal('1.00'), created_by=user)
+    created_at = StockMovement._meta.get_field('created_at')
+    start = timezone.now() - timedelta(seconds=rows)
+    created_at.auto_now_add = False  # keep the generated timestamps
+    try:
+        StockMovement.objects.bulk_create(
+            [
+                StockMovement(
+                    product=product, movement_type='in', quantity=1, previous_quantity=i,
+                    new_quantity=i + 1, created_by=user, created_at=start + timedelta(seconds=i)
+                )
+                for i in range(rows)
+            ],
+            batch_size=5000,
+        )
+    finally:
+        created_at.auto_now_add = True
+    return user
+
+
+def measure(client, url, params, repeat):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(url, params)
+            timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.data
+        assert len(response.data['results']) == PAGE_SIZE
+    return len(queries), statistics.median(timings)
+
+
+def run(rows, page, repeat):
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from core.pagination import KeysetPagination
+    from inventory.models import StockMovement
+
+    user = create_movements(rows)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('stockmovement-list')
+
+    # Cursor pointing at the last row of the previous page, as a client
+    # following the "next" links would have
+    last = StockMovement.objects.order_by('-created_at', '-id')[(page - 1) * PAGE_SIZE - 1]
+    cursor = KeysetPagination(PAGE_SIZE).encode_cursor(last)
+
+    cases = [
+        ('page number (COUNT + OFFSET)', {'page': page}),
+        ('page number, approximate count', {'page': page, 'count': 'approximate'}),
+        ('keyset', {'cursor': cursor}),
+    ]
+    rows_out = []
+    for name, params in cases:
+        queries, ms = measure(client, url, params, repeat)
+        rows_out.append((name, queries, f'{ms:.1f}'))
+    print_table(['mode', 'queries', f'page {page} ms'], rows_out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--page', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    if args.rows < args.page * PAGE_SIZE:
+        parser.error('--rows must cover the requested page')
+    with test_database():
+        run(args.rows, args.page, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Latency of the customer report queries: joining sale orders to rank
+customers and count the active ones (what ``customer_report`` did) versus
+reading the stats maintained on ``customers``.
+
+    python -m benchmarks.partner_stats [--customers 20000] [--orders 200000]
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from benchmarks import print_table, test_database
+
+
+def create_orders(customers, orders):
+    from django.utils import timezone
+    from sales.models import Customer, SaleOrder
+    from sales.stats import rebuild
+    from users.models import User
+
+    user = User.objects.create_user(username='bench', password='bench', email='bench@example.com')
+    people = Customer.objects.bulk_create([Customer(name=f'Customer {n}') for n in range(customers)])
+    rng = random.Random(42)
+    today = timezone.now().date()
+    SaleOrder.objects.bulk_create(
+        [
+            SaleOrder(
+                order_number=f'BENCH-{n:08d}', customer=rng.choice(people), order_date=today,
+                total_amount=Decimal(rng.randint(100, 100000)) / 100, created_by=user,
+            )
+            for n in range(orders)
+        ],
+        batch_size=5000,
+    )
+    # A tenth of the orders are recent, the rest a year old
+    SaleOrder.objects.update(created_at=timezone.now() - timedelta(days=365))
+    recent = list(SaleOrder.objects.values_list('pk', flat=True)[: orders // 10])
+    SaleOrder.objects.filter(pk__in=recent).update(created_at=timezone.now())
+    rebuild()
+
+
+def since():
+    from django.utils import timezone
+    return timezone.now() - timedelta(days=30)
+
+
+def aggregated():
+    from django.db.models import Count, Sum
+    from sales.models import Customer
+
+    top = Customer.objects.filter(is_active=True).annotate(
+        total=Sum('orders__total_amount'), orders_count=Count('orders'),
+    ).filter(total__isnull=False).order_by('-total')[:20]
+    active = Customer.objects.filter(orders__created_at__gte=since()).distinct().count()
+    return [(customer.pk, customer.orders_count) for customer in top], active
+
+
+def maintained():
+    from sales.models import Customer
+
+    top = Customer.objects.filter(is_active=True, order_count__gt=0).order_by('-total_sales')[:20]
+    active = Customer.objects.filter(last_order_at__gte=since()).count()
+    return [(customer.pk, customer.order_count) for customer in top], active
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run(customers, orders, repeat):
+    create_orders(customers, orders)
+    assert aggregated() == maintained()
+
+    print_table(
+        ['mode', 'ms'],
+        [
+            ('join sale orders', f'{measure(aggregated, repeat):.1f}'),
+            ('customer stats', f'{measure(maintained, repeat):.1f}'),
+        ],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--customers', type=int, default=20000)
+    parser.add_argument('--orders', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    with test_database():
+        run(args.customers, args.orders, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
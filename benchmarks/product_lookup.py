@@ -0,0 +1,89 @@
+"""
+SKU lookups per second through the API: the product list filtered with
+``?search=<sku>`` (what the POS terminals did per scan) versus
+``GET /api/inventory/products/lookup/?sku=`` with a cold and a warm
+cache, and ``POST .../lookup/`` batches.
+
+Requests go through the full Django/DRF stack in process (test client,
+authentication forced), so the numbers are per worker thread.
+
+    python -m benchmarks.product_lookup [--products 20000] [--scans 2000]
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from benchmarks import print_table, test_database
+
+
+def create_products(count):
+    from inventory.models import Category, Product
+    from users.models import User
+
+    user = User.objects.create_user(username='bench', password='bench', email='bench@example.com')
+    category = Category.objects.create(name='Bench')
+    Product.objects.bulk_create(
+        [
+            Product(
+                name=f'Product {n}', sku=f'SKU-{n:07d}', category=category,
+                price=Decimal('10.00'), stock_quantity=100, created_by=user,
+            )
+            for n in range(count)
+        ],
+        batch_size=5000,
+    )
+    return user
+
+
+def rate(label, requests, send, skus_per_request=1):
+    started = time.perf_counter()
+    for request in requests:
+        response = send(request)
+        assert response.status_code == 200, (label, response.status_code)
+    elapsed = time.perf_counter() - started
+    skus = len(requests) * skus_per_request
+    return label, f'{elapsed * 1000 / skus:.3f}', f'{skus / elapsed:,.0f}'
+
+
+def run(products, scans, batch):
+    from rest_framework.test import APIClient
+    from inventory.lookup import cache
+
+    user = create_products(products)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    rng = random.Random(42)
+    # Repeated scans of a popular subset, as at a checkout
+    popular = [f'SKU-{rng.randrange(products):07d}' for _ in range(max(scans // 10, 1))]
+    skus = [rng.choice(popular) for _ in range(scans)]
+    batches = [skus[start:start + batch] for start in range(0, len(skus) - batch + 1, batch)]
+
+    cache.clear()
+    rows = [
+        rate('list ?search=', skus[:max(scans // 10, 1)],
+             lambda sku: client.get('/api/inventory/products/', {'search': sku})),
+        rate('lookup (cold cache)', popular, lambda sku: client.get('/api/inventory/products/lookup/', {'sku': sku})),
+        rate('lookup (warm cache)', skus, lambda sku: client.get('/api/inventory/products/lookup/', {'sku': sku})),
+        rate(
+            f'batch of {batch} (warm)', batches,
+            lambda skus: client.post('/api/inventory/products/lookup/', {'skus': skus}, format='json'),
+            skus_per_request=batch,
+        ),
+    ]
+    print_table(['mode', 'ms/sku', 'skus/sec'], rows)
+    print(cache.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--scans', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=50)
+    args = parser.parse_args()
+    with test_database():
+        run(args.products, args.scans, args.batch)
+
+
+if __name__ == '__main__':
+    main()
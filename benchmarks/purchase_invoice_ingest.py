@@ -0,0 +1,92 @@
+"""
+Query count and latency of receiving purchase invoices of increasing size,
+for the batched ingestion path versus the previous one-item-at-a-time path.
+
+    python -m benchmarks.purchase_invoice_ingest [--sizes 1 10 50 200 500]
+"""
+import argparse
+import time
+
+from benchmarks import print_table, test_database
+
+
+def per_item_create(supplier, products, user):
+    """The previous creation path: one PurchaseInvoiceItem.save per line"""
+    from datetime import timedelta
+    from django.utils import timezone
+    from purchases.models import PurchaseInvoice, PurchaseInvoiceItem
+
+    today = timezone.now().date()
+    invoice = PurchaseInvoice.objects.create(
+        supplier=supplier, invoice_date=today, due_date=today + timedelta(days=30)
+    )
+    for product in products:
+        PurchaseInvoiceItem(
+            invoice=invoice, product=product, quantity=1, unit_price=product.cost_price
+        ).save(received_by=user)
+
+
+def run(sizes):
+    from datetime import timedelta
+    from decimal import Decimal
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+    from inventory.models import Product
+    from purchases.models import Supplier
+    from users.models import User
+
+    user = User.objects.create_user(username='bench', email='bench@example.com', password='bench')
+    supplier = Supplier.objects.create(
+        name='Benchmark Supplier', email='bench@supplier.com', phone='0', address='-'
+    )
+    products = Product.objects.bulk_create([
+        Product(
+            name=f'Bench {i}', sku=f'BENCH-{i:05d}', price=Decimal('9.99'),
+            cost_price=Decimal('5.00'), created_by=user
+        )
+        for i in range(max(sizes))
+    ])
+    client = APIClient()
+    client.force_authenticate(user=user)
+    today = timezone.now().date()
+
+    rows = []
+    for size in sizes:
+        payload = {
+            'supplier_id': supplier.id,
+            'invoice_date': today.isoformat(),
+            'due_date': (today + timedelta(days=30)).isoformat(),
+            'items': [
+                {'product': p.id, 'quantity': 1, 'unit_price': str(p.cost_price)}
+                for p in products[:size]
+            ],
+        }
+        with CaptureQueriesContext(connection) as bulk_queries:
+            started = time.perf_counter()
+            response = client.post(reverse('purchaseinvoice-list'), payload, format='json')
+            bulk_ms = (time.perf_counter() - started) * 1000
+        assert response.status_code == 201, response.data
+
+        with CaptureQueriesContext(connection) as old_queries:
+            started = time.perf_counter()
+            per_item_create(supplier, products[:size], user)
+            old_ms = (time.perf_counter() - started) * 1000
+
+        rows.append((size, len(old_queries), f'{old_ms:.1f}', len(bulk_queries), f'{bulk_ms:.1f}'))
+
+    print_table(['lines', 'per-item queries', 'per-item ms', 'batched queries', 'batched ms'], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50, 200, 500])
+    args = parser.parse_args()
+    with test_database():
+        run(args.sizes)
+
+
+if __name__ == '__main__':
+    main()
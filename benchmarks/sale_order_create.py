@@ -0,0 +1,80 @@
+"""
+Query count and latency of posting sale orders of increasing size, for the
+bulk creation path versus the previous one-item-at-a-time path.
+
+    python -m benchmarks.sale_order_create [--sizes 1 10 50 200 500]
+"""
+import argparse
+import time
+
+from benchmarks import print_table, test_database
+
+
+def per_item_create(customer, user, products):
+    """The previous creation path: one SaleOrderItem.save per line"""
+    from django.utils import timezone
+    from sales.models import SaleOrder, SaleOrderItem
+
+    order = SaleOrder.objects.create(
+        customer=customer, order_date=timezone.now().date(), created_by=user
+    )
+    for product in products:
+        SaleOrderItem.objects.create(order=order, product=product, quantity=1, unit_price=product.price)
+
+
+def run(sizes):
+    from decimal import Decimal
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+    from inventory.models import Product
+    from sales.models import Customer
+    from users.models import User
+
+    user = User.objects.create_user(username='bench', email='bench@example.com', password='bench')
+    customer = Customer.objects.create(name='Benchmark Customer')
+    products = Product.objects.bulk_create([
+        Product(name=f'Bench {i}', sku=f'BENCH-{i:05d}', price=Decimal('9.99'), created_by=user)
+        for i in range(max(sizes))
+    ])
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    rows = []
+    for size in sizes:
+        payload = {
+            'customer_id': customer.id,
+            'order_date': timezone.now().date().isoformat(),
+            'items': [
+                {'product': p.id, 'quantity': 1, 'unit_price': str(p.price)}
+                for p in products[:size]
+            ],
+        }
+        with CaptureQueriesContext(connection) as bulk_queries:
+            started = time.perf_counter()
+            response = client.post(reverse('saleorder-list'), payload, format='json')
+            bulk_ms = (time.perf_counter() - started) * 1000
+        assert response.status_code == 201, response.data
+
+        with CaptureQueriesContext(connection) as old_queries:
+            started = time.perf_counter()
+            per_item_create(customer, user, products[:size])
+            old_ms = (time.perf_counter() - started) * 1000
+
+        rows.append((size, len(old_queries), f'{old_ms:.1f}', len(bulk_queries), f'{bulk_ms:.1f}'))
+
+    print_table(['lines', 'per-item queries', 'per-item ms', 'bulk queries', 'bulk ms'], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50, 200, 500])
+    args = parser.parse_args()
+    with test_database():
+        run(args.sizes)
+
+
+if __name__ == '__main__':
+    main()
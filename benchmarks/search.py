@@ -0,0 +1,121 @@
+"""
+Latency of a global search: ``icontains`` filters on every searchable
+table (what the list endpoints' ``?search=`` does) versus the search
+index of ``GET /api/search/``.
+
+    python -m benchmarks.search [--products 200000] [--partners 50000]
+"""
+import argparse
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from benchmarks import print_table, test_database
+
+WORDS = [
+    'laptop', 'monitor', 'cable', 'teclado', 'mouse', 'impresora', 'router', 'disco',
+    'memoria', 'silla', 'escritorio', 'lampara', 'camara', 'parlante', 'bateria', 'cargador',
+]
+QUERIES = ['lap', 'monitor cur', 'SKU-0012', 'cafe', 'distribuidora norte', 'zzz']
+
+
+def create_rows(products, partners):
+    from inventory.models import Product
+    from purchases.models import Supplier
+    from sales.models import Customer
+    from users.models import User
+
+    rng = random.Random(42)
+    user = User.objects.create_user(username='bench', password='bench')
+    Product.objects.bulk_create(
+        [
+            Product(
+                name=' '.join(rng.sample(WORDS, 3)).title(), sku=f'SKU-{n:07d}',
+                description=' '.join(rng.sample(WORDS, 5)), price=Decimal('10.00'), created_by=user,
+            )
+            for n in range(products)
+        ],
+        batch_size=5000,
+    )
+    Customer.objects.bulk_create(
+        [Customer(name=f'Cliente {rng.choice(WORDS)} {n}', email=f'cliente{n}@example.com') for n in range(partners)],
+        batch_size=5000,
+    )
+    Supplier.objects.bulk_create(
+        [
+            Supplier(
+                name=f'Distribuidora {rng.choice(WORDS)} {n}', email=f'proveedor{n}@example.com',
+                phone='+1234567890', address='Norte',
+            )
+            for n in range(partners // 10)
+        ],
+        batch_size=5000,
+    )
+
+
+def scan_search(query):
+    from django.db.models import Q
+    from inventory.models import Product
+    from purchases.models import Supplier
+    from sales.models import Customer
+
+    results = []
+    for model, fields in [
+        (Product, ['name', 'sku', 'description']),
+        (Customer, ['name', 'email']),
+        (Supplier, ['name', 'email']),
+    ]:
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__icontains': query})
+        results += list(model.objects.filter(condition).values_list('pk', 'name')[:20])
+    return results
+
+
+def index_search(query):
+    from search.engine import search
+    return search(query, limit=20)
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            started = time.perf_counter()
+            function(query)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def run(products, partners, repeat):
+    from search.documents import rebuild
+
+    create_rows(products, partners)
+    started = time.perf_counter()
+    written = rebuild()
+    print(f'{sum(written.values())} documents indexed in {time.perf_counter() - started:.1f}s')
+    started = time.perf_counter()
+    index_search('warm up')
+    print(f'first search (loads the in-process index on SQLite): {(time.perf_counter() - started) * 1000:.0f} ms')
+
+    rows = []
+    for label, function in [('icontains scan', scan_search), ('search index', index_search)]:
+        median, p95 = measure(function, repeat)
+        rows.append((label, f'{median:.1f}', f'{p95:.1f}'))
+    print_table(['mode', 'median ms', 'p95 ms'], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=200000)
+    parser.add_argument('--partners', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    with test_database():
+        run(args.products, args.partners, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
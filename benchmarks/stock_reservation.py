@@ -0,0 +1,94 @@
+"""
+Throughput of confirming sale orders from several processes that compete
+for the same hot products, checking that stock is never oversold.
+
+Needs a database shared between processes: PostgreSQL (USE_POSTGRES=True)
+or a file-backed SQLite test database (SQLITE_TEST_NAME=/tmp/bench.sqlite3).
+
+    python -m benchmarks.stock_reservation [--processes 1 2 4 8] [--orders 400]
+"""
+import argparse
+import multiprocessing
+import time
+
+from benchmarks import print_table, test_database
+
+HOT_PRODUCTS = 5
+
+
+def confirm_orders(order_ids):
+    """Worker: confirm the given orders, return (confirmed, short) counts"""
+    from inventory.stock import InsufficientStockError
+    from sales.models import SaleOrder
+
+    confirmed = short = 0
+    for order in SaleOrder.objects.filter(pk__in=order_ids):
+        try:
+            order.confirm()
+            confirmed += 1
+        except InsufficientStockError:
+            short += 1
+    return confirmed, short
+
+
+def run(process_counts, orders, stock):
+    from decimal import Decimal
+    from django.db import connection, connections
+    from django.utils import timezone
+    from inventory.models import Product
+    from sales.models import Customer, SaleOrder
+    from users.models import User
+
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        raise SystemExit('In-memory SQLite is not shared between processes, set SQLITE_TEST_NAME')
+
+    user = User.objects.create_user(username='bench', email='bench@example.com', password='bench')
+    customer = Customer.objects.create(name='Benchmark Customer')
+    products = Product.objects.bulk_create([
+        Product(name=f'Hot {i}', sku=f'HOT-{i:03d}', price=Decimal('9.99'), created_by=user)
+        for i in range(HOT_PRODUCTS)
+    ])
+    context = multiprocessing.get_context('fork')
+
+    rows = []
+    for processes in process_counts:
+        Product.objects.filter(pk__in=[p.pk for p in products]).update(stock_quantity=stock)
+        order_ids = []
+        for _ in range(orders):
+            order = SaleOrder.objects.create(
+                customer=customer, order_date=timezone.now().date(), created_by=user
+            )
+            order.add_items(
+                {'product_id': p.id, 'quantity': 1, 'unit_price': p.price} for p in products
+            )
+            order_ids.append(order.id)
+
+        # Children must open their own connections
+        connections.close_all()
+        started = time.perf_counter()
+        with context.Pool(processes) as pool:
+            results = pool.map(confirm_orders, [order_ids[i::processes] for i in range(processes)])
+        elapsed = time.perf_counter() - started
+
+        confirmed = sum(c for c, _ in results)
+        short = sum(s for _, s in results)
+        lowest = min(Product.objects.filter(pk__in=[p.pk for p in products])
+                     .values_list('stock_quantity', flat=True))
+        oversold = max(confirmed - stock, 0) + max(-lowest, 0)
+        rows.append((processes, confirmed, short, oversold, f'{confirmed / elapsed:.0f}'))
+
+    print_table(['processes', 'confirmed', 'short', 'oversold', 'confirms/s'], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--orders', type=int, default=400)
+    parser.add_argument('--stock', type=int, default=300, help='Initial stock of each hot product')
+    args = parser.parse_args()
+    with test_database():
+        run(args.processes, args.orders, args.stock)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Single pass summary metrics
+
+Summary endpoints report many KPIs over the same table (totals, this and
+last month, counts per status...). Instead of one ``aggregate()`` or
+``count()`` per KPI, metrics are declared per model in a registry and
+computed together with conditional aggregates in one scan::
+
+    register(SaleOrder, 'this_month_sales', lambda period: Sum(
+        'total_amount', filter=Q(status='delivered', order_date__gte=period.this_month)
+    ))
+
+    summarize(SaleOrder.objects.all(), ['total_sales', 'this_month_sales'])
+
+Adding a KPI is one more ``register`` call, not one more query. Apps
+register their metrics in a ``metrics`` module imported from
+``AppConfig.ready``.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+Period = namedtuple('Period', 'today this_month last_month')
+Metric = namedtuple('Metric', 'name aggregate default')
+
+_registry = {}  # model label -> {name: Metric}
+
+
+def current_period(today=None):
+    today = today or timezone.localdate()
+    this_month = today.replace(day=1)
+    return Period(today, this_month, (this_month - timedelta(days=1)).replace(day=1))
+
+
+def register(model, name, aggregate, default=0):
+    """
+    Register a metric of ``model``. ``aggregate`` is an aggregate expression
+    or a callable receiving the ``Period`` and returning one; ``default``
+    replaces NULL results (aggregates over no rows).
+    """
+    _registry.setdefault(model._meta.label, {})[name] = Metric(name, aggregate, default)
+
+
+def register_choices(model, template, field, aggregate, default=0):
+    """
+    Register one metric per choice of ``field``, named ``template.format(value)``.
+    ``aggregate`` receives the ``Q`` object matching the choice.
+    """
+    for value, _ in model._meta.get_field(field).choices:
+        register(
+            model, template.format(value),
+            lambda period, q=Q(**{field: value}): aggregate(q), default,
+        )
+
+
+# Aging buckets: (name, first day, last day) past the due date, None is open ended
+AGING_BUCKETS = (
+    ('not_due', None, -1),
+    ('0_30', 0, 30),
+    ('31_60', 31, 60),
+    ('61_90', 61, 90),
+    ('90_plus', 91, None),
+)
+
+
+def aging_filter(field, today, first, last):
+    """``Q`` matching rows between ``first`` and ``last`` days past ``field`` on ``today``"""
+    q = Q()
+    if first is not None:
+        q &= Q(**{f'{field}__lte': today - timedelta(days=first)})
+    if last is not None:
+        q &= Q(**{f'{field}__gte': today - timedelta(days=last)})
+    return q
+
+
+def register_aging(model, field, amount, condition=Q()):
+    """
+    Register ``aging_<bucket>`` (sum of ``amount``) and ``aging_<bucket>_count``
+    metrics of the rows matching ``condition``, bucketed by days past the date
+    ``field`` (see ``AGING_BUCKETS``).
+    """
+    for bucket, first, last in AGING_BUCKETS:
+        def bucket_filter(period, first=first, last=last):
+            return condition & aging_filter(field, period.today, first, last)
+        register(model, f'aging_{bucket}', lambda period, q=bucket_filter: Sum(amount, filter=q(period)))
+        register(model, f'aging_{bucket}_count', lambda period, q=bucket_filter: Count('pk', filter=q(period)))
+
+
+def metrics(model):
+    """Names of the metrics registered for ``model``"""
+    return list(_registry.get(model._meta.label, {}))
+
+
+def summarize(queryset, names=None, period=None):
+    """
+    Compute the metrics ``names`` (all registered ones by default) of the
+    queryset's model with a single aggregate query.
+    """
+    registered = _registry.get(queryset.model._meta.label, {})
+    names = list(registered) if names is None else names
+    values = queryset.aggregate(**_expressions(registered, names, period))
+    return {
+        name: registered[name].default if values[name] is None else values[name]
+        for name in names
+    }
+
+
+def summarize_by(queryset, fields, names, period=None, order_by=(), limit=None):
+    """
+    Like ``summarize`` but per group of ``fields``, with a single ``GROUP BY``
+    query. Returns one dict per group, ordered by ``order_by`` (metric or
+    field names) and cut to ``limit`` groups.
+    """
+    registered = _registry.get(queryset.model._meta.label, {})
+    groups = queryset.order_by().values(*fields).annotate(**_expressions(registered, names, period))
+    if order_by:
+        groups = groups.order_by(*order_by)
+    if limit is not None:
+        groups = groups[:limit]
+    return [
+        {
+            **{field: group[field] for field in fields},
+            **{name: registered[name].default if group[name] is None else group[name] for name in names},
+        }
+        for group in groups
+    ]
+
+
+def _expressions(registered, names, period):
+    period = period or current_period()
+    expressions = {}
+    for name in names:
+        aggregate = registered[name].aggregate
+        expressions[name] = aggregate(period) if callable(aggregate) else aggregate
+    return expressions
+
+
+def choice_rows(summary, model, field, **templates):
+    """
+    Turn per choice metrics back into rows, e.g. ``[{'status': 'draft',
+    'count': 3}, ...]`` for ``count='orders_{}'``. Choices whose first
+    metric is zero are left out, like a ``GROUP BY`` would.
+    """
+    rows = []
+    for value, _ in model._meta.get_field(field).choices:
+        row = {field: value}
+        for key, template in templates.items():
+            row[key] = summary[template.format(value)]
+        if row[next(iter(templates))]:
+            rows.append(row)
+    return rows
+
+
+def aging_rows(summary):
+    """Aging metrics (``register_aging``) as ``[{'bucket', 'count', 'balance'}, ...]`` rows"""
+    return [
+        {'bucket': bucket, 'count': summary[f'aging_{bucket}_count'], 'balance': summary[f'aging_{bucket}']}
+        for bucket, _, _ in AGING_BUCKETS
+    ]
+
@@ -0,0 +1,98 @@
+"""
+Compact list representations
+
+The full list representation runs every row through DRF fields and
+nested serializers (``SaleOrderSerializer`` nests the customer and all the
+items of each order). Clients that only need a few columns can ask for a
+flat list instead:
+
+- ``?view=compact`` returns the viewset's ``compact_fields``
+- ``?fields=id,name,price`` (sparse fieldset) returns only those columns,
+  any of the ``compact_fields``
+
+Compact rows are read with ``values()`` and rendered as they come from the
+database, bypassing serializer fields: related objects are returned as
+ids and names (``customer_id``, ``customer_name``) and decimals as JSON
+numbers. Filters, search and pagination work as in the full list.
+"""
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .pagination import FlexiblePagination
+
+
+def compact_values(queryset, fields, columns):
+    """
+    ``values()`` queryset returning ``columns``. ``fields`` maps column
+    names to lookups (``{'category_name': 'category__name'}``) or to
+    expressions.
+    """
+    names, expressions = [], {}
+    for column in columns:
+        lookup = fields[column]
+        if lookup == column:
+            names.append(column)
+        else:
+            expressions[column] = F(lookup) if isinstance(lookup, str) else lookup
+    return queryset.values(*names, **expressions)
+
+
+class CompactListMixin:
+    """
+    ViewSet mixin adding ``?view=compact`` and ``?fields=`` to the list
+    action. ``compact_fields`` maps column names to lookups or expressions;
+    column names must not clash with model fields unless they are that
+    field (``category_name``, not ``category``).
+    """
+    compact_fields = {}
+    view_query_param = 'view'
+    fields_query_param = 'fields'
+    # Keyset pagination builds its cursor from these columns
+    cursor_fields = ('id', 'created_at')
+
+    def compact_columns(self):
+        """Columns requested for a compact list, or None for the full representation"""
+        if self.action != 'list' or not self.compact_fields:
+            return None
+        params = self.request.query_params
+        if params.get(self.fields_query_param):
+            columns = [
+                column.strip() for column in params[self.fields_query_param].split(',')
+                if column.strip()
+            ]
+            unknown = [column for column in columns if column not in self.compact_fields]
+            if unknown:
+                raise ValidationError({
+                    self.fields_query_param: f"Unknown fields: {', '.join(unknown)}. "
+                                             f"Available: {', '.join(self.compact_fields)}"
+                })
+            return list(dict.fromkeys(columns))
+        if params.get(self.view_query_param) == 'compact':
+            return list(self.compact_fields)
+        return None
+
+    def uses_query_plan(self):
+        return self.compact_columns() is None and super().uses_query_plan()
+
+    def list(self, request, *args, **kwargs):
+        columns = self.compact_columns()
+        if columns is None:
+            return super().list(request, *args, **kwargs)
+
+        hidden = []
+        if isinstance(self.paginator, FlexiblePagination):
+            hidden = [field for field in self.cursor_fields if field not in columns]
+        queryset = compact_values(
+            self.filter_queryset(self.get_queryset()),
+            {**self.compact_fields, **{field: field for field in hidden}},
+            columns + hidden,
+        )
+
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        if hidden:
+            rows = [{column: row[column] for column in columns} for row in rows]
+        if page is not None:
+            return self.get_paginated_response(rows)
+        return Response(rows)
@@ -0,0 +1,136 @@
+"""
+Conditional GET for catalog lists
+
+Clients polling a list (POS terminals refresh products every few seconds)
+send back the ``ETag``/``Last-Modified`` of their last response and get an
+empty ``304 Not Modified`` while nothing changed, without the page being
+queried or serialized.
+
+The validators come from high-water marks of every table the
+representation reads: products embed their category and categories count
+their products, so both lists depend on both tables. Each mark is
+``Max('updated_at')``, one query on the ``updated_at`` index, and the last
+time rows of the table were deleted (``TableDeletion``), which a maximum
+can't show. Counting rows would catch deletions too, but scans the whole
+table on every request.
+
+Deletion marks are written by ``post_delete`` receivers, in the deleting
+transaction: every model in ``last_modified_models`` must be registered
+with ``track_deletions`` in its app's signals module. Deletions skipping
+the signals (raw SQL) don't change the validators.
+
+``?updated_since=<ISO datetime>`` returns only the rows changed after
+that moment, for clients syncing deltas. Deletions don't show up in
+deltas; a changed ``ETag`` with an empty delta means rows were deleted.
+"""
+import hashlib
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Max
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from rest_framework.exceptions import ValidationError
+
+from .models import TableDeletion
+
+# Models whose deletions are recorded
+tracked_models = set()
+
+
+def high_water_mark(queryset):
+    """Latest ``updated_at`` of ``queryset``"""
+    return queryset.aggregate(last_modified=Max('updated_at'))['last_modified']
+
+
+def record_deletion(sender, using=None, **kwargs):
+    label = sender._meta.label
+    deletions = TableDeletion.objects.using(using)
+    now = timezone.now()
+    if not deletions.filter(label=label).update(deleted_at=now):
+        deletions.update_or_create(label=label, defaults={'deleted_at': now})
+
+
+def track_deletions(*models):
+    """Record the deletions of ``models`` for the validators of the lists reading them"""
+    for model in models:
+        post_delete.connect(record_deletion, sender=model, dispatch_uid=f'conditional_deletion_{model._meta.label}')
+        tracked_models.add(model)
+
+
+def deletion_marks(models):
+    """``{label: last deletion}`` of ``models`` in one query (models without deletions left out)"""
+    return dict(
+        TableDeletion.objects.filter(label__in=[model._meta.label for model in models])
+        .values_list('label', 'deleted_at')
+    )
+
+
+def parse_updated_since(value):
+    """Aware datetime from an ``updated_since`` parameter; naive values are in the current timezone"""
+    try:
+        moment = parse_datetime(value)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({'updated_since': 'Expected an ISO 8601 datetime.'})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class ConditionalListMixin:
+    """
+    ViewSet mixin adding ``ETag``/``Last-Modified`` validators and
+    ``?updated_since=`` to the list action. ``last_modified_models`` are
+    the models whose rows the list representation reads (the viewset's
+    own model by default); all of them need an ``updated_at`` field.
+    """
+    last_modified_models = ()
+    updated_since_query_param = 'updated_since'
+
+    def get_last_modified_models(self):
+        return self.last_modified_models or (self.get_queryset().model,)
+
+    def list_validators(self):
+        """``(etag, last_modified)`` of the list, ``last_modified`` as a timestamp"""
+        models = self.get_last_modified_models()
+        untracked = [model._meta.label for model in models if model not in tracked_models]
+        if untracked:
+            raise ImproperlyConfigured(
+                f"{type(self).__name__} reads {', '.join(untracked)}: register them with track_deletions()"
+            )
+
+        deleted = deletion_marks(models)
+        marks = []
+        latest = None
+        for model in models:
+            moments = (high_water_mark(model._default_manager.all()), deleted.get(model._meta.label))
+            marks.append(':'.join([model._meta.label, *(m.isoformat() if m else '' for m in moments)]))
+            for moment in moments:
+                if moment and (latest is None or moment > latest):
+                    latest = moment
+        etag = '"%s"' % hashlib.md5('|'.join(marks).encode()).hexdigest()
+        return etag, int(latest.timestamp()) if latest else None
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        updated_since = self.request.query_params.get(self.updated_since_query_param)
+        if self.action == 'list' and updated_since:
+            queryset = queryset.filter(updated_at__gt=parse_updated_since(updated_since))
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.list_validators()
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Shared caches must not keep authenticated data; clients revalidate every time
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,112 @@
+"""
+Denormalized counters
+
+Helpers for counter columns kept on a parent row (a category's product
+totals, a customer's order stats) so listings and reports read them
+instead of aggregating the child table on every request:
+
+- ``stored_values``/``saved_values`` give the values a save replaced and
+  the ones it wrote, read from the row rather than from a snapshot taken
+  when the instance was loaded (which may be outdated)
+- ``bump`` adds deltas with F() updates, in primary key order so that
+  concurrent writers lock the rows in the same order
+- ``latest`` moves a "last activity" timestamp forward, never back
+- ``protect_counters`` keeps ``save()`` of an instance loaded earlier from
+  writing back stale counter values
+- ``mismatches`` compares stored counters against freshly aggregated
+  ones, for the rebuild/check commands
+"""
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import Case, F, Q, Value, When
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+
+
+def decimal(value):
+    """``value`` as a Decimal (instances may hold floats; SQLite sums decimals as floats)"""
+    if value is None:
+        return ZERO
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def stored_values(model, pk, fields, using=None):
+    """
+    ``fields`` (attnames) of a row as stored, locked until the end of the
+    transaction when there is one (so no UPDATE slips in before the save
+    overwrites the row)
+    """
+    rows = model._default_manager.using(using).filter(pk=pk)
+    if connections[using or rows.db].in_atomic_block:
+        rows = rows.select_for_update()
+    return rows.values(*fields).first()
+
+
+def _written(model, update_fields):
+    return {model._meta.get_field(name).attname for name in update_fields}
+
+
+def writes_fields(model, fields, update_fields):
+    """Whether a save with ``update_fields`` writes any of ``fields``"""
+    return update_fields is None or bool(_written(model, update_fields) & set(fields))
+
+
+def saved_values(instance, fields, old, update_fields=None):
+    """``fields`` as a save of ``instance`` left them in the row"""
+    if old is None or update_fields is None:
+        return {field: getattr(instance, field) for field in fields}
+    written = _written(type(instance), update_fields)
+    return {field: getattr(instance, field) if field in written else old[field] for field in fields}
+
+
+def bump(model, deltas, assignments=None):
+    """
+    Add ``deltas`` ({pk: {field: change}}) to the rows of ``model``.
+    ``assignments`` ({pk: {field: expression}}) are set in the same UPDATE.
+    """
+    assignments = assignments or {}
+    for pk in sorted(set(deltas) | set(assignments)):
+        changes = {
+            field: F(field) + value for field, value in deltas.get(pk, {}).items() if value
+        }
+        changes.update(assignments.get(pk, {}))
+        if changes:
+            model._default_manager.filter(pk=pk).update(**changes)
+
+
+def latest(field, value):
+    """Expression setting ``field`` to ``value`` unless it already holds a later one"""
+    return Case(
+        When(Q(**{f'{field}__isnull': True}) | Q(**{f'{field}__lt': value}), then=Value(value)),
+        default=F(field),
+    )
+
+
+def protect_counters(instance, counter_fields, kwargs):
+    """
+    ``save()`` kwargs that leave out ``counter_fields`` when updating an
+    existing row (they are only changed with F() updates)
+    """
+    if not instance._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+        kwargs['update_fields'] = [
+            field.name for field in instance._meta.concrete_fields
+            if not field.primary_key and field.name not in counter_fields
+        ]
+    return kwargs
+
+
+def mismatches(queryset, expected, fields, default):
+    """
+    ``(pk, name, expected, actual)`` for the rows of ``queryset`` whose
+    ``fields`` differ from ``expected`` ({pk: values}; rows missing from it
+    expect ``default``)
+    """
+    found = []
+    for row in queryset.order_by('pk').values('pk', 'name', *fields):
+        pk, name = row.pop('pk'), row.pop('name')
+        values = expected.get(pk, default)
+        if row != values:
+            found.append((pk, name, values, row))
+    return found
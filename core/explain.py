@@ -0,0 +1,176 @@
+"""
+EXPLAIN harness for the hot query paths
+
+The hot queries mirror the filters used by ``reports.views`` and the
+viewsets, each with the indexes expected to serve it. ``check_hot_queries``
+runs EXPLAIN for every one of them and reports which index the planner
+picked, understanding both SQLite (``EXPLAIN QUERY PLAN``) and PostgreSQL
+plans. Plans depend on table sizes and statistics, so run it against a
+realistically sized database (see ``manage.py explain_hot_queries``).
+
+Some checks only run on PostgreSQL: trigram indexes don't exist
+elsewhere, and filters on open invoices rely on the planner knowing how
+skewed ``status`` is (most invoices are paid). SQLite only keeps average
+selectivity per column and can't match bound parameters against partial
+index conditions, so it rightly scans there.
+"""
+import re
+from collections import namedtuple
+from datetime import timedelta
+
+from django.apps import apps
+from django.contrib.postgres.search import SearchQuery
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .indexes import trigram_index_name
+
+HotQuery = namedtuple('HotQuery', 'name indexes queryset vendors')
+
+ALL_VENDORS = None
+POSTGRESQL = ('postgresql',)
+
+_INDEX_PATTERNS = {
+    'sqlite': [r'USING (?:COVERING )?INDEX (\w+)'],
+    'postgresql': [r'Index (?:Only )?Scan(?: Backward)? using (\w+)', r'Bitmap Index Scan on (\w+)'],
+}
+
+
+def _model(label):
+    return apps.get_model(*label.split('.'))
+
+
+def _hot_queries():
+    today = timezone.localdate()
+    return [
+        # reports: live part of the sales and purchase totals
+        HotQuery(
+            'delivered_sales_since', ['sale_order_status_date_idx'],
+            lambda: _model('sales.SaleOrder').objects.filter(status='delivered', order_date__gte=today),
+            ALL_VENDORS,
+        ),
+        HotQuery(
+            'purchases_since', ['purch_inv_date_idx'],
+            lambda: _model('purchases.PurchaseInvoice').objects.filter(invoice_date__gte=today),
+            ALL_VENDORS,
+        ),
+        # reports: outstanding balances
+        HotQuery(
+            'open_sales_invoices', ['invoice_open_due_idx', 'invoice_status_due_idx'],
+            lambda: _model('sales.Invoice').objects.filter(status__in=['pending', 'partial']),
+            POSTGRESQL,
+        ),
+        HotQuery(
+            'open_purchase_invoices', ['purch_inv_open_due_idx', 'purch_inv_status_due_idx'],
+            lambda: _model('purchases.PurchaseInvoice').objects.filter(status__in=['pending', 'partial']),
+            POSTGRESQL,
+        ),
+        HotQuery(
+            'overdue_sales_invoices', ['invoice_status_due_idx', 'invoice_open_due_idx'],
+            lambda: _model('sales.Invoice').objects.filter(status='pending', due_date__lt=today),
+            ALL_VENDORS,
+        ),
+        # reports: top and active customers (maintained stats)
+        HotQuery(
+            'top_customers', ['customer_total_sales_idx'],
+            lambda: _model('sales.Customer').objects.filter(
+                is_active=True, order_count__gt=0
+            ).order_by('-total_sales')[:20],
+            ALL_VENDORS,
+        ),
+        HotQuery(
+            'active_customers', ['customer_last_order_idx'],
+            lambda: _model('sales.Customer').objects.filter(
+                last_order_at__gte=timezone.now() - timedelta(days=30)
+            ),
+            ALL_VENDORS,
+        ),
+        # inventory: low stock (dashboard, inventory report, low_stock action)
+        HotQuery(
+            'low_stock_products', ['product_low_stock_idx'],
+            lambda: _model('inventory.Product').objects.filter(
+                is_active=True, stock_quantity__lte=F('min_stock_level')
+            ),
+            ALL_VENDORS,
+        ),
+        # inventory: movements of a product, newest first
+        HotQuery(
+            'product_stock_movements', ['stock_mov_product_created_idx'],
+            lambda: _model('inventory.StockMovement').objects.filter(product_id=1).order_by('-created_at')[:20],
+            ALL_VENDORS,
+        ),
+        # dashboard / list endpoints: newest rows
+        HotQuery(
+            'recent_stock_movements', ['stock_mov_created_id_idx'],
+            lambda: _model('inventory.StockMovement').objects.order_by('-created_at', '-id')[:20],
+            ALL_VENDORS,
+        ),
+        HotQuery(
+            'recent_sale_orders', ['sale_order_created_id_idx'],
+            lambda: _model('sales.SaleOrder').objects.order_by('-created_at', '-id')[:20],
+            ALL_VENDORS,
+        ),
+        # viewsets: ?search=
+        HotQuery(
+            'product_search',
+            [trigram_index_name('products', 'name'), trigram_index_name('products', 'sku')],
+            lambda: _model('inventory.Product').objects.filter(
+                Q(name__icontains='widget') | Q(sku__icontains='widget')
+            ),
+            POSTGRESQL,
+        ),
+        HotQuery(
+            'customer_search',
+            [trigram_index_name('customers', 'name'), trigram_index_name('customers', 'email')],
+            lambda: _model('sales.Customer').objects.filter(
+                Q(name__icontains='acme') | Q(email__icontains='acme')
+            ),
+            POSTGRESQL,
+        ),
+        # search: GET /api/search/?q=
+        HotQuery(
+            'global_search', ['search_doc_vector_idx'],
+            lambda: _model('search.SearchDocument').objects.filter(
+                search_vector=SearchQuery('widget:*', search_type='raw', config='simple')
+            ),
+            POSTGRESQL,
+        ),
+        HotQuery(
+            'code_prefix_search', ['search_doc_code_idx'],
+            lambda: _model('search.SearchDocument').objects.filter(code__startswith='SKU-1'),
+            POSTGRESQL,
+        ),
+    ]
+
+
+def used_indexes(queryset):
+    """Names of the indexes in the plan of ``queryset``"""
+    vendor = connections[queryset.db].vendor
+    plan = queryset.explain()
+    return {
+        match
+        for pattern in _INDEX_PATTERNS.get(vendor, [])
+        for match in re.findall(pattern, plan)
+    }
+
+
+def check_hot_queries(using='default'):
+    """
+    Return ``(name, expected_indexes, used_indexes)`` for every hot query
+    supported by the database. A query passes when it uses at least one of
+    its expected indexes.
+    """
+    vendor = connections[using].vendor
+    results = []
+    for query in _hot_queries():
+        if query.vendors and vendor not in query.vendors:
+            continue
+        results.append((query.name, query.indexes, used_indexes(query.queryset().using(using))))
+    return results
+
+
+def analyze(using='default'):
+    """Refresh planner statistics"""
+    with connections[using].cursor() as cursor:
+        cursor.execute('ANALYZE')
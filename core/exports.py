@@ -0,0 +1,146 @@
+"""
+Streaming CSV / NDJSON exports
+
+Exports stream rows straight from the database to the client: the
+queryset is read with ``values()`` and ``iterator(chunk_size=...)``
+(server-side cursors on PostgreSQL, chunked fetches elsewhere) and every
+row is encoded and sent as soon as it's read, so memory stays constant
+however many rows are exported and the first bytes leave immediately.
+
+Viewsets get a ``GET .../export/?format=csv|ndjson`` action with
+``ExportMixin``, which exports the same rows the list endpoint would
+return (filters and search included), ordered by primary key.
+"""
+import csv
+import json
+from itertools import groupby
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+CHUNK_SIZE = 2000
+
+
+class _ExportRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept ``?format=csv|ndjson``. Export data is
+    streamed by ``export_response``; this only renders errors.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class CSVRenderer(_ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(_ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+EXPORT_RENDERERS = [*api_settings.DEFAULT_RENDERER_CLASSES, CSVRenderer, NDJSONRenderer]
+EXPORT_FORMATS = {renderer.format: renderer.media_type for renderer in (CSVRenderer, NDJSONRenderer)}
+
+
+def export_format(request):
+    """The export format negotiated for ``request``, or None for JSON"""
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer.format if renderer and renderer.format in EXPORT_FORMATS else None
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([row[column] for column in columns])
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def export_response(rows, columns, file_format, filename):
+    """
+    Stream ``rows`` (an iterable of dicts) as ``file_format``. CSV uses
+    ``columns`` as header; NDJSON writes each row as it is, so rows may
+    hold nested lists (e.g. the items of an order).
+    """
+    lines = csv_lines(columns, rows) if file_format == 'csv' else ndjson_lines(rows)
+    response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[file_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
+
+
+def stream_values(queryset, fields, chunk_size=CHUNK_SIZE):
+    """
+    Iterate ``queryset`` as dicts keyed by column name. ``fields`` maps
+    column names to lookups (``{'category': 'category__name'}``).
+    """
+    lookups = list(fields.values())
+    # Inside a transaction the server-side cursor lives only as long as the
+    # transaction, which keeps it usable behind PgBouncer in transaction mode
+    with transaction.atomic(using=queryset.db):
+        for row in queryset.values(*lookups).iterator(chunk_size=chunk_size):
+            yield {column: row[lookup] for column, lookup in fields.items()}
+
+
+def nest(rows, key, fields, children_key, child_fields):
+    """
+    Group consecutive flat rows (a parent LEFT JOINed with its children,
+    ordered by parent) into parents holding a list of children.
+    """
+    for _, group in groupby(rows, key=lambda row: row[key]):
+        group = list(group)
+        parent = {field: group[0][field] for field in fields}
+        parent[children_key] = [
+            {field: row[field] for field in child_fields}
+            for row in group if row[child_fields[0]] is not None
+        ]
+        yield parent
+
+
+class ExportMixin:
+    """
+    ViewSet mixin adding ``GET .../export/?format=csv|ndjson``.
+
+    ``export_fields`` maps export columns to lookups; override
+    ``export_rows`` for anything ``values()`` can't express.
+    """
+    export_fields = {}
+    export_filename = None
+
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """
+        Stream the list as CSV or NDJSON (?format=csv|ndjson)
+        """
+        file_format = export_format(request) or 'csv'
+        queryset = self.filter_queryset(self.get_queryset()).order_by('pk')
+        rows = self.export_rows(queryset, file_format)
+        return export_response(rows, self.export_columns(file_format), file_format, self.get_export_filename())
+
+    def export_rows(self, queryset, file_format):
+        return stream_values(queryset, self.export_fields)
+
+    def export_columns(self, file_format):
+        return list(self.export_fields)
+
+    def get_export_filename(self):
+        return self.export_filename or self.basename
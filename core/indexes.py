@@ -0,0 +1,48 @@
+"""
+Trigram indexes for ``icontains`` searches (PostgreSQL only)
+
+Django compiles ``name__icontains`` to ``UPPER(name::text) LIKE
+UPPER(%s)`` on PostgreSQL, which a B-tree can't serve. A GIN index with
+``gin_trgm_ops`` on the same expression can. Other databases are skipped,
+they have no equivalent index.
+"""
+import logging
+
+from django.db import DatabaseError, migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def trigram_index_name(table, column):
+    return f'{table}_{column}_trgm'
+
+
+def TrigramIndexes(table, columns):
+    """Migration operation creating trigram indexes on ``table.columns``"""
+
+    def create(apps, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            try:
+                with transaction.atomic(using=connection.alias):
+                    cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            except DatabaseError:
+                # Needs a privileged role; searches keep working without the index
+                logger.warning('pg_trgm is not available, skipping trigram indexes on %s', table)
+                return
+            for column in columns:
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {trigram_index_name(table, column)} '
+                    f'ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+                )
+
+    def drop(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        with schema_editor.connection.cursor() as cursor:
+            for column in columns:
+                cursor.execute(f'DROP INDEX IF EXISTS {trigram_index_name(table, column)}')
+
+    return migrations.RunPython(create, drop)
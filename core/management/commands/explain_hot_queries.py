@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.explain import analyze, check_hot_queries
+
+
+class Command(BaseCommand):
+    help = 'Verifica con EXPLAIN que las consultas frecuentes usan índices'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Actualiza las estadísticas del planificador antes de verificar',
+        )
+        parser.add_argument('--database', default='default', help='Base de datos a verificar')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if options['analyze']:
+            self.stdout.write(self.style.WARNING('📊 Actualizando estadísticas (ANALYZE)...'))
+            analyze(using)
+
+        self.stdout.write(self.style.WARNING('🔍 Verificando planes de consultas...'))
+        failures = 0
+        for name, expected, used in check_hot_queries(using):
+            if used & set(expected):
+                self.stdout.write(self.style.SUCCESS(f'   ✅ {name}: {", ".join(sorted(used))}'))
+            else:
+                failures += 1
+                found = ', '.join(sorted(used)) or 'sin índice'
+                self.stdout.write(self.style.ERROR(
+                    f'   ❌ {name}: esperado {" o ".join(expected)}, usa {found}'
+                ))
+
+        if failures:
+            raise CommandError(f'{failures} consultas no usan el índice esperado')
+        self.stdout.write(self.style.SUCCESS('🎉 Todas las consultas usan sus índices'))
@@ -0,0 +1,415 @@
+import math
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.explain import analyze
+from core.numbering import format_number, reserve_range, reset_blocks
+
+ORDER_STATUSES = (
+    ('delivered', 70), ('shipped', 8), ('confirmed', 7), ('draft', 10), ('cancelled', 5),
+)
+INVOICE_STATUSES = (('paid', 80), ('pending', 10), ('partial', 6), ('overdue', 4))
+MOVEMENT_TYPES = (('in', 40), ('out', 50), ('adjustment', 5), ('return', 5))
+
+
+def zipf_cum_weights(n, s=1.0):
+    """Cumulative weights where item i is chosen ~1/(i+1)^s as often"""
+    total = 0.0
+    weights = []
+    for i in range(n):
+        total += 1.0 / (i + 1) ** s
+        weights.append(total)
+    return weights
+
+
+def choice_table(choices):
+    values = [value for value, _ in choices]
+    cum, total = [], 0
+    for _, weight in choices:
+        total += weight
+        cum.append(total)
+    return values, cum
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create store the generated created_at/updated_at values"""
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Genera un volumen grande de datos sintéticos y deterministas para pruebas de rendimiento'
+
+    VOLUMES = {
+        'categories': 50,
+        'products': 100000,
+        'customers': 20000,
+        'suppliers': 500,
+        'orders': 1000000,
+        'purchase_invoices': 50000,
+        'movements': 5000000,
+    }
+
+    def add_arguments(self, parser):
+        for name, default in self.VOLUMES.items():
+            parser.add_argument(
+                f"--{name.replace('_', '-')}", type=int, default=default,
+                help=f'Cantidad a generar (por defecto {default})',
+            )
+        parser.add_argument(
+            '--scale', type=float, default=1.0,
+            help='Multiplica todos los volúmenes, p. ej. 0.01 para un dataset chico',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Semilla (mismo seed y fecha, mismos datos)')
+        parser.add_argument('--days', type=int, default=730, help='Días de historia')
+        parser.add_argument(
+            '--end-date', type=date.fromisoformat, default=None,
+            help='Último día de la historia (por defecto hoy), YYYY-MM-DD',
+        )
+        parser.add_argument('--max-items', type=int, default=8, help='Máximo de items por orden/factura')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='GEN', help='Prefijo de SKUs y nombres generados')
+
+    def handle(self, *args, **options):
+        from inventory.models import Category, Product
+        from users.models import User
+
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        self.end_date = options['end_date'] or timezone.localdate()
+        self.start_date = self.end_date - timedelta(days=options['days'] - 1)
+        self.volumes = {
+            name: max(int(options[name] * options['scale']), 1) for name in self.VOLUMES
+        }
+
+        if Product.objects.filter(sku__startswith=f'{self.prefix}-').exists():
+            raise CommandError(f'Ya existen datos generados con el prefijo {self.prefix}, usa --prefix')
+
+        self.user = User.objects.filter(is_superuser=True).order_by('id').first()
+        if self.user is None:
+            self.user, _ = User.objects.get_or_create(
+                username='dataset', defaults={'email': 'dataset@example.com'}
+            )
+
+        self.stdout.write(self.style.WARNING(
+            '📦 Generando dataset (seed={seed}, {start} → {end}):\n'.format(
+                seed=options['seed'], start=self.start_date, end=self.end_date
+            ) + '\n'.join(f'   - {name}: {count}' for name, count in self.volumes.items())
+        ))
+
+        reset_blocks()
+        with explicit_timestamps(Category, Product, *self.models()):
+            self.step('Categorías', self.create_categories)
+            self.step('Productos', self.create_products)
+            self.step('Clientes', self.create_customers)
+            self.step('Proveedores', self.create_suppliers)
+            self.step('Órdenes de venta, items y facturas', self.create_orders)
+            self.step('Facturas de compra', self.create_purchase_invoices)
+            self.step('Movimientos de stock', self.create_movements)
+
+        self.step('Rollups de reportes', self.rebuild_rollups)
+        self.step('Índice de búsqueda', self.rebuild_search_index)
+        self.step('Contadores de categorías', self.rebuild_category_counters)
+        self.step('Estadísticas de clientes y proveedores', self.rebuild_partner_stats)
+        self.step('Estadísticas del planificador', analyze)
+        self.stdout.write(self.style.SUCCESS('🎉 Dataset generado'))
+
+    def models(self):
+        from inventory.models import StockMovement
+        from purchases.models import PurchaseInvoice, PurchaseInvoiceItem, Supplier
+        from sales.models import Customer, Invoice, SaleOrder, SaleOrderItem
+        return [
+            Customer, Supplier, SaleOrder, SaleOrderItem, Invoice,
+            PurchaseInvoice, PurchaseInvoiceItem, StockMovement,
+        ]
+
+    def step(self, label, func):
+        started = time.perf_counter()
+        func()
+        self.stdout.write(self.style.SUCCESS(f'   ✅ {label} ({time.perf_counter() - started:.1f}s)'))
+
+    # Helpers
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(start + self.batch_size, total)
+
+    def random_day(self):
+        """A day of the history, more recent days being more likely (growth)"""
+        days = (self.end_date - self.start_date).days + 1
+        return self.start_date + timedelta(days=min(int(math.sqrt(self.rng.random()) * days), days - 1))
+
+    def timestamp(self, day):
+        midnight = timezone.make_aware(datetime(day.year, day.month, day.day))
+        return midnight + timedelta(seconds=self.rng.randrange(86400))
+
+    def money(self, low, high):
+        return Decimal(str(round(math.exp(self.rng.uniform(math.log(low), math.log(high))), 2)))
+
+    def item_count(self):
+        # Most documents have a few lines, some have many
+        return min(1 + int(self.rng.expovariate(0.6)), self.options['max_items'])
+
+    def created(self, day=None):
+        moment = self.timestamp(day or self.start_date)
+        return {'created_at': moment, 'updated_at': moment}
+
+    # Steps
+
+    def create_categories(self):
+        from inventory.models import Category
+        self.categories = Category.objects.bulk_create([
+            Category(name=f'{self.prefix} Category {i}', **self.created())
+            for i in range(self.volumes['categories'])
+        ])
+
+    def create_products(self):
+        from inventory.models import Product
+        category_cum = zipf_cum_weights(len(self.categories), 0.7)
+        self.product_ids, self.product_prices, self.stock = [], [], {}
+        for start, end in self.batches(self.volumes['products']):
+            products = []
+            for i in range(start, end):
+                price = self.money(1, 2000)
+                products.append(Product(
+                    name=f'{self.prefix} Product {i}',
+                    sku=f'{self.prefix}-{i:07d}',
+                    category=self.rng.choices(self.categories, cum_weights=category_cum)[0],
+                    price=price,
+                    cost_price=(price * Decimal('0.6')).quantize(Decimal('0.01')),
+                    stock_quantity=self.rng.randrange(0, 500),
+                    min_stock_level=self.rng.randrange(0, 20),
+                    is_active=self.rng.random() < 0.95,
+                    created_by=self.user,
+                    **self.created(),
+                ))
+            with transaction.atomic():
+                Product.objects.bulk_create(products)
+            for product in products:
+                self.product_ids.append(product.id)
+                self.product_prices.append(product.price)
+                self.stock[product.id] = product.stock_quantity
+        # Popular products are spread over the catalogue
+        self.product_order = list(range(len(self.product_ids)))
+        self.rng.shuffle(self.product_order)
+        self.product_cum = zipf_cum_weights(len(self.product_ids))
+
+    def pick_products(self, k):
+        picked = self.rng.choices(self.product_order, cum_weights=self.product_cum, k=k)
+        return [(self.product_ids[i], self.product_prices[i]) for i in dict.fromkeys(picked)]
+
+    def create_customers(self):
+        from sales.models import Customer
+        self.customer_ids = []
+        for start, end in self.batches(self.volumes['customers']):
+            customers = Customer.objects.bulk_create([
+                Customer(
+                    name=f'{self.prefix} Customer {i}',
+                    email=f'customer{i}@{self.prefix.lower()}.example.com',
+                    phone=f'+1555{i:07d}',
+                    is_active=self.rng.random() < 0.9,
+                    **self.created(),
+                )
+                for i in range(start, end)
+            ])
+            self.customer_ids += [customer.id for customer in customers]
+        # A small share of customers places most of the orders
+        self.customer_cum = zipf_cum_weights(len(self.customer_ids), 1.1)
+
+    def create_suppliers(self):
+        from purchases.models import Supplier
+        suppliers = Supplier.objects.bulk_create([
+            Supplier(
+                name=f'{self.prefix} Supplier {i}',
+                email=f'supplier{i}@{self.prefix.lower()}.example.com',
+                phone=f'+1666{i:07d}',
+                address=f'Street {i}',
+                **self.created(),
+            )
+            for i in range(self.volumes['suppliers'])
+        ])
+        self.supplier_ids = [supplier.id for supplier in suppliers]
+        self.supplier_cum = zipf_cum_weights(len(self.supplier_ids), 0.8)
+
+    def create_orders(self):
+        from sales.models import Invoice, SaleOrder, SaleOrderItem
+        statuses, status_cum = choice_table(ORDER_STATUSES)
+        invoice_statuses, invoice_cum = choice_table(INVOICE_STATUSES)
+
+        for start, end in self.batches(self.volumes['orders']):
+            numbers = reserve_range('sale_order', end - start)
+            orders, lines = [], []
+            for n in range(end - start):
+                day = self.random_day()
+                items = self.pick_products(self.item_count())
+                subtotal = Decimal('0.00')
+                for product_id, price in items:
+                    quantity = 1 + int(self.rng.expovariate(0.5))
+                    lines.append((len(orders), product_id, quantity, price))
+                    subtotal += quantity * price
+                tax = (subtotal * Decimal('0.10')).quantize(Decimal('0.01'))
+                orders.append(SaleOrder(
+                    order_number=format_number('sale_order', numbers[n]),
+                    customer_id=self.rng.choices(self.customer_ids, cum_weights=self.customer_cum)[0],
+                    status=self.rng.choices(statuses, cum_weights=status_cum)[0],
+                    order_date=day,
+                    delivery_date=day + timedelta(days=self.rng.randrange(1, 10)),
+                    subtotal=subtotal,
+                    tax_amount=tax,
+                    total_amount=subtotal + tax,
+                    created_by=self.user,
+                    **self.created(day),
+                ))
+
+            with transaction.atomic():
+                SaleOrder.objects.bulk_create(orders)
+                SaleOrderItem.objects.bulk_create([
+                    SaleOrderItem(
+                        order_id=orders[index].id,
+                        product_id=product_id,
+                        quantity=quantity,
+                        unit_price=price,
+                        total_price=quantity * price,
+                        created_at=orders[index].created_at,
+                    )
+                    for index, product_id, quantity, price in lines
+                ], batch_size=self.batch_size)
+
+                invoiced = [order for order in orders if order.status in ('shipped', 'delivered')]
+                invoice_numbers = reserve_range('invoice', len(invoiced)) if invoiced else []
+                invoices = []
+                for n, order in enumerate(invoiced):
+                    status = self.rng.choices(invoice_statuses, cum_weights=invoice_cum)[0]
+                    paid = {
+                        'paid': order.total_amount,
+                        'partial': (order.total_amount / 2).quantize(Decimal('0.01')),
+                    }.get(status, Decimal('0.00'))
+                    invoices.append(Invoice(
+                        invoice_number=format_number('invoice', invoice_numbers[n]),
+                        sale_order_id=order.id,
+                        invoice_date=order.order_date,
+                        due_date=order.order_date + timedelta(days=30),
+                        amount=order.total_amount,
+                        paid_amount=paid,
+                        status=status,
+                        created_at=order.created_at,
+                        updated_at=order.created_at,
+                    ))
+                Invoice.objects.bulk_create(invoices)
+
+    def create_purchase_invoices(self):
+        from purchases.models import PurchaseInvoice, PurchaseInvoiceItem
+        statuses, status_cum = choice_table(INVOICE_STATUSES)
+
+        for start, end in self.batches(self.volumes['purchase_invoices']):
+            numbers = reserve_range('purchase_invoice', end - start)
+            invoices, lines = [], []
+            for n in range(end - start):
+                day = self.random_day()
+                amount = Decimal('0.00')
+                for product_id, price in self.pick_products(self.item_count()):
+                    quantity = self.rng.randrange(10, 200)
+                    cost = (price * Decimal('0.6')).quantize(Decimal('0.01'))
+                    lines.append((len(invoices), product_id, quantity, cost))
+                    amount += quantity * cost
+                status = self.rng.choices(statuses, cum_weights=status_cum)[0]
+                invoices.append(PurchaseInvoice(
+                    invoice_number=format_number('purchase_invoice', numbers[n]),
+                    supplier_id=self.rng.choices(self.supplier_ids, cum_weights=self.supplier_cum)[0],
+                    invoice_date=day,
+                    due_date=day + timedelta(days=30),
+                    amount=amount,
+                    paid_amount=amount if status == 'paid' else Decimal('0.00'),
+                    status=status,
+                    **self.created(day),
+                ))
+
+            with transaction.atomic():
+                PurchaseInvoice.objects.bulk_create(invoices)
+                PurchaseInvoiceItem.objects.bulk_create([
+                    PurchaseInvoiceItem(
+                        invoice_id=invoices[index].id,
+                        product_id=product_id,
+                        quantity=quantity,
+                        unit_price=cost,
+                        total_price=quantity * cost,
+                        created_at=invoices[index].created_at,
+                    )
+                    for index, product_id, quantity, cost in lines
+                ], batch_size=self.batch_size)
+
+    def create_movements(self):
+        from inventory.models import StockMovement
+        from inventory.stock import INCREASING_TYPES, update_stock
+        types, type_cum = choice_table(MOVEMENT_TYPES)
+        total = self.volumes['movements']
+        span = (self.end_date - self.start_date).days * 86400 + 86399
+        origin = timezone.make_aware(datetime(self.start_date.year, self.start_date.month, self.start_date.day))
+        initial = dict(self.stock)
+
+        for start, end in self.batches(total):
+            movements = []
+            for n in range(start, end):
+                product_id, _ = self.pick_products(1)[0]
+                movement_type = self.rng.choices(types, cum_weights=type_cum)[0]
+                quantity = 1 + int(self.rng.expovariate(0.2))
+                previous = self.stock[product_id]
+                if movement_type not in INCREASING_TYPES and previous < quantity:
+                    movement_type = 'in'
+                change = quantity if movement_type in INCREASING_TYPES else -quantity
+                self.stock[product_id] = previous + change
+                movements.append(StockMovement(
+                    product_id=product_id,
+                    movement_type=movement_type,
+                    quantity=quantity,
+                    previous_quantity=previous,
+                    new_quantity=previous + change,
+                    reference=f'{self.prefix}-MOV',
+                    created_by=self.user,
+                    # Chronological, so previous/new quantities chain in order
+                    created_at=origin + timedelta(seconds=span * n // total),
+                ))
+            StockMovement.objects.bulk_create(movements)
+
+        update_stock({pk: self.stock[pk] - initial[pk] for pk in self.stock})
+
+    def rebuild_rollups(self):
+        from reports import cache, rollups
+        rollups.rebuild()
+        cache.invalidate()
+
+    def rebuild_search_index(self):
+        # bulk_create skips the search signals
+        from search.documents import rebuild
+        rebuild()
+
+    def rebuild_category_counters(self):
+        from inventory.counters import rebuild
+        rebuild()
+
+    def rebuild_partner_stats(self):
+        from purchases import stats as supplier_stats
+        from sales import stats as customer_stats
+        customer_stats.rebuild()
+        supplier_stats.rebuild()
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from purchases import stats as supplier_stats
+from sales import stats as customer_stats
+
+PARTNERS = (
+    ('clientes', customer_stats),
+    ('proveedores', supplier_stats),
+)
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las estadísticas de actividad de clientes y proveedores e informa las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Solo informa las diferencias, sin corregirlas (termina con error si las hay)',
+        )
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for label, stats in PARTNERS:
+            self.stdout.write(self.style.WARNING(f'🔍 Verificando estadísticas de {label}...'))
+            if options['check']:
+                mismatches = stats.check_consistency()
+            else:
+                mismatches = stats.rebuild()
+
+            if not mismatches:
+                self.stdout.write(self.style.SUCCESS('✅ Estadísticas consistentes'))
+                continue
+
+            for partner_id, name, expected, actual in mismatches:
+                changes = ', '.join(
+                    f'{field}: {actual[field]} -> {expected[field]}'
+                    for field in expected if expected[field] != actual[field]
+                )
+                self.stdout.write(f'   - {name} (#{partner_id}): {changes}')
+            drifted += len(mismatches)
+            if not options['check']:
+                self.stdout.write(self.style.SUCCESS(f'🎉 {len(mismatches)} {label} corregidos'))
+
+        if options['check'] and drifted:
+            raise CommandError(f'{drifted} clientes/proveedores con estadísticas desactualizadas')
@@ -0,0 +1,81 @@
+"""
+Database connection metrics
+
+``DatabaseConnectionMiddleware`` reports for every request whether the
+database connection was reused (persistent connections, ``CONN_MAX_AGE``)
+or had to be opened, and how long opening it took:
+
+- a ``Server-Timing: db-connect;dur=<ms>;desc="new|reused"`` response
+  header, shown by browser dev tools
+- per process counters (``stats()``): requests, opened and reused
+  connections, reuse rate and average open time
+
+The connection is opened (or health checked) when the request starts
+instead of on the first query, so its cost is measured on its own.
+Disable with ``DB_CONNECTION_METRICS=False``.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+_lock = threading.Lock()
+_counters = {'requests': 0, 'opened': 0, 'reused': 0, 'open_ms': 0.0}
+
+
+def _record(reused, open_ms):
+    with _lock:
+        _counters['requests'] += 1
+        if reused:
+            _counters['reused'] += 1
+        else:
+            _counters['opened'] += 1
+            _counters['open_ms'] += open_ms
+
+
+def stats():
+    """Connection counters of this process"""
+    with _lock:
+        counters = dict(_counters)
+    open_ms = counters.pop('open_ms')
+    counters['reuse_rate'] = (
+        round(counters['reused'] / counters['requests'], 4) if counters['requests'] else None
+    )
+    counters['avg_open_ms'] = round(open_ms / counters['opened'], 3) if counters['opened'] else None
+    return counters
+
+
+def reset_stats():
+    with _lock:
+        _counters.update(requests=0, opened=0, reused=0, open_ms=0.0)
+
+
+class DatabaseConnectionMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'DB_CONNECTION_METRICS', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        connection = connections[DEFAULT_DB_ALIAS]
+        started = time.perf_counter()
+        try:
+            # Drops a reused connection that fails its health check
+            # (CONN_HEALTH_CHECKS), so it counts as a new one
+            connection.close_if_health_check_failed()
+            reused = connection.connection is not None
+            connection.ensure_connection()
+        except DatabaseError:
+            # Leave the error to the view, which reports it as usual
+            return self.get_response(request)
+        open_ms = (time.perf_counter() - started) * 1000
+        _record(reused, open_ms)
+
+        response = self.get_response(request)
+        timing = f'db-connect;dur={open_ms:.2f};desc="{"reused" if reused else "new"}"'
+        if response.has_header('Server-Timing'):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response['Server-Timing'] = timing
+        return response
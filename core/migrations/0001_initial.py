@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'document_sequences',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+import re
+
+from django.db import migrations
+
+DOCUMENTS = [
+    ('sale_order', 'sales', 'SaleOrder', 'order_number'),
+    ('invoice', 'sales', 'Invoice', 'invoice_number'),
+    ('purchase_invoice', 'purchases', 'PurchaseInvoice', 'invoice_number'),
+]
+
+
+def seed_sequences(apps, schema_editor):
+    from core.numbering import create_sequence
+
+    using = schema_editor.connection.alias
+    for key, app_label, model_name, field in DOCUMENTS:
+        model = apps.get_model(app_label, model_name)
+        last = 0
+        for number in model.objects.using(using).values_list(field, flat=True).iterator():
+            match = re.search(r'(\d+)$', number or '')
+            if match:
+                last = max(last, int(match.group(1)))
+        create_sequence(key, last, using=using, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('sales', '0002_initial'),
+        ('purchases', '0002_alter_purchaseinvoice_amount'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 08:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_seed_document_sequences'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=100, unique=True)),
+                ('deleted_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'table_deletions',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import models
+
+
+class DocumentSequence(models.Model):
+    """
+    Last allocated value per document type, used by core.numbering on
+    databases without native sequences
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_value = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'document_sequences'
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+
+class TableDeletion(models.Model):
+    """
+    When rows of a model were last deleted, so core.conditional validators
+    change on deletions without counting the rows
+    """
+    label = models.CharField(max_length=100, unique=True)
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'table_deletions'
+
+    def __str__(self):
+        return f"{self.label}: {self.deleted_at}"
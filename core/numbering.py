@@ -0,0 +1,176 @@
+"""
+Document number allocation
+
+Numbers are handed out in O(1) without scanning the document tables:
+
+- PostgreSQL: one native sequence per document type (``nextval`` is
+  non-transactional, so concurrent workers never block each other or
+  receive the same value).
+- Other databases: a row per document type in ``document_sequences``,
+  advanced with a single atomic ``UPDATE``. Each process reserves blocks
+  of ``DOCUMENT_NUMBER_BLOCK_SIZE`` values and serves them from memory, so
+  most allocations don't touch the database at all.
+
+Numbers are unique but may have gaps (rolled back transactions, unused
+values of a block when a process exits).
+"""
+import threading
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+
+DEFAULT_DOCUMENT_NUMBERS = {
+    'sale_order': {'prefix': 'SO-', 'width': 6},
+    'invoice': {'prefix': 'INV-', 'width': 6},
+    'purchase_invoice': {'prefix': 'PINV-', 'width': 6},
+}
+
+_lock = threading.Lock()
+_blocks = {}  # (alias, key) -> list of [next, last] ranges reserved by this process
+
+
+def get_config(key):
+    """Return the prefix/width configuration of a document type"""
+    config = dict(DEFAULT_DOCUMENT_NUMBERS.get(key, {'prefix': '', 'width': 6}))
+    config.update(getattr(settings, 'DOCUMENT_NUMBERS', {}).get(key, {}))
+    return config
+
+
+def format_number(key, value):
+    config = get_config(key)
+    return f"{config['prefix']}{value:0{config['width']}d}"
+
+
+def next_number(key, using=None):
+    """Allocate and format the next document number for ``key``"""
+    return format_number(key, next_value(key, using))
+
+
+def next_value(key, using=None):
+    """Allocate the next numeric value for ``key``"""
+    using = using or DEFAULT_DB_ALIAS
+    if connections[using].vendor == 'postgresql':
+        return _nextval(key, using)
+
+    with _lock:
+        ranges = _blocks.get((using, key))
+        if ranges:
+            current = ranges[0]
+            value = current[0]
+            if current[0] == current[1]:
+                ranges.pop(0)
+            else:
+                current[0] += 1
+            return value
+
+    size = max(int(getattr(settings, 'DOCUMENT_NUMBER_BLOCK_SIZE', 20)), 1)
+    last = _reserve(key, size, using)
+    first = last - size + 1
+    if size > 1:
+        # Only serve the rest of the block once the reservation is durable;
+        # if the surrounding transaction rolls back another process may be
+        # handed the same block.
+        transaction.on_commit(lambda: _publish(using, key, first + 1, last), using=using)
+    return first
+
+
+def reserve_range(key, count, using=None):
+    """
+    Reserve ``count`` values for ``key`` and return them, in increasing
+    order. Meant for bulk loads that build documents without ``save()``.
+
+    On PostgreSQL the values come from ``nextval`` like any other number,
+    so they may not be consecutive when other sessions allocate at the
+    same time (moving the sequence with ``setval`` would race with them).
+    """
+    using = using or DEFAULT_DB_ALIAS
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(%s) FROM generate_series(1, %s)', [sequence_name(key), count]
+            )
+            return sorted(row[0] for row in cursor.fetchall())
+    last = _reserve(key, count, using)
+    return list(range(last - count + 1, last + 1))
+
+
+def _publish(using, key, first, last):
+    with _lock:
+        _blocks.setdefault((using, key), []).append([first, last])
+
+
+def reset_blocks():
+    """Forget the blocks reserved by this process (remaining values become gaps)"""
+    with _lock:
+        _blocks.clear()
+
+
+def sequence_name(key):
+    return f'document_seq_{key}'
+
+
+def _nextval(key, using):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT nextval(%s)', [sequence_name(key)])
+        return cursor.fetchone()[0]
+
+
+def _reserve(key, size, using):
+    """Advance the sequence row by ``size`` and return the new last value"""
+    connection = connections[using]
+    for _ in range(2):
+        row = None
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            if connection.features.can_return_columns_from_insert:
+                cursor.execute(
+                    'UPDATE document_sequences SET last_value = last_value + %s '
+                    'WHERE name = %s RETURNING last_value',
+                    [size, key]
+                )
+                row = cursor.fetchone()
+            else:
+                cursor.execute(
+                    'UPDATE document_sequences SET last_value = last_value + %s WHERE name = %s',
+                    [size, key]
+                )
+                if cursor.rowcount:
+                    cursor.execute('SELECT last_value FROM document_sequences WHERE name = %s', [key])
+                    row = cursor.fetchone()
+        if row:
+            return row[0]
+        _create_sequence_row(key, using)
+    raise RuntimeError(f'Could not allocate a number for {key}')
+
+
+def _create_sequence_row(key, using, apps=global_apps):
+    DocumentSequence = apps.get_model('core', 'DocumentSequence')
+    try:
+        with transaction.atomic(using=using):
+            DocumentSequence.objects.using(using).create(name=key, last_value=0)
+    except IntegrityError:
+        pass  # created concurrently
+
+
+def create_sequence(key, start=0, using=None, apps=global_apps):
+    """
+    Make sure the sequence for ``key`` exists and continues after
+    ``start``. Used by migrations to seed from existing documents.
+    """
+    DocumentSequence = apps.get_model('core', 'DocumentSequence')
+    using = using or DEFAULT_DB_ALIAS
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        name = sequence_name(key)
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {name}')
+            if start:
+                cursor.execute(
+                    f'SELECT setval(%s, GREATEST(%s, (SELECT last_value FROM {name})), true)',
+                    [name, start]
+                )
+
+    _create_sequence_row(key, using, apps)
+    DocumentSequence.objects.using(using).filter(name=key, last_value__lt=start).update(last_value=start)
@@ -0,0 +1,178 @@
+"""
+Pagination for high-volume collections
+
+``FlexiblePagination`` keeps the page number pagination of the API by
+default and lets each request opt into:
+
+- keyset pagination (``?pagination=keyset``, then follow ``next``): pages
+  are fetched with ``WHERE (created_at, id) < (cursor)`` on the
+  ``(created_at, id)`` index instead of an ``OFFSET`` scan, and no
+  ``COUNT(*)`` is issued. Results are always ordered newest first.
+- approximate counts (``?count=approximate``): on PostgreSQL the count
+  comes from the planner statistics instead of ``COUNT(*)``; other
+  databases (and small results, where estimates are poor) fall back to an
+  exact count.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Below this estimate the exact count is cheap and more useful
+APPROXIMATE_COUNT_THRESHOLD = 10000
+
+
+def approximate_count(queryset):
+    """
+    Estimated number of rows of ``queryset``. Uses ``pg_class.reltuples``
+    for unfiltered tables and the planner's row estimate otherwise.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    query = queryset.query
+    with connection.cursor() as cursor:
+        if not query.where:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+        else:
+            sql, params = queryset.order_by().values('pk').query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        row = cursor.fetchone()
+
+    if not query.where:
+        estimate = int(row[0])
+    else:
+        plan = row[0] if not isinstance(row[0], str) else json.loads(row[0])
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+    # reltuples is -1 (PG 14+) or 0 for tables never analyzed
+    if estimate < APPROXIMATE_COUNT_THRESHOLD:
+        return queryset.count()
+    return estimate
+
+
+class ApproximateCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return approximate_count(self.object_list)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination on ``(created_at, id)``, newest first. The cursor is
+    the position of the last row of the previous page.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = None
+        count_mode = request.query_params.get('count')
+        if count_mode == 'approximate':
+            self.count = approximate_count(queryset)
+        elif count_mode == 'exact':
+            self.count = queryset.count()
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        if cursor:
+            created_at, pk = cursor
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = base64.urlsafe_b64decode(encoded.encode()).decode().rsplit('|', 1)
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError
+            return created_at, int(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, row):
+        if isinstance(row, dict):  # values() rows of compact lists
+            created_at, pk = row['created_at'], row['id']
+        else:
+            created_at, pk = row.created_at, row.pk
+        position = f'{created_at.isoformat()}|{pk}'
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        fields = [('next', self.get_next_link()), ('first', self.get_first_link())]
+        if self.count is not None:
+            fields.insert(0, ('count', self.count))
+        fields.append(('results', data))
+        return Response(OrderedDict(fields))
+
+
+class FlexiblePagination(PageNumberPagination):
+    """
+    Page number pagination with per request keyset pagination
+    (``?pagination=keyset`` or a ``cursor``) and approximate counts
+    (``?count=approximate``).
+    """
+    pagination_query_param = 'pagination'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (request.query_params.get(self.pagination_query_param) == 'keyset'
+                or KeysetPagination.cursor_query_param in request.query_params):
+            self.keyset = KeysetPagination(self.page_size)
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        if request.query_params.get(self.count_query_param) == 'approximate':
+            self.django_paginator_class = ApproximateCountPaginator
+        else:
+            self.django_paginator_class = Paginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,151 @@
+"""
+Serializer query plans
+
+Each serializer gets a plan describing what its fields read from related
+rows, so list endpoints load a page with a fixed number of queries instead
+of a few per row:
+
+- dotted sources (``created_by.full_name``, ``sale_order.customer.name``)
+  become ``select_related`` joins
+- nested serializers are joined with ``select_related``, or loaded with a
+  ``Prefetch`` using their own plan when they need annotations or
+  prefetches themselves
+- nested ``many=True`` serializers (``items``) become a ``Prefetch``
+- serializers declare what can't be derived from the fields, typically
+  ``Count`` annotations, with a ``query_plan`` attribute
+
+Serializer methods that read annotations fall back to a query when the
+annotation is missing, so serializers keep working with any queryset.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+class QueryPlan:
+    """Joins, prefetches and annotations needed to serialize a queryset"""
+
+    def __init__(self, select_related=(), prefetch_related=(), annotations=None):
+        self.select_related = list(select_related)
+        self.prefetch_related = list(prefetch_related)
+        self.annotations = dict(annotations or {})
+
+    def __bool__(self):
+        return bool(self.select_related or self.prefetch_related or self.annotations)
+
+    def merge(self, other):
+        return QueryPlan(
+            select_related=self.select_related + [
+                path for path in other.select_related if path not in self.select_related
+            ],
+            prefetch_related=self.prefetch_related + other.prefetch_related,
+            annotations={**self.annotations, **other.annotations},
+        )
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        return queryset
+
+
+_plans = {}
+
+
+def plan_for(serializer_class):
+    """Return the (cached) query plan of a ModelSerializer class"""
+    if serializer_class not in _plans:
+        _plans[serializer_class] = _build_plan(serializer_class)
+    return _plans[serializer_class]
+
+
+def apply_query_plan(queryset, serializer_class):
+    return plan_for(serializer_class).apply(queryset)
+
+
+def _build_plan(serializer_class):
+    declared = getattr(serializer_class, 'query_plan', None) or QueryPlan()
+    meta = getattr(serializer_class, 'Meta', None)
+    if meta is None or not hasattr(meta, 'model'):
+        return declared
+
+    model = meta.model
+    plan = QueryPlan()
+    for field in serializer_class().fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        if isinstance(field, (serializers.PrimaryKeyRelatedField, serializers.ManyRelatedField)):
+            continue  # served from the local id column / prefetch by DRF itself
+        path = _relation_path(model, field.source_attrs)
+        if not path:
+            continue
+        related_model = _related_model(model, path)
+
+        if isinstance(field, serializers.ListSerializer):
+            plan.prefetch_related.append(Prefetch(
+                '__'.join(path),
+                queryset=apply_query_plan(related_model._default_manager.all(), type(field.child)),
+            ))
+        elif isinstance(field, serializers.ModelSerializer):
+            nested = plan_for(type(field))
+            if nested.prefetch_related or nested.annotations:
+                plan.prefetch_related.append(Prefetch(
+                    '__'.join(path),
+                    queryset=nested.apply(related_model._default_manager.all()),
+                ))
+            else:
+                prefix = '__'.join(path)
+                plan = plan.merge(QueryPlan(
+                    select_related=[prefix] + [f'{prefix}__{p}' for p in nested.select_related]
+                ))
+        else:
+            plan = plan.merge(QueryPlan(select_related=['__'.join(path)]))
+    return plan.merge(declared)
+
+
+def _relation_path(model, attrs):
+    """
+    Longest prefix of ``attrs`` made of relations, e.g. ``['sale_order',
+    'customer']`` for ``sale_order.customer.name``. Reverse and many to
+    many relations are only followed as the whole source (nested
+    ``many=True`` serializers).
+    """
+    path = []
+    for attr in attrs:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        if field.many_to_many or field.one_to_many:
+            return [attr] if not path and len(attrs) == 1 else path
+        path.append(attr)
+        model = field.related_model
+    return path
+
+
+def _related_model(model, path):
+    for attr in path:
+        model = model._meta.get_field(attr).related_model
+    return model
+
+
+class QueryPlanMixin:
+    """
+    ViewSet mixin applying the serializer's query plan to the querysets it
+    serializes (list, retrieve and update responses).
+    """
+    query_plan_actions = ('list', 'retrieve', 'update', 'partial_update')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.uses_query_plan():
+            queryset = apply_query_plan(queryset, self.get_serializer_class())
+        return queryset
+
+    def uses_query_plan(self):
+        return self.action in self.query_plan_actions
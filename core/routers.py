@@ -0,0 +1,177 @@
+"""
+Read replica routing
+
+With replicas configured (``DB_REPLICAS``), ``ReplicaRoutingMiddleware``
+decides per request where reads go and ``ReplicaRouter`` applies it:
+
+- ``ReportViewSet`` actions and GET ``list``/``retrieve`` of every viewset
+  read from a replica (viewsets choose with ``replica_actions``)
+- everything else, and every write, uses the primary (``default``)
+- read-your-writes: after a successful write a client reads from the
+  primary for ``DB_REPLICA_STICKY_SECONDS``. Clients are told apart by
+  the user id of their JWT or their session cookie, without a query
+- replicas lagging more than ``DB_REPLICA_MAX_LAG`` seconds (or down) are
+  skipped, and with none left reads go to the primary. Lag is checked at
+  most every ``DB_REPLICA_LAG_CHECK_INTERVAL`` seconds per process.
+
+The route is reported in a ``Server-Timing: db-route;desc="..."`` header.
+Stickiness is kept in the default cache, so with several workers it needs
+a shared cache backend, like the report cache.
+"""
+import math
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+# Actions read from replicas unless a viewset sets ``replica_actions``
+REPLICA_ACTIONS = ('list', 'retrieve')
+READ_METHODS = ('GET', 'HEAD')
+
+# Alias reads of the current request go to; None for the primary
+_read_alias = ContextVar('read_alias', default=None)
+_lags = {}  # alias -> (checked at, lag in seconds)
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def _measure_lag(alias):
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        # Caught up replicas report no lag even when the primary is idle
+        # (the last replayed transaction gets old); primaries return NULL
+        cursor.execute(
+            'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+            'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+        )
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+def replica_lag(alias):
+    """Seconds ``alias`` is behind the primary (infinite when unreachable)"""
+    now = time.monotonic()
+    checked = _lags.get(alias)
+    if checked and now - checked[0] < settings.DB_REPLICA_LAG_CHECK_INTERVAL:
+        return checked[1]
+    try:
+        lag = _measure_lag(alias)
+    except DatabaseError:
+        lag = math.inf
+    _lags[alias] = (now, lag)
+    return lag
+
+
+def reset_lags():
+    _lags.clear()
+
+
+def client_key(request):
+    """Identifies the client for stickiness: JWT user id or session key"""
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) == 2 and header[0] in jwt_settings.AUTH_HEADER_TYPES:
+        try:
+            return f'user:{AccessToken(header[1])[jwt_settings.USER_ID_CLAIM]}'
+        except (TokenError, KeyError):
+            return None
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    return f'session:{session_key}' if session_key else None
+
+
+def _sticky_key(client):
+    return f'replica-sticky:{client}'
+
+
+def _reads_from_replica(request, view_func):
+    viewset = getattr(view_func, 'cls', None)
+    actions = getattr(view_func, 'actions', None)
+    if request.method not in READ_METHODS or viewset is None or not actions:
+        return False
+    replica_actions = getattr(viewset, 'replica_actions', REPLICA_ACTIONS)
+    return replica_actions == '__all__' or actions.get('get') in replica_actions
+
+
+def _stream(content, alias):
+    # Streaming responses are read after the middleware returns: keep
+    # routing their queries until the stream is consumed or closed
+    token = _read_alias.set(alias)
+    try:
+        yield from content
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        if not replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.db_route = 'primary'
+        token = _read_alias.set(None)
+        try:
+            response = self.get_response(request)
+            if response.streaming:
+                response.streaming_content = _stream(response.streaming_content, _read_alias.get())
+        finally:
+            _read_alias.reset(token)
+
+        client = client_key(request)
+        if request.method not in READ_METHODS and response.status_code < 400 and client:
+            cache.set(_sticky_key(client), True, settings.DB_REPLICA_STICKY_SECONDS)
+
+        timing = f'db-route;desc="{request.db_route}"'
+        if response.has_header('Server-Timing'):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response['Server-Timing'] = timing
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not _reads_from_replica(request, view_func):
+            return None
+        client = client_key(request)
+        if client and cache.get(_sticky_key(client)):
+            request.db_route = 'primary (recent write)'
+            return None
+        available = [alias for alias in replicas() if replica_lag(alias) <= settings.DB_REPLICA_MAX_LAG]
+        if not available:
+            request.db_route = 'primary (replicas lagging)'
+            return None
+        alias = random.choice(available)
+        request.db_route = alias
+        _read_alias.set(alias)
+        return None
+
+
+class ReplicaRouter:
+    """Sends reads to the replica chosen for the request; writes and migrations to the primary"""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
@@ -0,0 +1,1144 @@
+import json
+import re
+import threading
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import skipIf
+
+from django.core.cache import cache as django_cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone as django_timezone
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User
+from inventory.models import Category, Product, StockMovement
+from inventory.serializers import ProductSerializer
+from reports import rollups
+from purchases.ingestion import ingest_purchase_invoices
+from purchases.models import Supplier, PurchaseInvoice
+from sales.models import Customer, SaleOrder, Invoice
+from . import explain, middleware, numbering, routers
+from .renderers import FastJSONParser, FastJSONRenderer
+from .models import DocumentSequence, TableDeletion
+
+
+class DocumentNumberingTest(TestCase):
+    """Tests para la asignación de números de documento"""
+
+    def setUp(self):
+        numbering.reset_blocks()
+
+    def test_numbers_are_formatted_with_prefix_and_width(self):
+        """Test el formato por defecto de los números"""
+        number = numbering.next_number('sale_order')
+        self.assertRegex(number, r'^SO-\d{6}$')
+
+    @override_settings(DOCUMENT_NUMBERS={'sale_order': {'prefix': 'VTA/', 'width': 8}})
+    def test_prefix_and_width_are_configurable(self):
+        """Test que el prefijo y el ancho se configuran en settings"""
+        self.assertRegex(numbering.next_number('sale_order'), r'^VTA/\d{8}$')
+
+    @override_settings(DOCUMENT_NUMBER_BLOCK_SIZE=10)
+    @skipIf(connection.vendor == 'postgresql', 'PostgreSQL uses native sequences')
+    def test_committed_block_is_served_from_memory(self):
+        """Test que el resto del bloque reservado se sirve sin consultas"""
+        with self.captureOnCommitCallbacks(execute=True):
+            first = numbering.next_value('invoice')
+
+        with self.assertNumQueries(0):
+            values = [numbering.next_value('invoice') for _ in range(9)]
+
+        self.assertEqual(values, list(range(first + 1, first + 10)))
+        self.assertEqual(DocumentSequence.objects.get(name='invoice').last_value, first + 9)
+
+    @override_settings(DOCUMENT_NUMBER_BLOCK_SIZE=10)
+    @skipIf(connection.vendor == 'postgresql', 'PostgreSQL uses native sequences')
+    def test_rolled_back_block_is_not_reused(self):
+        """Test que un bloque reservado en una transacción revertida se descarta"""
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                first = numbering.next_value('invoice')
+                raise RuntimeError
+
+        self.assertNotIn(('default', 'invoice'), numbering._blocks)
+        self.assertEqual(numbering.next_value('invoice'), first)
+
+    def test_missing_sequence_is_created(self):
+        """Test que un tipo de documento nuevo empieza en 1"""
+        if connection.vendor == 'postgresql':
+            numbering.create_sequence('credit_note')
+        self.assertEqual(numbering.next_value('credit_note'), 1)
+
+    def test_reserved_values_are_not_handed_out_again(self):
+        """Test que los valores reservados en lote no se repiten en asignaciones posteriores"""
+        reserved = numbering.reserve_range('purchase_invoice', 25)
+        self.assertEqual(len(set(reserved)), 25)
+        self.assertEqual(reserved, sorted(reserved))
+        self.assertGreater(numbering.next_value('purchase_invoice'), reserved[-1])
+
+
+class DocumentNumberingConcurrencyTest(TransactionTestCase):
+    """Stress test: creación concurrente de documentos desde varios hilos"""
+
+    THREADS = 8
+    DOCUMENTS_PER_THREAD = 250
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('In-memory SQLite does not support concurrent writers; '
+                          'set SQLITE_TEST_NAME to a file path')
+        numbering.reset_blocks()
+        self.user = User.objects.create_user(
+            username="stress",
+            email="stress@example.com",
+            password="testpass123"
+        )
+        self.customer = Customer.objects.create(name="Stress Customer")
+
+    def test_parallel_order_creation_has_no_duplicates(self):
+        """Test que miles de órdenes creadas en paralelo no repiten número ni reintentan"""
+        numbers = []
+        errors = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.THREADS)
+
+        def worker():
+            created = []
+            try:
+                start.wait()
+                for _ in range(self.DOCUMENTS_PER_THREAD):
+                    order = SaleOrder.objects.create(
+                        customer=self.customer,
+                        order_date=date.today(),
+                        created_by=self.user
+                    )
+                    invoice = Invoice.objects.create(
+                        sale_order=order,
+                        invoice_date=date.today(),
+                        due_date=date.today() + timedelta(days=30),
+                        amount=0
+                    )
+                    created += [order.order_number, invoice.invoice_number]
+            except Exception as e:
+                errors.append(e)
+            finally:
+                with lock:
+                    numbers.extend(created)
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        expected = self.THREADS * self.DOCUMENTS_PER_THREAD
+        self.assertEqual(errors, [])
+        self.assertEqual(len(numbers), expected * 2)
+        self.assertEqual(len(set(numbers)), expected * 2)
+        self.assertEqual(SaleOrder.objects.values('order_number').distinct().count(), expected)
+        self.assertEqual(Invoice.objects.values('invoice_number').distinct().count(), expected)
+
+    @skipIf(connection.vendor != 'postgresql', 'Checks the native sequences of PostgreSQL')
+    def test_reserve_range_and_next_number_do_not_overlap(self):
+        """Test que reservar rangos mientras otros hilos asignan números no produce duplicados"""
+        values = []
+        errors = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.THREADS)
+
+        def worker(reserve):
+            allocated = []
+            try:
+                start.wait()
+                for _ in range(self.DOCUMENTS_PER_THREAD // 10):
+                    if reserve:
+                        allocated += numbering.reserve_range('sale_order', 10)
+                    else:
+                        allocated += [numbering.next_value('sale_order') for _ in range(10)]
+            except Exception as e:
+                errors.append(e)
+            finally:
+                with lock:
+                    values.extend(allocated)
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(n % 2 == 0,)) for n in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(values), self.THREADS * (self.DOCUMENTS_PER_THREAD // 10) * 10)
+        self.assertEqual(len(set(values)), len(values))
+
+
+class ListEndpointQueryCountTest(TestCase):
+    """Tests que los listados usan una cantidad fija de consultas sin importar el tamaño de la página"""
+
+    ENDPOINTS = [
+        'user-list', 'category-list', 'product-list', 'product-low-stock',
+        'stockmovement-list', 'customer-list', 'saleorder-list', 'saleorderitem-list',
+        'invoice-list', 'supplier-list', 'purchaseinvoice-list',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.created = 0
+
+    def populate(self, count):
+        """Crea ``count`` filas nuevas en cada tabla, con todas sus relaciones"""
+        for _ in range(count):
+            self.created += 1
+            n = self.created
+            user = User.objects.create_user(username=f"user{n}", email=f"user{n}@example.com")
+            category = Category.objects.create(name=f"Category {n}")
+            product = Product.objects.create(
+                name=f"Product {n}",
+                sku=f"QP-{n:03d}",
+                category=category,
+                price=Decimal('10.00'),
+                stock_quantity=0,
+                min_stock_level=5,
+                created_by=user
+            )
+            StockMovement.objects.create(
+                product=product, movement_type='in', quantity=1, created_by=user
+            )
+            customer = Customer.objects.create(name=f"Customer {n}")
+            order = SaleOrder.objects.create(
+                customer=customer, order_date=date.today(), created_by=user
+            )
+            order.add_items(
+                {'product_id': product.id, 'quantity': 1, 'unit_price': Decimal('10.00')}
+                for _ in range(2)
+            )
+            Invoice.objects.create(
+                sale_order=order,
+                invoice_date=date.today(),
+                due_date=date.today() + timedelta(days=30),
+                amount=order.total_amount
+            )
+            supplier = Supplier.objects.create(
+                name=f"Supplier {n}", email=f"supplier{n}@example.com", phone="0", address="-"
+            )
+            ingest_purchase_invoices([{
+                'supplier_id': supplier.id,
+                'invoice_date': date.today(),
+                'due_date': date.today() + timedelta(days=30),
+                'items': [{'product': product.id, 'quantity': 1, 'unit_price': Decimal('5.00')}] * 2,
+            }], user)
+
+    def count_queries(self):
+        counts = {}
+        for name in self.ENDPOINTS:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, status.HTTP_200_OK, name)
+            counts[name] = len(queries)
+        return counts
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        """Test que una página de 2 filas y una de 20 usan las mismas consultas"""
+        self.populate(2)
+        small = self.count_queries()
+        self.populate(18)
+        large = self.count_queries()
+
+        for name in self.ENDPOINTS:
+            with self.subTest(endpoint=name):
+                self.assertEqual(small[name], large[name])
+
+    def test_counts_come_from_annotations(self):
+        """Test que los contadores anotados coinciden con los reales"""
+        self.populate(1)
+        customer = self.client.get(reverse('customer-list')).data['results'][0]
+        self.assertEqual(customer['orders_count'], 1)
+        order = self.client.get(reverse('saleorder-list')).data['results'][0]
+        self.assertEqual(order['customer']['orders_count'], 1)
+        self.assertEqual(len(order['items']), 2)
+        product = self.client.get(reverse('product-list')).data['results'][0]
+        self.assertEqual(product['category']['products_count'], 1)
+
+    def test_compact_lists_read_one_page_query(self):
+        """Test que los listados compactos hacen solo el conteo y la consulta de la página"""
+        self.populate(5)
+        for name in self.ENDPOINTS:
+            if name in ('user-list', 'product-low-stock', 'saleorderitem-list'):
+                continue
+            with self.subTest(endpoint=name):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse(name), {'view': 'compact'})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                # Leaving out the conditional GET high-water and deletion marks
+                page_queries = [
+                    q for q in queries.captured_queries
+                    if 'MAX(' not in q['sql'] and 'table_deletions' not in q['sql']
+                ]
+                self.assertEqual(len(page_queries), 2)
+                self.assertEqual(len(response.data['results']), response.data['count'])
+
+
+class CompactListTest(TestCase):
+    """Tests para los listados compactos (?view=compact y ?fields=)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name="Compact")
+        self.product = Product.objects.create(
+            name="Compact Product", sku="CMP-001", category=self.category,
+            price=Decimal('12.50'), stock_quantity=2, min_stock_level=5, created_by=self.user
+        )
+        Product.objects.create(
+            name="Other Product", sku="CMP-002", price=Decimal('3.00'),
+            stock_quantity=50, min_stock_level=5, max_stock_level=100, created_by=self.user
+        )
+        self.customer = Customer.objects.create(name="Compact Customer")
+        self.order = SaleOrder.objects.create(
+            customer=self.customer, order_date=date.today(), created_by=self.user
+        )
+        self.order.add_items([{'product_id': self.product.id, 'quantity': 2, 'unit_price': Decimal('12.50')}])
+
+    def test_compact_product_has_ids_and_names(self):
+        """Test que el producto compacto devuelve ids y nombres en lugar de objetos anidados"""
+        response = self.client.get(reverse('product-list'), {'view': 'compact', 'search': 'CMP-001'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {
+            'id', 'sku', 'name', 'category_id', 'category_name', 'price',
+            'stock_quantity', 'stock_status', 'is_active',
+        })
+        self.assertEqual(row['category_id'], self.category.id)
+        self.assertEqual(row['category_name'], "Compact")
+        self.assertEqual(row['price'], Decimal('12.50'))
+        self.assertEqual(row['stock_status'], self.product.stock_status)
+
+    def test_compact_stock_status_matches_model(self):
+        """Test que stock_status calculado en SQL coincide con la propiedad del modelo"""
+        rows = self.client.get(reverse('product-list'), {'fields': 'id,stock_status'}).data['results']
+        for row in rows:
+            self.assertEqual(row['stock_status'], Product.objects.get(id=row['id']).stock_status)
+
+    def test_compact_order_has_no_nested_objects(self):
+        """Test que la orden compacta no anida cliente ni items"""
+        row = self.client.get(reverse('saleorder-list'), {'view': 'compact'}).data['results'][0]
+        self.assertEqual(row['customer_id'], self.customer.id)
+        self.assertEqual(row['customer_name'], "Compact Customer")
+        self.assertEqual(row['total_amount'], self.order.total_amount)
+        self.assertNotIn('items', row)
+        self.assertNotIn('customer', row)
+
+    def test_sparse_fieldset(self):
+        """Test que ?fields= devuelve solo las columnas pedidas y en ese orden"""
+        response = self.client.get(reverse('saleorder-list'), {'fields': 'order_number, status'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'order_number': self.order.order_number, 'status': 'draft'}
+        ])
+
+    def test_unknown_field(self):
+        """Test que un campo desconocido responde 400 con los campos disponibles"""
+        response = self.client.get(reverse('saleorder-list'), {'fields': 'id,items'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('items', response.data['fields'])
+        self.assertIn('customer_name', response.data['fields'])
+
+    def test_filters_apply_to_compact_lists(self):
+        """Test que los filtros del listado completo aplican al compacto"""
+        response = self.client.get(reverse('product-list'), {'view': 'compact', 'stock_status': 'low'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.product.id])
+
+    def test_keyset_pagination_without_cursor_fields(self):
+        """Test que la paginación keyset funciona aunque no se pidan id ni created_at"""
+        for _ in range(4):
+            StockMovement.objects.create(
+                product=self.product, movement_type='in', quantity=1, created_by=self.user
+            )
+        url = f"{reverse('stockmovement-list')}?pagination=keyset&page_size=2&fields=quantity"
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data['results'])
+            url = response.data['next']
+        self.assertEqual([len(page) for page in pages], [2, 2])
+        self.assertEqual(pages[0][0], {'quantity': 1})
+
+    def test_full_representation_is_unchanged(self):
+        """Test que sin parámetros se mantiene la representación completa"""
+        row = self.client.get(reverse('saleorder-list')).data['results'][0]
+        self.assertEqual(row['customer']['name'], "Compact Customer")
+        self.assertEqual(len(row['items']), 1)
+
+
+class ConditionalGetTest(TestCase):
+    """Tests para ETag/Last-Modified y ?updated_since= en los catálogos"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name="Catalog")
+        self.product = Product.objects.create(
+            name="Catalog Product", sku="ETAG-001", category=self.category,
+            price=Decimal('10.00'), created_by=self.user
+        )
+        self.other = Product.objects.create(
+            name="Other Product", sku="ETAG-002", price=Decimal('5.00'), created_by=self.user
+        )
+        self.url = reverse('product-list')
+
+    def revalidate(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return self.client.get(url or self.url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_list_returns_304_without_serializing(self):
+        """Test que un listado sin cambios responde 304 sin leer la página"""
+        response = self.client.get(self.url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('Last-Modified', response)
+
+        with CaptureQueriesContext(connection) as queries:
+            revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(revalidated.content, b'')
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+        # Only the deletion marks and the high-water marks of products,
+        # categories and users, without counting their rows
+        self.assertEqual(len(queries), 4)
+        self.assertIn('table_deletions', queries.captured_queries[0]['sql'])
+        for query in queries.captured_queries[1:]:
+            self.assertIn('MAX(', query['sql'])
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_if_modified_since(self):
+        """Test que If-Modified-Since con el Last-Modified recibido responde 304"""
+        response = self.client.get(self.url)
+        revalidated = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def assertChangedBy(self, change, url=None):
+        etag = self.client.get(url or self.url)['ETag']
+        change()
+        response = self.client.get(url or self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_changes_invalidate_the_etag(self):
+        """Test que editar, cambiar stock, borrar o editar la categoría cambia el ETag"""
+        from inventory.stock import change_stock
+
+        def edit():
+            self.product.price = Decimal('11.00')
+            self.product.save()
+
+        def rename_category():
+            self.category.name = "Renamed"
+            self.category.save()
+
+        with self.subTest('edit'):
+            self.assertChangedBy(edit)
+        with self.subTest('stock'):
+            self.assertChangedBy(lambda: change_stock(self.product.id, 5))
+        with self.subTest('category'):
+            self.assertChangedBy(rename_category)
+        with self.subTest('delete'):
+            self.assertChangedBy(self.other.delete)
+
+    def test_deletions_advance_last_modified(self):
+        """Test que borrar filas (incluso la última modificada) invalida también If-Modified-Since"""
+        yesterday = django_timezone.now() - timedelta(days=1)
+        for model in (Product, Category, User):
+            model.objects.update(updated_at=yesterday)
+        last_modified = self.client.get(self.url)['Last-Modified']
+
+        self.product.delete()
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        deleted_at = TableDeletion.objects.get(label=Product._meta.label).deleted_at
+        self.assertEqual(response['Last-Modified'], http_date(deleted_at.timestamp()))
+
+    def test_rolled_back_deletions_keep_the_etag(self):
+        """Test que un borrado revertido no cambia el ETag"""
+        etag = self.client.get(self.url)['ETag']
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.other.delete()
+            raise RuntimeError
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_untracked_models_are_rejected(self):
+        """Test que un listado que lee un modelo sin registrar sus borrados falla"""
+        from inventory.views import ProductViewSet
+
+        view = ProductViewSet(last_modified_models=(Product, StockMovement))
+        with self.assertRaises(ImproperlyConfigured):
+            view.list_validators()
+
+    def test_category_list_depends_on_products(self):
+        """Test que crear un producto cambia el ETag de categorías (products_count)"""
+        self.assertChangedBy(
+            lambda: Product.objects.create(
+                name="New", sku="ETAG-003", category=self.category, price=1, created_by=self.user
+            ),
+            url=reverse('category-list'),
+        )
+
+    def test_compact_lists_are_validated_too(self):
+        """Test que los listados compactos también responden 304"""
+        self.assertEqual(self.revalidate(view='compact').status_code, status.HTTP_304_NOT_MODIFIED)
+        for name in ('category-list', 'customer-list', 'supplier-list'):
+            with self.subTest(endpoint=name):
+                self.assertEqual(self.revalidate(reverse(name)).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_updated_since_returns_only_changed_rows(self):
+        """Test que ?updated_since= devuelve solo las filas modificadas después"""
+        since = self.other.updated_at.isoformat()
+        self.product.name = "Changed Product"
+        self.product.save()
+
+        response = self.client.get(self.url, {'updated_since': since})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.product.id])
+
+        response = self.client.get(reverse('category-list'), {'updated_since': since})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_invalid_updated_since(self):
+        """Test que un updated_since inválido responde 400"""
+        response = self.client.get(self.url, {'updated_since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('updated_since', response.data)
+
+
+class DatabaseConnectionMiddlewareTest(TestCase):
+    """Tests para las métricas de conexiones a la base por request"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123",
+            is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        middleware.reset_stats()
+
+    def test_server_timing_and_counters(self):
+        """Test que cada request informa el tiempo de conexión y cuenta la reutilización"""
+        response = self.client.get(reverse('category-list'))
+        self.assertRegex(response['Server-Timing'], r'db-connect;dur=[0-9.]+;desc="reused"')
+
+        self.client.get(reverse('category-list'))
+        stats = middleware.stats()
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['reused'], 2)
+        self.assertEqual(stats['reuse_rate'], 1.0)
+        self.assertIsNone(stats['avg_open_ms'])
+
+    def test_connection_stats_endpoint(self):
+        """Test que los contadores se consultan en /api/reports/connection_stats/"""
+        response = self.client.get(reverse('report-connection-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['requests'], 1)
+
+    @override_settings(DB_CONNECTION_METRICS=False)
+    def test_can_be_disabled(self):
+        """Test que DB_CONNECTION_METRICS=False desactiva el middleware"""
+        response = self.client.get(reverse('category-list'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(middleware.stats()['requests'], 0)
+
+
+class DatabaseConnectionReuseTest(TransactionTestCase):
+    """Tests de apertura y reutilización de conexiones (requieren una base que se pueda cerrar)"""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('In-memory SQLite connections are never closed; '
+                          'set SQLITE_TEST_NAME to a file path')
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        middleware.reset_stats()
+
+    def test_new_then_reused(self):
+        """Test que la primera request abre la conexión y la siguiente la reutiliza"""
+        connection.close()
+        first = self.client.get(reverse('category-list'))
+        second = self.client.get(reverse('category-list'))
+
+        self.assertIn('desc="new"', first['Server-Timing'])
+        self.assertIn('desc="reused"', second['Server-Timing'])
+        stats = middleware.stats()
+        self.assertEqual((stats['opened'], stats['reused']), (1, 1))
+        self.assertGreater(stats['avg_open_ms'], 0)
+
+
+@override_settings(DATABASE_REPLICAS=['default'], DATABASE_ROUTERS=['core.routers.ReplicaRouter'])
+class ReplicaRoutingTest(TestCase):
+    """Tests para el ruteo de lecturas a réplicas (usa default como réplica de sí misma)"""
+
+    def setUp(self):
+        django_cache.clear()
+        routers.reset_lags()
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.client = self.client_for(self.user)
+        self.customer = Customer.objects.create(name="Replica Customer")
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def route(self, response):
+        self.assertLess(response.status_code, 400)
+        return re.search(r'db-route;desc="([^"]*)"', response['Server-Timing']).group(1)
+
+    def test_reads_go_to_replicas(self):
+        """Test que listados, detalles y reportes leen de la réplica"""
+        self.assertEqual(self.route(self.client.get(reverse('customer-list'))), 'default')
+        self.assertEqual(
+            self.route(self.client.get(reverse('customer-detail', args=[self.customer.id]))), 'default'
+        )
+        self.assertEqual(self.route(self.client.get(reverse('report-inventory-report'))), 'default')
+
+    def test_other_actions_use_the_primary(self):
+        """Test que las acciones que no son de lectura configurada usan la primaria"""
+        self.assertEqual(self.route(self.client.get(reverse('product-low-stock'))), 'primary')
+        response = self.client.post(reverse('customer-list'), {'name': "New"}, format='json')
+        self.assertEqual(self.route(response), 'primary')
+
+    def test_read_your_writes(self):
+        """Test que después de escribir el mismo usuario lee de la primaria y otros no"""
+        self.client.post(reverse('customer-list'), {'name': "New"}, format='json')
+        self.assertEqual(self.route(self.client.get(reverse('customer-list'))), 'primary (recent write)')
+
+        other = User.objects.create_user(username="other", email="other@example.com", password="x")
+        self.assertEqual(self.route(self.client_for(other).get(reverse('customer-list'))), 'default')
+
+    def test_failed_writes_are_not_sticky(self):
+        """Test que una escritura rechazada no fija al usuario en la primaria"""
+        response = self.client.post(reverse('customer-list'), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.route(self.client.get(reverse('customer-list'))), 'default')
+
+    @override_settings(DB_REPLICA_MAX_LAG=-1)
+    def test_lagging_replicas_fall_back_to_primary(self):
+        """Test que si todas las réplicas están atrasadas se lee de la primaria"""
+        self.assertEqual(
+            self.route(self.client.get(reverse('customer-list'))), 'primary (replicas lagging)'
+        )
+
+    def test_client_key(self):
+        """Test que el cliente se identifica por el JWT sin consultar la base"""
+        request = self.client.get(reverse('customer-list')).wsgi_request
+        with self.assertNumQueries(0):
+            self.assertEqual(routers.client_key(request), f'user:{self.user.id}')
+        request.META['HTTP_AUTHORIZATION'] = 'Bearer not-a-token'
+        self.assertIsNone(routers.client_key(request))
+
+
+class ReplicaDatabaseTest(TransactionTestCase):
+    """Tests contra una réplica real (DB_REPLICAS configurado)"""
+    databases = '__all__'
+
+    def setUp(self):
+        if not routers.replicas():
+            self.skipTest('No read replicas configured; set DB_REPLICAS')
+        routers.reset_lags()
+        django_cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_reports_and_lists_query_the_replica(self):
+        """Test que los reportes consultan la réplica y las escrituras la primaria"""
+        replica = routers.replicas()[0]
+        with CaptureQueriesContext(connections[replica]) as replica_queries:
+            response = self.client.get(reverse('report-dashboard-summary'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(replica_queries.captured_queries)
+
+        with CaptureQueriesContext(connections[replica]) as replica_queries:
+            response = self.client.post(reverse('customer-list'), {'name': "New"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(replica_queries.captured_queries)
+
+
+class SummaryEndpointQueryTest(TestCase):
+    """Tests que los endpoints de resumen agregan cada tabla en una sola pasada"""
+
+    ENDPOINTS = [
+        'saleorder-sales-summary', 'purchaseinvoice-purchase-summary',
+        'product-stock-summary', 'report-dashboard-summary',
+    ]
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        customer = Customer.objects.create(name="Cliente")
+        supplier = Supplier.objects.create(
+            name="Proveedor", email="proveedor@example.com", phone="0", address="-"
+        )
+        today = date.today()
+        for i, order_status in enumerate(['draft', 'confirmed', 'delivered', 'delivered']):
+            SaleOrder.objects.create(
+                customer=customer, order_date=today - timedelta(days=40 * i), status=order_status,
+                total_amount=Decimal('100.00'), created_by=self.user
+            )
+        for i, invoice_status in enumerate(['pending', 'partial', 'paid']):
+            PurchaseInvoice.objects.create(
+                supplier=supplier, invoice_date=today - timedelta(days=40 * i),
+                due_date=today, amount=Decimal('50.00'), paid_amount=Decimal('10.00'),
+                status=invoice_status
+            )
+        for i in range(3):
+            Product.objects.create(
+                name=f"Product {i}", sku=f"SUM-{i}", price=Decimal('10.00'),
+                cost_price=Decimal('4.00'), stock_quantity=i * 5, min_stock_level=5,
+                created_by=self.user
+            )
+
+    def test_each_table_is_aggregated_once(self):
+        """Test que cada endpoint hace como mucho una consulta de agregación por tabla"""
+        for name in self.ENDPOINTS:
+            with self.subTest(endpoint=name):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                tables = [
+                    re.search(r'FROM "?(\w+)"?', query['sql']).group(1)
+                    for query in queries.captured_queries
+                    # the dashboard also lists the latest rows, which isn't an aggregate
+                    if re.search(r'\b(SUM|COUNT)\(', query['sql'])
+                ]
+                self.assertEqual(len(tables), len(set(tables)), tables)
+
+    def test_summary_values(self):
+        """Test los valores calculados en una sola pasada"""
+        sales = self.client.get(reverse('saleorder-sales-summary')).data
+        self.assertEqual(sales['total_sales'], 200.0)
+        self.assertEqual(
+            sales['orders_by_status'],
+            [{'status': 'draft', 'count': 1}, {'status': 'confirmed', 'count': 1},
+             {'status': 'delivered', 'count': 2}]
+        )
+
+        purchases = self.client.get(reverse('purchaseinvoice-purchase-summary')).data
+        self.assertEqual(purchases['total_purchases'], 150.0)
+        self.assertEqual(purchases['outstanding_invoices'], {
+            'count': 2, 'total_amount': 100.0, 'total_paid': 20.0, 'balance': 80.0
+        })
+        self.assertIn({'status': 'paid', 'count': 1, 'total_amount': Decimal('50.00')},
+                      purchases['invoices_by_status'])
+
+        stock = self.client.get(reverse('product-stock-summary')).data
+        self.assertEqual(stock, {
+            'total_products': 3, 'low_stock_products': 2, 'out_of_stock': 1,
+            'total_inventory_value': 60.0
+        })
+
+    def test_totals_since_match_separate_queries(self):
+        """Test que los totales combinados coinciden con los calculados por separado"""
+        this_month = date.today().replace(day=1)
+        self.assertEqual(
+            rollups.sales_totals_since(None, this_month),
+            [rollups.sales_totals(), rollups.sales_totals(start=this_month)]
+        )
+        self.assertEqual(
+            rollups.purchase_totals_since(None, this_month),
+            [rollups.purchase_totals(), rollups.purchase_totals(start=this_month)]
+        )
+
+
+class FlexiblePaginationTest(TestCase):
+    """Tests para la paginación por keyset y los conteos aproximados"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        product = Product.objects.create(
+            name="Paged Product", sku="PAGE-001", price=Decimal('10.00'), created_by=self.user
+        )
+        for _ in range(25):
+            StockMovement.objects.create(
+                product=product, movement_type='in', quantity=1, created_by=self.user
+            )
+        # Ties on created_at must be broken by id
+        first_ids = StockMovement.objects.order_by('id').values_list('id', flat=True)[:10]
+        StockMovement.objects.filter(id__in=list(first_ids)).update(
+            created_at=StockMovement.objects.get(id=first_ids[0]).created_at
+        )
+        self.url = reverse('stockmovement-list')
+
+    def test_keyset_pages_cover_every_row_once(self):
+        """Test que recorrer las páginas devuelve cada fila una vez y en orden"""
+        ids = []
+        url = f'{self.url}?pagination=keyset&page_size=7'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            self.assertFalse(any('COUNT(' in q['sql'] for q in queries.captured_queries))
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+
+        expected = list(StockMovement.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_keyset_count_is_optional(self):
+        """Test que el conteo se pide explícitamente en modo keyset"""
+        response = self.client.get(self.url, {'pagination': 'keyset', 'count': 'approximate'})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_invalid_cursor(self):
+        """Test que un cursor inválido responde 404"""
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_is_still_the_default(self):
+        """Test que sin parámetros se mantiene la paginación por número de página"""
+        response = self.client.get(self.url, {'page': 2, 'count': 'approximate'})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['previous'])
+
+
+class HotQueryIndexTest(TestCase):
+    """Tests que las consultas frecuentes usan índices sobre un volumen de datos grande"""
+
+    PRODUCTS = 5000
+    ORDERS = 20000
+    MOVEMENTS = 20000
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username="seed", email="seed@example.com")
+        today = date.today()
+        products = Product.objects.bulk_create([
+            Product(
+                name=f"Product {i}",
+                sku=f"SEED-{i:05d}",
+                price=Decimal('10.00'),
+                # ~2% active products below their minimum level
+                stock_quantity=0 if i % 50 == 0 else 100,
+                min_stock_level=5,
+                created_by=user
+            )
+            for i in range(cls.PRODUCTS)
+        ], batch_size=1000)
+        customers = Customer.objects.bulk_create([
+            Customer(name=f"Customer {i}", email=f"customer{i}@example.com") for i in range(500)
+        ])
+        statuses = ['delivered'] * 6 + ['confirmed', 'shipped', 'cancelled', 'draft']
+        orders = SaleOrder.objects.bulk_create([
+            SaleOrder(
+                order_number=f"SEED-{i:06d}",
+                customer=customers[i % len(customers)],
+                status=statuses[i % len(statuses)],
+                order_date=today - timedelta(days=i % 730),
+                created_by=user
+            )
+            for i in range(cls.ORDERS)
+        ], batch_size=1000)
+        # ~10% of the invoices are still open
+        Invoice.objects.bulk_create([
+            Invoice(
+                invoice_number=f"SEED-{i:06d}",
+                sale_order=order,
+                invoice_date=order.order_date,
+                due_date=order.order_date + timedelta(days=30),
+                amount=Decimal('100.00'),
+                status='pending' if i % 10 == 0 else 'paid'
+            )
+            for i, order in enumerate(orders[:cls.ORDERS // 2])
+        ], batch_size=1000)
+        supplier = Supplier.objects.create(name="Seed Supplier", email="s@example.com", phone="0", address="-")
+        PurchaseInvoice.objects.bulk_create([
+            PurchaseInvoice(
+                invoice_number=f"SEED-{i:06d}",
+                supplier=supplier,
+                invoice_date=today - timedelta(days=i % 730),
+                due_date=today - timedelta(days=i % 730 - 30),
+                amount=Decimal('100.00'),
+                status='pending' if i % 10 == 0 else 'paid'
+            )
+            for i in range(cls.ORDERS // 4)
+        ], batch_size=1000)
+        StockMovement.objects.bulk_create([
+            StockMovement(
+                product=products[i % len(products)],
+                movement_type='in',
+                quantity=1,
+                previous_quantity=0,
+                new_quantity=1,
+                created_by=user
+            )
+            for i in range(cls.MOVEMENTS)
+        ], batch_size=1000)
+        explain.analyze()
+
+    def test_hot_queries_use_indexes(self):
+        """Test que cada consulta frecuente usa uno de sus índices esperados"""
+        results = explain.check_hot_queries()
+        self.assertTrue(results)
+        for name, expected, used in results:
+            with self.subTest(query=name):
+                self.assertTrue(used & set(expected), f'{name} uses {used or "no index"}')
+
+
+class GenerateDatasetCommandTest(TestCase):
+    """Tests para el generador de datasets sintéticos"""
+
+    def generate(self, prefix):
+        call_command(
+            'generate_dataset', scale=0.0005, seed=7, end_date=date(2024, 12, 31),
+            prefix=prefix, stdout=StringIO()
+        )
+
+    def test_generates_consistent_data(self):
+        """Test que el stock, los números de documento y los rollups quedan consistentes"""
+        self.generate('GEN')
+
+        self.assertEqual(SaleOrder.objects.count(), 500)
+        self.assertEqual(StockMovement.objects.count(), 2500)
+        self.assertFalse(SaleOrder.objects.filter(order_date__gt=date(2024, 12, 31)).exists())
+        self.assertEqual(
+            SaleOrder.objects.values('order_number').distinct().count(), SaleOrder.objects.count()
+        )
+        for product in Product.objects.filter(sku__startswith='GEN-'):
+            last = product.stock_movements.order_by('-created_at', '-id').first()
+            if last is not None:
+                self.assertEqual(product.stock_quantity, last.new_quantity)
+        self.assertEqual(rollups.check_consistency(), [])
+
+    def test_same_seed_generates_same_data(self):
+        """Test que la misma semilla genera los mismos datos"""
+        def snapshot(prefix):
+            products = Product.objects.filter(sku__startswith=f'{prefix}-').order_by('id')
+            return [
+                (p.sku.split('-', 1)[1], p.price, p.stock_quantity, p.created_at) for p in products
+            ]
+
+        self.generate('ONE')
+        self.generate('TWO')
+        self.assertEqual(snapshot('ONE'), snapshot('TWO'))
+
+    def test_refuses_to_generate_twice_with_same_prefix(self):
+        """Test que no se duplican datos con el mismo prefijo"""
+        self.generate('GEN')
+        with self.assertRaises(CommandError):
+            self.generate('GEN')
+
+
+class StreamingExportTest(TestCase):
+    """Tests para las exportaciones CSV/NDJSON"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(
+            name="Export Product", sku="EXP-1", price=Decimal('10.00'),
+            cost_price=Decimal('4.00'), stock_quantity=100, created_by=self.user
+        )
+        customer = Customer.objects.create(name="Cliente Export")
+        self.order = SaleOrder.objects.create(
+            customer=customer, order_date=date.today(), created_by=self.user
+        )
+        self.order.add_items(
+            {'product_id': self.product.id, 'quantity': quantity, 'unit_price': Decimal('10.00')}
+            for quantity in (1, 2)
+        )
+        self.empty_order = SaleOrder.objects.create(
+            customer=customer, order_date=date.today(), created_by=self.user
+        )
+
+    def export(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_export_defaults_and_filters(self):
+        """Test que el CSV es el formato por defecto y respeta los filtros del listado"""
+        StockMovement.objects.create(
+            product=self.product, movement_type='out', quantity=5, created_by=self.user
+        )
+        response, body = self.export('stockmovement-export')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('stockmovement.csv', response['Content-Disposition'])
+        lines = body.splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'product_id', 'product_sku'])
+        self.assertEqual(len(lines), 1 + StockMovement.objects.count())
+
+        _, body = self.export('stockmovement-export', format='csv', movement_type='in')
+        self.assertEqual(len(body.splitlines()), 1 + StockMovement.objects.filter(movement_type='in').count())
+
+    def test_sale_orders_with_items(self):
+        """Test que el CSV tiene una fila por item y el NDJSON anida los items de cada orden"""
+        _, body = self.export('saleorder-export', format='csv')
+        self.assertEqual(len(body.splitlines()), 1 + 2 + 1)
+
+        response, body = self.export('saleorder-export', format='ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        orders = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([order['id'] for order in orders], [self.order.id, self.empty_order.id])
+        self.assertEqual([item['quantity'] for item in orders[0]['items']], [1, 2])
+        self.assertEqual(orders[1]['items'], [])
+
+    def test_other_exports(self):
+        """Test las exportaciones de productos, facturas, facturas de compra y el reporte de inventario"""
+        for name in ('product-export', 'invoice-export', 'purchaseinvoice-export'):
+            with self.subTest(export=name):
+                self.export(name, format='ndjson')
+
+        _, body = self.export('report-inventory-report', format='csv')
+        self.assertEqual(Decimal(body.splitlines()[1].split(',')[-1]), Decimal('400'))
+
+        response = self.client.get(reverse('report-inventory-report'))
+        self.assertEqual(response.data['products'][0]['stock_value'], 400.0)
+
+
+class StreamingExportMemoryTest(TestCase):
+    """Tests que las exportaciones usan memoria constante"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def generate(self, movements, prefix):
+        call_command(
+            'generate_dataset', categories=2, products=100, customers=5, suppliers=1, orders=10,
+            purchase_invoices=1, movements=movements, prefix=prefix, stdout=StringIO()
+        )
+        self.client.force_authenticate(user=User.objects.order_by('id').first())
+
+    def measure(self):
+        response = self.client.get(reverse('stockmovement-export'), {'format': 'csv'})
+        tracemalloc.start()
+        try:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return size, peak
+
+    def test_peak_memory_does_not_grow_with_rows(self):
+        """Test que exportar 4 veces más filas no aumenta el pico de memoria"""
+        self.generate(8000, 'SMALL')
+        small_size, small_peak = self.measure()
+        self.generate(24000, 'LARGE')
+        large_size, large_peak = self.measure()
+
+        self.assertGreater(large_size, 3 * small_size)
+        self.assertLess(large_peak, small_peak * 1.25)
+        self.assertLess(large_peak, large_size)
+
+
+class FastJSONRendererTest(TestCase):
+    """Tests para el renderer/parser JSON rápido"""
+
+    def test_renders_same_json_as_stock_renderer(self):
+        """Test que la salida es idéntica a la del JSONRenderer de DRF"""
+        data = {
+            'decimal': Decimal('5499.94'),
+            'datetime': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'date': date(2024, 5, 1),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'text': 'Ñandú \u2028 línea',
+            'nested': [{'a': 1, 'b': [None, True, 1.5]}],
+            7: 'int key',
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_renders_serializer_output_and_indent(self):
+        """Test con datos de serializers y con indentación pedida por el cliente"""
+        user = User.objects.create_user(username="render", email="render@example.com")
+        product = Product.objects.create(name="Render", sku="RND-1", price=Decimal('10.00'), created_by=user)
+        data = ProductSerializer(Product.objects.filter(pk=product.pk), many=True).data
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+        indented = FastJSONRenderer().render({'a': 1}, 'application/json; indent=2')
+        self.assertEqual(json.loads(indented), {'a': 1})
+        self.assertIn(b'\n', indented)
+
+    def test_parser(self):
+        """Test que el parser lee lo mismo que el de DRF y rechaza JSON inválido"""
+        body = '{"sku": "Ñ-1", "quantity": 3, "price": 1.5, "items": [1, 2]}'.encode()
+        self.assertEqual(
+            FastJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body))
+        )
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"sku": '))
+
+    def test_api_uses_fast_renderer(self):
+        """Test que la API responde con el renderer rápido"""
+        user = User.objects.create_user(username="render", email="render@example.com")
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.get(reverse('product-list'))
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
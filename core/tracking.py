@@ -0,0 +1,42 @@
+"""
+Field snapshots used by signal handlers to compute incremental deltas
+"""
+from django.db.models.signals import post_init
+
+
+class FieldTracker:
+    """
+    Keeps the values a set of fields had when an instance was loaded (or
+    last committed), so post_save/post_delete handlers can compute what
+    changed without re-reading the row.
+
+    Fields are given by attname (e.g. ``customer_id``). Each tracker stores
+    its snapshot under its own attribute, so several subsystems can track
+    the same model independently.
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = tuple(fields)
+        self.attr = f'_tracked_{name}'
+
+    def connect(self, model):
+        post_init.connect(
+            self._on_init, sender=model, weak=False,
+            dispatch_uid=f'{self.attr}_{model._meta.label}'
+        )
+
+    def _on_init(self, sender, instance, **kwargs):
+        self.commit(instance)
+
+    def current(self, instance):
+        """Return the current values of the tracked fields"""
+        return {field: instance.__dict__.get(field) for field in self.fields}
+
+    def previous(self, instance):
+        """Return the snapshot taken on load or on the last commit"""
+        return getattr(instance, self.attr, None)
+
+    def commit(self, instance):
+        """Store the current values as the new snapshot"""
+        setattr(instance, self.attr, self.current(instance))
@@ -0,0 +1,65 @@
+"""
+Gunicorn configuration for production
+
+    gunicorn -c gunicorn.conf.py mini_erp.wsgi:application
+
+Every value can be overridden with environment variables (see
+env.prod.example). Migrations and collectstatic are not run here: static
+files are collected when the image is built and migrations run as a
+one-shot step before the web container starts (docker-compose.prod.yml).
+
+Graceful reload: ``kill -HUP <master pid>`` starts new workers and lets
+the old ones finish their requests (``graceful_timeout``). With
+``preload_app`` the code is loaded by the master, so new code needs a new
+container; HUP only picks up configuration changes.
+"""
+import os
+
+# Module level names are gunicorn settings, and ``config`` is one of them:
+# don't import decouple's config by name
+import decouple
+
+
+def _cpu_count():
+    # CPUs this process may run on (honours container CPU sets)
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{decouple.config('PORT', default=8000, cast=int)}"
+
+# (2 x cores) + 1: while a worker waits on the database another one uses the CPU
+workers = decouple.config('WEB_CONCURRENCY', default=_cpu_count() * 2 + 1, cast=int)
+threads = decouple.config('GUNICORN_THREADS', default=1, cast=int)
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Load the application in the master before forking: workers share its
+# memory (copy-on-write) and a broken release fails at startup instead of
+# in every worker
+preload_app = decouple.config('GUNICORN_PRELOAD', default=True, cast=bool)
+
+timeout = decouple.config('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = decouple.config('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+keepalive = decouple.config('GUNICORN_KEEPALIVE', default=5, cast=int)
+
+# Recycle workers now and then to bound memory growth; the jitter keeps
+# them from restarting all at once
+max_requests = decouple.config('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = decouple.config('GUNICORN_MAX_REQUESTS_JITTER', default=100, cast=int)
+
+# Worker heartbeats in memory; /tmp may be a slow overlay filesystem in containers
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = '-'
+errorlog = '-'
+loglevel = decouple.config('GUNICORN_LOG_LEVEL', default='info')
+
+
+def post_fork(server, worker):
+    # Database connections opened by the master while preloading must not
+    # be shared between processes
+    from django.db import connections
+    connections.close_all()
@@ -0,0 +1,150 @@
+"""
+Denormalized category counters
+
+Every category carries the number of its products (all and active ones),
+their total stock and its value at cost (``stock_quantity * cost_price``),
+so category listings and the inventory report read one row per category
+instead of aggregating the products table.
+
+Counters are changed with F() updates inside the transaction that changes
+the products (``inventory.signals``): product saves and deletions through
+post_save/post_delete, stock movements through ``stock_changed``. Like
+any counter row, a category is locked by a writer until its transaction
+commits. Bulk inserts and ``update()`` calls skip the signals: run
+``manage.py rebuild_category_counters`` after them (it also reports how
+far the counters had drifted).
+"""
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from core import counters
+from core.counters import CENT, ZERO, decimal
+from .models import COUNTER_FIELDS
+
+# Product fields the counters depend on (attnames)
+PRODUCT_FIELDS = ('category_id', 'is_active', 'stock_quantity', 'cost_price')
+
+
+def _model(name, apps=global_apps):
+    return apps.get_model('inventory', name)
+
+
+def _value(stock, cost_price):
+    return (stock * decimal(cost_price)).quantize(CENT)
+
+
+def _contribution(values):
+    """Counter values one product adds to its category"""
+    stock = int(values['stock_quantity'] or 0)
+    return {
+        'product_count': 1,
+        'active_product_count': 1 if values['is_active'] else 0,
+        'total_stock': stock,
+        'total_stock_value': _value(stock, values['cost_price']),
+    }
+
+
+def bump(deltas):
+    """Add ``deltas`` ({category_id: {field: change}}) to the categories"""
+    counters.bump(_model('Category'), deltas)
+
+
+def stored_values(product_id, using=None):
+    """``PRODUCT_FIELDS`` of a product as stored (see ``core.counters.stored_values``)"""
+    return counters.stored_values(_model('Product'), product_id, PRODUCT_FIELDS, using)
+
+
+def writes_counted_fields(model, update_fields):
+    return counters.writes_fields(model, PRODUCT_FIELDS, update_fields)
+
+
+def saved_values(product, old, update_fields=None):
+    """``PRODUCT_FIELDS`` as a save of ``product`` left them in the row"""
+    return counters.saved_values(product, PRODUCT_FIELDS, old, update_fields)
+
+
+def apply_product_change(old, new):
+    """
+    Move a product's contribution from ``old`` to ``new`` (values of
+    ``PRODUCT_FIELDS``; None for a created or deleted product)
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for values, sign in ((old, -1), (new, 1)):
+        if values and values['category_id']:
+            for field, value in _contribution(values).items():
+                deltas[values['category_id']][field] += sign * value
+    bump(deltas)
+
+
+def apply_stock_change(deltas):
+    """Add stock changes ({product_id: change}) applied with UPDATE statements"""
+    Product = _model('Product')
+    changes = defaultdict(lambda: defaultdict(int))
+    products = Product.objects.filter(pk__in=deltas, category__isnull=False)
+    for pk, category_id, cost_price in products.values_list('pk', 'category_id', 'cost_price'):
+        changes[category_id]['total_stock'] += deltas[pk]
+        changes[category_id]['total_stock_value'] += _value(deltas[pk], cost_price)
+    bump(changes)
+
+
+# ---------------------------------------------------------------------------
+# Rebuild and consistency checks
+# ---------------------------------------------------------------------------
+
+def compute_from_raw(category_ids=None, apps=global_apps):
+    """``{category_id: counters}`` aggregated from the products table"""
+    Category = _model('Category', apps)
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(pk__in=category_ids)
+    value = ExpressionWrapper(
+        F('products__stock_quantity') * F('products__cost_price'),
+        output_field=DecimalField(max_digits=16, decimal_places=2),
+    )
+    rows = categories.order_by().values('pk').annotate(
+        product_count=Count('products'),
+        active_product_count=Count('products', filter=Q(products__is_active=True)),
+        total_stock=Coalesce(Sum('products__stock_quantity'), 0),
+        total_stock_value=Coalesce(Sum(value), ZERO),
+    )
+    return {
+        row.pop('pk'): {
+            **row,
+            'total_stock_value': decimal(row['total_stock_value']).quantize(CENT),
+        }
+        for row in rows
+    }
+
+
+def rebuild(category_ids=None, apps=global_apps):
+    """
+    Recompute the counters of ``category_ids`` (every category by default).
+    Returns the drift found, as ``check_consistency`` does.
+    """
+    Category = _model('Category', apps)
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(pk__in=category_ids)
+    with transaction.atomic():
+        # Lock the rows so no incremental update lands between reading and writing
+        list(categories.select_for_update().order_by('pk').values_list('pk', flat=True))
+        mismatches = check_consistency(category_ids, apps)
+        for category_id, _, expected, _ in mismatches:
+            Category.objects.filter(pk=category_id).update(**expected)
+    return mismatches
+
+
+def check_consistency(category_ids=None, apps=global_apps):
+    """
+    Compare the counters against the products table. Returns a list of
+    ``(category_id, name, expected, actual)``, empty when consistent.
+    """
+    Category = _model('Category', apps)
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(pk__in=category_ids)
+    return counters.mismatches(categories, compute_from_raw(category_ids, apps), COUNTER_FIELDS, None)
@@ -0,0 +1,115 @@
+"""
+SKU lookups for point of sale scanners
+
+``lookup(skus)`` resolves SKUs to a compact product payload (id, sku,
+name, price, stock) through a per-process LRU cache, so repeated scans
+of the same products don't reach the database. Unknown SKUs are cached
+too (a mistyped code scanned again stays cheap).
+
+Entries are dropped once the transaction that saves or deletes a product,
+or changes its stock, commits (``inventory.signals``). That only reaches
+the cache of the process doing the change: entries also expire after
+``TIMEOUT`` seconds, which bounds how stale other workers can be.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import Product
+
+DEFAULTS = {
+    'MAX_SIZE': 10000,
+    'TIMEOUT': 5,
+}
+FIELDS = ('id', 'sku', 'name', 'price', 'stock_quantity', 'is_active')
+# SKUs per batch lookup
+MAX_BATCH = 200
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'PRODUCT_LOOKUP', {})}
+
+
+class LookupCache:
+    """Thread-safe LRU of sku -> payload (None for unknown SKUs)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()  # sku -> (expires at, payload)
+            self._skus = {}  # product id -> sku, to invalidate by id
+            self.hits = self.misses = 0
+
+    def get_many(self, skus):
+        """Cached payloads of ``skus`` and the SKUs that must be fetched"""
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for sku in skus:
+                entry = self._entries.get(sku)
+                if entry is None or entry[0] <= now:
+                    missing.append(sku)
+                    continue
+                self._entries.move_to_end(sku)
+                found[sku] = entry[1]
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def set_many(self, payloads):
+        config = get_config()
+        expires = time.monotonic() + config['TIMEOUT']
+        with self._lock:
+            for sku, payload in payloads.items():
+                self._discard(sku)
+                self._entries[sku] = (expires, payload)
+                if payload is not None:
+                    self._skus[payload['id']] = sku
+            while len(self._entries) > config['MAX_SIZE']:
+                sku, (_, payload) = self._entries.popitem(last=False)
+                if payload is not None:
+                    self._skus.pop(payload['id'], None)
+
+    def _discard(self, sku):
+        entry = self._entries.pop(sku, None)
+        if entry and entry[1] is not None:
+            self._skus.pop(entry[1]['id'], None)
+
+    def invalidate(self, product_ids=(), skus=()):
+        with self._lock:
+            for product_id in product_ids:
+                sku = self._skus.get(product_id)
+                if sku is not None:
+                    self._discard(sku)
+            for sku in skus:
+                self._discard(sku)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+cache = LookupCache()
+
+
+def lookup(skus):
+    """sku -> payload (None when no product has it) for ``skus``"""
+    found, missing = cache.get_many(skus)
+    if missing:
+        fetched = dict.fromkeys(missing)
+        for row in Product.objects.filter(sku__in=missing).values(*FIELDS):
+            fetched[row['sku']] = row
+        cache.set_many(fetched)
+        found.update(fetched)
+    return found
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de productos y stock de cada categoría e informa las diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Solo informa las diferencias, sin corregirlas (termina con error si las hay)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('🔍 Verificando contadores de categorías...'))
+        if options['check']:
+            mismatches = counters.check_consistency()
+        else:
+            mismatches = counters.rebuild()
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('✅ Contadores consistentes'))
+            return
+
+        for category_id, name, expected, actual in mismatches:
+            changes = ', '.join(
+                f'{field}: {actual[field]} -> {expected[field]}'
+                for field in expected if expected[field] != actual[field]
+            )
+            self.stdout.write(f'   - {name} (#{category_id}): {changes}')
+
+        if options['check']:
+            raise CommandError(f'{len(mismatches)} categorías con contadores desactualizados')
+        self.stdout.write(self.style.SUCCESS(f'🎉 {len(mismatches)} categorías corregidas'))
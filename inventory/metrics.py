@@ -0,0 +1,12 @@
+"""
+Summary metrics of products (see core/aggregation.py)
+"""
+from django.db.models import Count, F, Q, Sum
+
+from core.aggregation import register
+from .models import Product
+
+register(Product, 'total_products', Count('id'))
+register(Product, 'low_stock_products', Count('id', filter=Q(stock_quantity__lte=F('min_stock_level'))))
+register(Product, 'out_of_stock', Count('id', filter=Q(stock_quantity=0)))
+register(Product, 'total_inventory_value', Sum(F('stock_quantity') * F('cost_price')))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_alter_product_category_alter_product_cost_price_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['created_at', 'id'], name='stock_mov_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_stockmovement_stock_mov_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'stock_quantity'], name='product_active_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True), ('stock_quantity__lte', models.F('min_stock_level'))), fields=['stock_quantity'], name='product_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', 'created_at'], name='stock_mov_product_created_idx'),
+        ),
+    ]
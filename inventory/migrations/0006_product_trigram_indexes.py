@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from core.indexes import TrigramIndexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_product_product_active_stock_idx_and_more'),
+    ]
+
+    operations = [
+        TrigramIndexes('products', ['name', 'sku']),
+    ]
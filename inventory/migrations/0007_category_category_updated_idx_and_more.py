@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_product_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['updated_at'], name='category_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at'], name='product_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:39
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    from inventory.counters import rebuild
+    rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_category_category_updated_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='active_product_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='total_stock',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='total_stock_value',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=16),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
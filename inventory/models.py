@@ -1,23 +1,39 @@
-from django.db import models
+from django.db import models, router, transaction
+from core.counters import protect_counters
 from users.models import User
 
 
+COUNTER_FIELDS = ('product_count', 'active_product_count', 'total_stock', 'total_stock_value')
+
+
 class Category(models.Model):
     """
     Product category model
     """
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
+    # Totals of the category's products, maintained by inventory.counters
+    product_count = models.IntegerField(default=0, editable=False)
+    active_product_count = models.IntegerField(default=0, editable=False)
+    total_stock = models.BigIntegerField(default=0, editable=False)
+    total_stock_value = models.DecimalField(max_digits=16, decimal_places=2, default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'categories'
         verbose_name_plural = 'Categories'
+        indexes = [
+            # High-water mark for conditional GETs (core.conditional)
+            models.Index(fields=['updated_at'], name='category_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **protect_counters(self, COUNTER_FIELDS, kwargs))
+
 
 class Product(models.Model):
     """
@@ -39,6 +55,17 @@ class Product(models.Model):
 
     class Meta:
         db_table = 'products'
+        indexes = [
+            models.Index(fields=['is_active', 'stock_quantity'], name='product_active_stock_idx'),
+            # High-water mark for conditional GETs and ?updated_since= (core.conditional)
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
+            # Only active low-stock products, a small fraction of the table
+            models.Index(
+                fields=['stock_quantity'],
+                condition=models.Q(is_active=True, stock_quantity__lte=models.F('min_stock_level')),
+                name='product_low_stock_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.sku})"
@@ -76,23 +103,31 @@ class StockMovement(models.Model):
     class Meta:
         db_table = 'stock_movements'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination (core.pagination)
+            models.Index(fields=['created_at', 'id'], name='stock_mov_created_id_idx'),
+            models.Index(fields=['product', 'created_at'], name='stock_mov_product_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.movement_type} ({self.quantity})"
 
     def save(self, *args, **kwargs):
-        if not self.pk:  # Only on creation
-            self.previous_quantity = self.product.stock_quantity
-            if self.movement_type in ['in', 'return']:
-                self.new_quantity = self.previous_quantity + self.quantity
-            else:
-                # Check if we have enough stock
-                if self.previous_quantity < self.quantity:
-                    raise ValueError(f"Insufficient stock. Available: {self.previous_quantity}, Requested: {self.quantity}")
-                self.new_quantity = self.previous_quantity - self.quantity
-            
-            # Update product stock
+        if self.pk:
+            return super().save(*args, **kwargs)
+
+        # Imported here, inventory.stock depends on this module
+        from .stock import change_stock, signed_quantity
+
+        # Stock is changed with one conditional UPDATE (only the stock row is
+        # written, never below zero); previous/new quantities come from the
+        # database, so they stay exact under concurrent movements
+        using = kwargs.get('using') or router.db_for_write(StockMovement, instance=self)
+        change = signed_quantity(self.movement_type, self.quantity)
+        with transaction.atomic(using=using):
+            self.new_quantity = change_stock(self.product_id, change, using=using)
+            self.previous_quantity = self.new_quantity - change
+            super().save(*args, **kwargs)
+
+        if StockMovement.product.is_cached(self):
             self.product.stock_quantity = self.new_quantity
-            self.product.save()
-        
-        super().save(*args, **kwargs)
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .lookup import MAX_BATCH
 from .models import Category, Product, StockMovement
 
 
@@ -6,15 +7,18 @@ class CategorySerializer(serializers.ModelSerializer):
     """
     Serializer for Category model
     """
-    products_count = serializers.SerializerMethodField()
+    # Maintained counters (inventory/counters.py), read without touching products
+    products_count = serializers.ReadOnlyField(source='product_count')
 
     class Meta:
         model = Category
-        fields = ['id', 'name', 'description', 'products_count', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
-
-    def get_products_count(self, obj):
-        return obj.products.count()
+        fields = [
+            'id', 'name', 'description', 'products_count', 'active_product_count',
+            'total_stock', 'total_stock_value', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'active_product_count', 'total_stock', 'total_stock_value', 'created_at', 'updated_at'
+        ]
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -61,6 +65,44 @@ class StockMovementSerializer(serializers.ModelSerializer):
         ]
 
 
+class StockMovementInputSerializer(serializers.Serializer):
+    """
+    Serializer for validating one movement of a bulk request
+    """
+    product = serializers.IntegerField()
+    movement_type = serializers.ChoiceField(choices=StockMovement.MOVEMENT_TYPES)
+    quantity = serializers.IntegerField(min_value=1)
+    reference = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class StockMovementBulkCreateSerializer(serializers.Serializer):
+    """
+    Serializer for applying many stock movements in one request
+    """
+    movements = StockMovementInputSerializer(many=True, allow_empty=False)
+
+    def validate_movements(self, movements):
+        # Check every referenced product with a single query
+        product_ids = {movement['product'] for movement in movements}
+        existing = set(Product.objects.filter(id__in=product_ids).values_list('id', flat=True))
+        missing = sorted(product_ids - existing)
+        if missing:
+            raise serializers.ValidationError(
+                f"Products not found: {', '.join(str(pk) for pk in missing)}"
+            )
+        return movements
+
+
+class ProductLookupSerializer(serializers.Serializer):
+    """
+    Serializer for resolving many SKUs in one request
+    """
+    skus = serializers.ListField(
+        child=serializers.CharField(max_length=50), allow_empty=False, max_length=MAX_BATCH
+    )
+
+
 class ProductStockSerializer(serializers.ModelSerializer):
     """
     Serializer for product stock information
@@ -0,0 +1,89 @@
+"""
+Signal handlers keeping the SKU lookup cache and the category counters current
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core import conditional
+from core.tracking import FieldTracker
+from users.models import User
+from . import counters
+from .lookup import cache
+from .models import Category, Product
+from .stock import stock_changed
+
+# A product whose SKU changes must drop the entry of the old one as well
+sku_tracker = FieldTracker('lookup', ['sku'])
+sku_tracker.connect(Product)
+
+
+@receiver(post_save, sender=Product, dispatch_uid='product_lookup_save')
+def product_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = (sku_tracker.previous(instance) or {}).get('sku')
+    product_id, skus = instance.pk, [sku for sku in {previous, instance.sku} if sku]
+    transaction.on_commit(lambda: cache.invalidate([product_id], skus))
+    sku_tracker.commit(instance)
+
+
+@receiver(post_delete, sender=Product, dispatch_uid='product_lookup_delete')
+def product_deleted(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: cache.invalidate([product_id]))
+
+
+@receiver(stock_changed, dispatch_uid='product_lookup_stock')
+def stock_updated(sender, product_ids, **kwargs):
+    transaction.on_commit(lambda: cache.invalidate(product_ids))
+
+
+
+# Category counters (inventory/counters.py), in the same transaction. The
+# values a save replaces are read from the row: stock changes with UPDATE
+# statements, so loaded instances often hold an outdated stock.
+@receiver(pre_save, sender=Product, dispatch_uid='product_counters_pre_save')
+def product_counters_saving(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if raw or instance._state.adding or not counters.writes_counted_fields(sender, update_fields):
+        return
+    instance._counter_values = counters.stored_values(instance.pk, using)
+
+
+@receiver(post_save, sender=Product, dispatch_uid='product_counters_save')
+def product_counters_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    old = None if created else instance.__dict__.pop('_counter_values', None)
+    if old is None and not created:
+        # None of the counted fields was written
+        return
+    new = counters.saved_values(instance, old, update_fields)
+    if old != new:
+        counters.apply_product_change(old, new)
+
+
+@receiver(pre_delete, sender=Product, dispatch_uid='product_counters_pre_delete')
+def product_counters_deleting(sender, instance, using=None, **kwargs):
+    instance._counter_values = counters.stored_values(instance.pk, using)
+
+
+@receiver(post_delete, sender=Product, dispatch_uid='product_counters_delete')
+def product_counters_deleted(sender, instance, **kwargs):
+    counters.apply_product_change(instance.__dict__.pop('_counter_values', None), None)
+
+
+@receiver(stock_changed, dispatch_uid='product_counters_stock')
+def stock_counters_changed(sender, product_ids, deltas=None, **kwargs):
+    if deltas is not None:
+        counters.apply_stock_change(deltas)
+        return
+    # Some changes were skipped: recompute the categories involved
+    category_ids = set(
+        Product.objects.filter(pk__in=product_ids, category__isnull=False).values_list('category_id', flat=True)
+    )
+    counters.rebuild(category_ids)
+
+
+# Deletions change the validators of the category and product lists (core.conditional)
+conditional.track_deletions(Category, Product, User)
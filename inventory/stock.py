@@ -0,0 +1,184 @@
+"""
+Set-based stock updates
+
+Applies many stock movements in one transaction: the affected products are
+locked once (in id order, so concurrent callers can't deadlock), their
+stock is changed with F() expressions, and the StockMovement audit rows are
+written with bulk_create.
+
+The UPDATE itself only matches rows whose stock stays non-negative, so
+stock can't be oversold even on backends without row locks (SQLite).
+"""
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.lookups import GreaterThanOrEqual
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Product, StockMovement
+
+INCREASING_TYPES = ('in', 'return')
+
+# Products per UPDATE statement, keeps the CASE expression within the
+# parameter limits of every backend
+UPDATE_BATCH_SIZE = 200
+
+# Sent after stock is changed with UPDATE statements, which bypass
+# Product's post_save (sender=Product, product_ids=[...], deltas={id: change}).
+# ``deltas`` is None when some of the requested changes were skipped.
+stock_changed = Signal()
+
+
+class InsufficientStockError(ValueError):
+    """
+    Raised when movements would leave products with negative stock. Lists
+    every shortfall, not only the first one.
+    """
+
+    def __init__(self, shortfalls):
+        self.shortfalls = shortfalls
+        super().__init__('; '.join(
+            f"Insufficient stock for {s['product_name']}. "
+            f"Available: {s['available']}, Required: {s['required']}"
+            for s in shortfalls
+        ))
+
+
+def signed_quantity(movement_type, quantity):
+    return quantity if movement_type in INCREASING_TYPES else -quantity
+
+
+def apply_movements(entries, user):
+    """
+    Apply stock movements and record them.
+
+    ``entries`` is a list of dicts with ``product_id``, ``movement_type``,
+    ``quantity`` (positive) and optional ``reference``/``notes``. Raises
+    InsufficientStockError (and changes nothing) if any product would go
+    below zero. Returns the created StockMovement objects.
+    """
+    if not entries:
+        return []
+
+    with transaction.atomic():
+        product_ids = sorted({entry['product_id'] for entry in entries})
+        locked = list(
+            Product.objects.select_for_update()
+            .filter(id__in=product_ids)
+            .order_by('id')
+            .values_list('id', 'stock_quantity', 'name')
+        )
+        stock = {pk: quantity for pk, quantity, _ in locked}
+        names = {pk: name for pk, _, name in locked}
+        missing = sorted(set(product_ids) - set(stock))
+        if missing:
+            raise Product.DoesNotExist(f"Products not found: {', '.join(map(str, missing))}")
+
+        original = dict(stock)
+        required = {}
+        movements = []
+        for entry in entries:
+            product_id = entry['product_id']
+            change = signed_quantity(entry['movement_type'], entry['quantity'])
+            if change < 0:
+                required[product_id] = required.get(product_id, 0) - change
+            previous = stock[product_id]
+            stock[product_id] = previous + change
+            movements.append(StockMovement(
+                product_id=product_id,
+                movement_type=entry['movement_type'],
+                quantity=entry['quantity'],
+                previous_quantity=previous,
+                new_quantity=stock[product_id],
+                reference=entry.get('reference', ''),
+                notes=entry.get('notes', ''),
+                created_by=user,
+            ))
+
+        deltas = {pk: stock[pk] - original[pk] for pk in product_ids}
+        shortfalls = _shortfalls(original, deltas, required, names)
+        if shortfalls:
+            raise InsufficientStockError(shortfalls)
+
+        if update_stock(deltas) < len([change for change in deltas.values() if change]):
+            # Stock changed after it was read (no row locks on this backend),
+            # the guarded UPDATE skipped some rows: report the current values
+            # and roll everything back.
+            current = dict(Product.objects.filter(id__in=product_ids).values_list('id', 'stock_quantity'))
+            raise InsufficientStockError(_shortfalls(current, deltas, required, names))
+        StockMovement.objects.bulk_create(movements)
+    return movements
+
+
+def _shortfalls(available, deltas, required, names):
+    return [
+        {
+            'product_id': pk,
+            'product_name': names[pk],
+            'available': available[pk],
+            'required': required[pk],
+        }
+        for pk in sorted(deltas) if available[pk] + deltas[pk] < 0
+    ]
+
+
+def update_stock(deltas):
+    """
+    Add ``deltas`` ({product_id: change}) to the products' stock with one
+    F()-based UPDATE per batch of products. Rows that would go below zero
+    are left untouched; returns the number of updated rows.
+    """
+    deltas = {pk: change for pk, change in deltas.items() if change}
+    product_ids = sorted(deltas)
+    now = timezone.now()
+    updated = 0
+    for start in range(0, len(product_ids), UPDATE_BATCH_SIZE):
+        batch = product_ids[start:start + UPDATE_BATCH_SIZE]
+        new_quantity = F('stock_quantity') + Case(
+            *[When(id=pk, then=Value(deltas[pk])) for pk in batch],
+            output_field=IntegerField(),
+        )
+        updated += Product.objects.filter(
+            GreaterThanOrEqual(new_quantity, 0), id__in=batch
+        ).update(stock_quantity=new_quantity, updated_at=now)
+    if updated:
+        stock_changed.send(
+            sender=Product, product_ids=product_ids, deltas=deltas if updated == len(product_ids) else None
+        )
+    return updated
+
+
+def change_stock(product_id, change, using=None):
+    """
+    Add ``change`` to a product's stock with a single conditional UPDATE
+    and return the new quantity. Concurrent callers never lose updates and
+    the stock never goes below zero; raises ValueError otherwise.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    connection = connections[using]
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        sql = (
+            'UPDATE products SET stock_quantity = stock_quantity + %s, updated_at = %s '
+            'WHERE id = %s AND stock_quantity + %s >= 0'
+        )
+        params = [change, now, product_id, change]
+        if connection.features.can_return_columns_from_insert:
+            cursor.execute(sql + ' RETURNING stock_quantity', params)
+            row = cursor.fetchone()
+        else:
+            # The UPDATE keeps the row locked, so reading it back is exact
+            cursor.execute(sql, params)
+            row = None
+            if cursor.rowcount:
+                cursor.execute('SELECT stock_quantity FROM products WHERE id = %s', [product_id])
+                row = cursor.fetchone()
+        if row:
+            stock_changed.send(sender=Product, product_ids=[product_id], deltas={product_id: change})
+            return row[0]
+
+        cursor.execute('SELECT stock_quantity FROM products WHERE id = %s', [product_id])
+        current = cursor.fetchone()
+    if current is None:
+        raise Product.DoesNotExist(f'Product not found: {product_id}')
+    raise ValueError(f"Insufficient stock. Available: {current[0]}, Requested: {-change}")
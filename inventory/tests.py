@@ -1,7 +1,21 @@
-from django.test import TestCase
+import threading
+from decimal import Decimal
+from io import StringIO
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
 from users.models import User
+from . import counters
+from .lookup import cache as lookup_cache
 from .models import Category, Product, StockMovement
+from .stock import apply_movements
 
 
 class CategoryModelTest(TestCase):
@@ -228,3 +242,331 @@ class StockMovementModelTest(TestCase):
                 quantity=100,  # Más que el stock disponible (50)
                 created_by=self.user
             )
+    
+    def test_stock_movement_only_writes_stock(self):
+        """Test que el movimiento no pisa otros campos modificados en paralelo"""
+        stale = Product.objects.get(pk=self.product.pk)
+        Product.objects.filter(pk=self.product.pk).update(price=150.00, stock_quantity=40)
+        
+        movement = StockMovement.objects.create(
+            product=stale,
+            movement_type="out",
+            quantity=5,
+            created_by=self.user
+        )
+        
+        self.assertEqual((movement.previous_quantity, movement.new_quantity), (40, 35))
+        self.assertEqual(stale.stock_quantity, 35)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 35)
+        self.assertEqual(float(self.product.price), 150.00)
+
+
+class StockMovementBulkAPITest(TestCase):
+    """Tests para el endpoint de movimientos de stock en lote"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.products = Product.objects.bulk_create([
+            Product(
+                name=f"Product {i}",
+                sku=f"SCAN-{i:03d}",
+                price=10.00,
+                stock_quantity=10,
+                created_by=self.user
+            )
+            for i in range(3)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('stockmovement-bulk')
+    
+    def test_bulk_movements_are_applied(self):
+        """Test que se aplican todos los movimientos con cantidades exactas"""
+        product = self.products[0]
+        response = self.client.post(self.url, {"movements": [
+            {"product": product.id, "movement_type": "in", "quantity": 5},
+            {"product": product.id, "movement_type": "out", "quantity": 8},
+            {"product": self.products[1].id, "movement_type": "adjustment", "quantity": 10},
+        ]}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        quantities = [(m['previous_quantity'], m['new_quantity']) for m in response.data['movements']]
+        self.assertEqual(quantities, [(10, 15), (15, 7), (10, 0)])
+        self.assertEqual(Product.objects.get(pk=product.pk).stock_quantity, 7)
+        self.assertEqual(StockMovement.objects.count(), 3)
+    
+    def test_bulk_movements_are_all_or_nothing(self):
+        """Test que un faltante rechaza todo el lote"""
+        response = self.client.post(self.url, {"movements": [
+            {"product": self.products[0].id, "movement_type": "in", "quantity": 5},
+            {"product": self.products[1].id, "movement_type": "out", "quantity": 11},
+        ]}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['shortfalls'][0]['product_id'], self.products[1].id)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock_quantity, 10)
+        self.assertFalse(StockMovement.objects.exists())
+    
+    def test_adjust_stock_rejects_negative_stock(self):
+        """Test que adjust_stock responde 400 si no alcanza el stock"""
+        url = reverse('product-adjust-stock', kwargs={'pk': self.products[0].pk})
+        response = self.client.post(url, {"quantity": 50, "movement_type": "out"}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock_quantity, 10)
+
+
+class ProductLookupAPITest(TestCase):
+    """Tests para la búsqueda de productos por SKU con cache"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.product = Product.objects.create(
+            name="Scanner Product",
+            sku="SCAN-001",
+            price=Decimal('10.00'),
+            stock_quantity=10,
+            created_by=self.user
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('product-lookup')
+        lookup_cache.clear()
+
+    def test_lookup_is_cached(self):
+        """Test que la segunda búsqueda del mismo SKU no consulta la base de datos"""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'sku': 'SCAN-001'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'id': self.product.id, 'sku': 'SCAN-001', 'name': 'Scanner Product',
+            'price': Decimal('10.00'), 'stock_quantity': 10, 'is_active': True,
+        })
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'sku': 'SCAN-001'})
+        self.assertEqual(response.data['id'], self.product.id)
+        self.assertEqual(lookup_cache.stats()['hits'], 1)
+
+    def test_lookup_unknown_and_invalid_sku(self):
+        """Test que un SKU desconocido responde 404 y uno vacío 400"""
+        self.assertEqual(self.client.get(self.url, {'sku': 'NOPE'}).status_code, status.HTTP_404_NOT_FOUND)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, {'sku': 'NOPE'}).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_lookup(self):
+        """Test que la búsqueda en lote resuelve varios SKUs en una consulta"""
+        other = Product.objects.create(name="Other", sku="SCAN-002", price=Decimal('5.00'), created_by=self.user)
+
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                self.url, {'skus': ['SCAN-002', 'NOPE', 'SCAN-001', 'SCAN-002']}, format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([product['id'] for product in response.data['results']], [other.id, self.product.id])
+        self.assertEqual(response.data['missing'], ['NOPE'])
+
+        response = self.client.post(self.url, {'skus': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cache_is_invalidated(self):
+        """Test que guardar, mover stock o eliminar un producto invalida el cache"""
+        self.client.get(self.url, {'sku': 'SCAN-001'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movements([{'product_id': self.product.id, 'movement_type': 'out', 'quantity': 3}], self.user)
+        self.assertEqual(self.client.get(self.url, {'sku': 'SCAN-001'}).data['stock_quantity'], 7)
+
+        # A new SKU is found and the old one is no longer cached
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.sku = 'SCAN-100'
+            self.product.price = Decimal('12.00')
+            self.product.save()
+        self.assertEqual(self.client.get(self.url, {'sku': 'SCAN-001'}).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(self.url, {'sku': 'SCAN-100'}).data['price'], Decimal('12.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        self.assertEqual(self.client.get(self.url, {'sku': 'SCAN-100'}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cache_is_bounded(self):
+        """Test que el cache descarta los SKUs menos usados al llenarse"""
+        with override_settings(PRODUCT_LOOKUP={'MAX_SIZE': 2, 'TIMEOUT': 60}):
+            for sku in ['SCAN-001', 'A', 'B']:
+                self.client.get(self.url, {'sku': sku})
+            self.assertEqual(lookup_cache.stats()['size'], 2)
+            with self.assertNumQueries(1):
+                self.client.get(self.url, {'sku': 'SCAN-001'})
+
+
+class CategoryCounterTest(TestCase):
+    """Tests para los contadores de productos y stock por categoría"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.category = Category.objects.create(name="Counters")
+        self.other = Category.objects.create(name="Other")
+        self.product = Product.objects.create(
+            name="Counted",
+            sku="CNT-001",
+            category=self.category,
+            price=Decimal('20.00'),
+            cost_price=Decimal('12.50'),
+            stock_quantity=10,
+            created_by=self.user
+        )
+
+    def assertCounters(self, category, *values):
+        category.refresh_from_db()
+        self.assertEqual(
+            (category.product_count, category.active_product_count,
+             category.total_stock, category.total_stock_value),
+            values
+        )
+        self.assertEqual(counters.check_consistency(), [])
+
+    def test_counters_follow_products(self):
+        """Test que los contadores siguen altas, cambios de stock, de categoría y bajas"""
+        self.assertCounters(self.category, 1, 1, 10, Decimal('125.00'))
+
+        apply_movements([{'product_id': self.product.id, 'movement_type': 'out', 'quantity': 4}], self.user)
+        self.assertCounters(self.category, 1, 1, 6, Decimal('75.00'))
+
+        StockMovement.objects.create(
+            product=self.product, movement_type='in', quantity=2, created_by=self.user
+        )
+        self.assertCounters(self.category, 1, 1, 8, Decimal('100.00'))
+
+        # The instance keeps the stock from before this movement
+        apply_movements([{'product_id': self.product.id, 'movement_type': 'out', 'quantity': 2}], self.user)
+        self.product.name = "Renamed"
+        self.product.save(update_fields=['name'])
+        self.assertCounters(self.category, 1, 1, 6, Decimal('75.00'))
+        self.product.save()
+        self.assertCounters(self.category, 1, 1, 8, Decimal('100.00'))
+
+        self.product.is_active = False
+        self.product.save()
+        self.assertCounters(self.category, 1, 0, 8, Decimal('100.00'))
+
+        self.product.category = self.other
+        self.product.cost_price = Decimal('1.00')
+        self.product.save()
+        self.assertCounters(self.category, 0, 0, 0, Decimal('0.00'))
+        self.assertCounters(self.other, 1, 0, 8, Decimal('8.00'))
+
+        self.product.delete()
+        self.assertCounters(self.other, 0, 0, 0, Decimal('0.00'))
+
+    def test_saving_category_keeps_counters(self):
+        """Test que guardar una categoría cargada antes no pisa los contadores"""
+        stale = Category.objects.get(pk=self.category.pk)
+        Product.objects.create(
+            name="Second", sku="CNT-002", category=self.category, price=Decimal('1.00'), created_by=self.user
+        )
+        stale.description = "Edited"
+        stale.save()
+        self.assertCounters(self.category, 2, 2, 10, Decimal('125.00'))
+
+    def test_category_list_reads_counters(self):
+        """Test que el listado de categorías no consulta la tabla de productos"""
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('category-list'), HTTP_IF_NONE_MATCH='"none"')
+
+        category = next(row for row in response.data['results'] if row['id'] == self.category.id)
+        self.assertEqual(category['products_count'], 1)
+        self.assertEqual(category['total_stock_value'], '125.00')
+        page_queries = [query['sql'] for query in queries if 'FROM "categories"' in query['sql']]
+        self.assertFalse(any('"products"' in sql for sql in page_queries))
+
+    def test_rebuild_command_reports_drift(self):
+        """Test que el comando informa y corrige los contadores desactualizados"""
+        Product.objects.bulk_create([
+            Product(name="Bulk", sku="CNT-BULK", category=self.other, price=Decimal('1.00'),
+                    cost_price=Decimal('2.00'), stock_quantity=3, created_by=self.user)
+        ])
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_category_counters', '--check', stdout=StringIO())
+
+        out = StringIO()
+        call_command('rebuild_category_counters', stdout=out)
+        self.assertIn('Other', out.getvalue())
+        self.assertIn('product_count: 0 -> 1', out.getvalue())
+        self.assertCounters(self.other, 1, 1, 3, Decimal('6.00'))
+
+
+class StockMovementConcurrencyTest(TransactionTestCase):
+    """Stress test: movimientos concurrentes sobre el mismo producto"""
+    
+    THREADS = 8
+    MOVEMENTS_PER_THREAD = 25
+    
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('In-memory SQLite does not support concurrent writers; '
+                          'set SQLITE_TEST_NAME to a file path')
+        self.user = User.objects.create_user(
+            username="stress",
+            email="stress@example.com",
+            password="testpass123"
+        )
+        self.product = Product.objects.create(
+            name="Hot Product",
+            sku="HOT-001",
+            price=10.00,
+            stock_quantity=0,
+            created_by=self.user
+        )
+    
+    def test_parallel_movements_do_not_lose_updates(self):
+        """Test que no se pierden actualizaciones y las cantidades registradas son exactas"""
+        errors = []
+        start = threading.Barrier(self.THREADS)
+        
+        def worker():
+            try:
+                start.wait()
+                for _ in range(self.MOVEMENTS_PER_THREAD):
+                    StockMovement.objects.create(
+                        product=Product(pk=self.product.pk),
+                        movement_type="in",
+                        quantity=1,
+                        created_by=self.user
+                    )
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        total = self.THREADS * self.MOVEMENTS_PER_THREAD
+        self.assertEqual(errors, [])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, total)
+        new_quantities = sorted(StockMovement.objects.values_list('new_quantity', flat=True))
+        self.assertEqual(new_quantities, list(range(1, total + 1)))
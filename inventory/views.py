@@ -1,22 +1,35 @@
 from django.shortcuts import render
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import Q, Sum, F
+from django.db.models import Case, CharField, F, Q, Value, When
+from core.aggregation import summarize
+from core.compact import CompactListMixin
+from core.conditional import ConditionalListMixin
+from core.exports import ExportMixin
+from core.pagination import FlexiblePagination
+from core.query_plans import QueryPlanMixin, apply_query_plan
+from users.models import User
 from .models import Category, Product, StockMovement
 from .serializers import (
     CategorySerializer, ProductSerializer, StockMovementSerializer,
-    ProductStockSerializer
+    ProductStockSerializer, StockMovementBulkCreateSerializer, ProductLookupSerializer
 )
+from . import lookup
+from .stock import InsufficientStockError, apply_movements
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalListMixin, CompactListMixin, QueryPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing product categories
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    compact_fields = {'id': 'id', 'name': 'name'}
+    # The counters change with the products (and their stock)
+    last_modified_models = (Category, Product)
 
     def get_queryset(self):
         return Category.objects.all().order_by('name')
@@ -27,18 +40,38 @@ class CategoryViewSet(viewsets.ModelViewSet):
         Get all products in a category
         """
         category = self.get_object()
-        products = Product.objects.filter(category=category, is_active=True)
+        products = apply_query_plan(
+            Product.objects.filter(category=category, is_active=True), ProductSerializer
+        )
         serializer = ProductSerializer(products, many=True)
         return Response(serializer.data)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ExportMixin, ConditionalListMixin, CompactListMixin, QueryPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing products
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
+    export_fields = {
+        'id': 'id', 'sku': 'sku', 'name': 'name', 'category': 'category__name',
+        'price': 'price', 'cost_price': 'cost_price', 'stock_quantity': 'stock_quantity',
+        'min_stock_level': 'min_stock_level', 'max_stock_level': 'max_stock_level',
+        'is_active': 'is_active', 'created_at': 'created_at',
+    }
+    compact_fields = {
+        'id': 'id', 'sku': 'sku', 'name': 'name', 'category_id': 'category_id',
+        'category_name': 'category__name', 'price': 'price', 'stock_quantity': 'stock_quantity',
+        'stock_status': Case(
+            When(stock_quantity__lte=F('min_stock_level'), then=Value('low')),
+            When(stock_quantity__gte=F('max_stock_level'), then=Value('high')),
+            default=Value('normal'), output_field=CharField(),
+        ),
+        'is_active': 'is_active',
+    }
+    # Products embed their category and the creator's name
+    last_modified_models = (Product, Category, User)
 
     def get_queryset(self):
         queryset = Product.objects.all().order_by('-created_at')
@@ -91,14 +124,20 @@ class ProductViewSet(viewsets.ModelViewSet):
             )
 
         # Create stock movement
-        StockMovement.objects.create(
-            product=product,
-            movement_type=movement_type,
-            quantity=abs(quantity),
-            reference=reference,
-            notes=notes,
-            created_by=request.user
-        )
+        try:
+            StockMovement.objects.create(
+                product=product,
+                movement_type=movement_type,
+                quantity=abs(quantity),
+                reference=reference,
+                notes=notes,
+                created_by=request.user
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         serializer = ProductSerializer(product)
         return Response(serializer.data)
@@ -108,46 +147,77 @@ class ProductViewSet(viewsets.ModelViewSet):
         """
         Get products with low stock
         """
-        products = Product.objects.filter(
+        products = apply_query_plan(Product.objects.filter(
             stock_quantity__lte=F('min_stock_level'),
             is_active=True
-        )
+        ), ProductStockSerializer)
         serializer = ProductStockSerializer(products, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get', 'post'])
+    def lookup(self, request):
+        """
+        Resolve a scanned SKU (GET ?sku=) or many at once (POST {"skus": [...]})
+        """
+        if request.method == 'GET':
+            sku = request.query_params.get('sku', '').strip()
+            if not sku:
+                return Response({'error': 'sku is required'}, status=status.HTTP_400_BAD_REQUEST)
+            product = lookup.lookup([sku])[sku]
+            if product is None:
+                return Response({'error': f'Product not found: {sku}'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(product)
+
+        serializer = ProductLookupSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        skus = list(dict.fromkeys(sku.strip() for sku in serializer.validated_data['skus']))
+        products = lookup.lookup(skus)
+        return Response({
+            'results': [products[sku] for sku in skus if products[sku] is not None],
+            'missing': [sku for sku in skus if products[sku] is None],
+        })
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def lookup_stats(self, request):
+        """
+        Size and hit/miss counters of the SKU lookup cache of this process
+        """
+        return Response(lookup.cache.stats())
+
     @action(detail=False, methods=['get'])
     def stock_summary(self, request):
         """
         Get stock summary statistics
         """
-        total_products = Product.objects.filter(is_active=True).count()
-        low_stock_products = Product.objects.filter(
-            stock_quantity__lte=F('min_stock_level'),
-            is_active=True
-        ).count()
-        out_of_stock = Product.objects.filter(
-            stock_quantity=0,
-            is_active=True
-        ).count()
-        total_value = Product.objects.filter(is_active=True).aggregate(
-            total=Sum(F('stock_quantity') * F('cost_price'))
-        )['total'] or 0
+        summary = summarize(Product.objects.filter(is_active=True))
 
         return Response({
-            'total_products': total_products,
-            'low_stock_products': low_stock_products,
-            'out_of_stock': out_of_stock,
-            'total_inventory_value': float(total_value)
+            'total_products': summary['total_products'],
+            'low_stock_products': summary['low_stock_products'],
+            'out_of_stock': summary['out_of_stock'],
+            'total_inventory_value': float(summary['total_inventory_value'])
         })
 
 
-class StockMovementViewSet(viewsets.ModelViewSet):
+class StockMovementViewSet(ExportMixin, CompactListMixin, QueryPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing stock movements
     """
     queryset = StockMovement.objects.all()
     serializer_class = StockMovementSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FlexiblePagination
+    export_fields = {
+        'id': 'id', 'product_id': 'product_id', 'product_sku': 'product__sku',
+        'movement_type': 'movement_type', 'quantity': 'quantity',
+        'previous_quantity': 'previous_quantity', 'new_quantity': 'new_quantity',
+        'reference': 'reference', 'created_by': 'created_by__email', 'created_at': 'created_at',
+    }
+    compact_fields = {
+        'id': 'id', 'product_id': 'product_id', 'product_name': 'product__name',
+        'movement_type': 'movement_type', 'quantity': 'quantity', 'new_quantity': 'new_quantity',
+        'reference': 'reference', 'created_at': 'created_at',
+    }
 
     def get_queryset(self):
         queryset = StockMovement.objects.all().order_by('-created_at')
@@ -165,13 +235,61 @@ class StockMovementViewSet(viewsets.ModelViewSet):
         return queryset
 
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        try:
+            serializer.save(created_by=self.request.user)
+        except ValueError as e:
+            raise ValidationError({'error': str(e)})
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Apply many stock movements in a single transaction
+        """
+        serializer = StockMovementBulkCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            movements = apply_movements(
+                [
+                    {
+                        'product_id': movement['product'],
+                        'movement_type': movement['movement_type'],
+                        'quantity': movement['quantity'],
+                        'reference': movement['reference'],
+                        'notes': movement['notes'],
+                    }
+                    for movement in serializer.validated_data['movements']
+                ],
+                request.user
+            )
+        except InsufficientStockError as e:
+            return Response(
+                {'error': str(e), 'shortfalls': e.shortfalls},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'created': len(movements),
+            'movements': [
+                {
+                    'id': movement.id,
+                    'product': movement.product_id,
+                    'movement_type': movement.movement_type,
+                    'quantity': movement.quantity,
+                    'previous_quantity': movement.previous_quantity,
+                    'new_quantity': movement.new_quantity
+                }
+                for movement in movements
+            ]
+        }, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['get'])
     def recent_movements(self, request):
         """
         Get recent stock movements
         """
-        movements = StockMovement.objects.all().order_by('-created_at')[:50]
+        movements = apply_query_plan(
+            StockMovement.objects.all(), StockMovementSerializer
+        ).order_by('-created_at')[:50]
         serializer = StockMovementSerializer(movements, many=True)
         return Response(serializer.data)
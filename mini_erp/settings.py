@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -48,17 +48,21 @@ INSTALLED_APPS = [
     'drf_yasg',
     
     # Local apps
+    'core',
     'users',
     'inventory',
     'sales',
     'purchases',
     'reports',
+    'search',
 ]
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # WhiteNoise
+    'core.middleware.DatabaseConnectionMiddleware',
+    'core.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -99,6 +103,11 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default='erp_password'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        'OPTIONS': {'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int)},
+        # PgBouncer in transaction mode can't keep server-side cursors across
+        # transactions. Exports already iterate inside one; set this if other
+        # code uses QuerySet.iterator() outside a transaction
+        'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
     }
 }
 
@@ -108,9 +117,53 @@ if DEBUG and not config('USE_POSTGRES', default=False, cast=bool):
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # In-memory by default; set a file path to run the concurrency tests on SQLite
+            'TEST': {'NAME': config('SQLITE_TEST_NAME', default=None)},
         }
     }
 
+# Persistent connections: each worker (thread) keeps its connection for
+# DB_CONN_MAX_AGE seconds instead of opening one per request (0 closes it
+# after every request) and checks it before reusing it
+DATABASES['default'].update({
+    'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+    'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+})
+
+# Connection open time and reuse per request (core.middleware)
+DB_CONNECTION_METRICS = config('DB_CONNECTION_METRICS', default=True, cast=bool)
+
+# Read replicas (core.routers): comma separated PostgreSQL replica hosts
+# (same name and credentials as the primary), or SQLite files for local
+# testing. Reports and GET list/retrieve requests read from them.
+DATABASE_REPLICAS = []
+for number, location in enumerate(config('DB_REPLICAS', default='', cast=Csv()), start=1):
+    alias = f'replica{number}'
+    location_key = 'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'HOST'
+    DATABASES[alias] = {**DATABASES['default'], location_key: location, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Seconds a client reads from the primary after a write (read-your-writes)
+DB_REPLICA_STICKY_SECONDS = config('DB_REPLICA_STICKY_SECONDS', default=10, cast=int)
+# Replicas further behind than this (seconds) are skipped
+DB_REPLICA_MAX_LAG = config('DB_REPLICA_MAX_LAG', default=5, cast=float)
+# Seconds the measured lag of a replica is reused before checking again
+DB_REPLICA_LAG_CHECK_INTERVAL = config('DB_REPLICA_LAG_CHECK_INTERVAL', default=2, cast=float)
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Per process memory by default; use a shared backend (Redis, file) with several workers, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://localhost:6379/1
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='mini-erp'),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -188,6 +241,15 @@ REST_FRAMEWORK = {
     ),
 }
 
+# orjson based renderer/parser (core/renderers.py), same output as the stock ones
+if config('FAST_JSON', default=True, cast=bool):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = ('core.renderers.FastJSONRenderer',)
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = (
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.MultiPartParser',
+        'rest_framework.parsers.FormParser',
+    )
+
 # JWT Settings
 from datetime import timedelta
 SIMPLE_JWT = {
@@ -270,3 +332,41 @@ LOGOUT_REDIRECT_URL = '/api/docs/'
 
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
+
+# Document numbering (see core/numbering.py)
+DOCUMENT_NUMBERS = {
+    'sale_order': {'prefix': config('SALE_ORDER_PREFIX', default='SO-'), 'width': 6},
+    'invoice': {'prefix': config('INVOICE_PREFIX', default='INV-'), 'width': 6},
+    'purchase_invoice': {'prefix': config('PURCHASE_INVOICE_PREFIX', default='PINV-'), 'width': 6},
+}
+# Values reserved per process and request on databases without native sequences
+DOCUMENT_NUMBER_BLOCK_SIZE = config('DOCUMENT_NUMBER_BLOCK_SIZE', default=20, cast=int)
+
+# Cached report payloads (see reports/cache.py)
+REPORTS_CACHE = {
+    'ALIAS': config('REPORTS_CACHE_ALIAS', default='default'),
+    # Seconds a payload is served as fresh, and kept to be served stale while it's refreshed
+    'TIMEOUT': config('REPORTS_CACHE_TIMEOUT', default=60, cast=int),
+    'STALE_TIMEOUT': config('REPORTS_CACHE_STALE_TIMEOUT', default=3600, cast=int),
+    'BACKGROUND_REFRESH': config('REPORTS_CACHE_BACKGROUND_REFRESH', default=True, cast=bool),
+}
+
+# Background report jobs (see reports/jobs.py and manage.py run_report_worker)
+REPORT_JOBS = {
+    # Threads per worker process
+    'WORKERS': config('REPORT_JOBS_WORKERS', default=2, cast=int),
+    'POLL_INTERVAL': config('REPORT_JOBS_POLL_INTERVAL', default=2, cast=float),
+    # Running jobs older than this are queued again (their worker died), up to MAX_ATTEMPTS
+    'TIMEOUT': config('REPORT_JOBS_TIMEOUT', default=900, cast=int),
+    'MAX_ATTEMPTS': config('REPORT_JOBS_MAX_ATTEMPTS', default=3, cast=int),
+    # Seconds finished jobs are kept, and a finished job is reused for identical requests
+    'RETENTION': config('REPORT_JOBS_RETENTION', default=7 * 24 * 3600, cast=int),
+    'REUSE_SECONDS': config('REPORT_JOBS_REUSE_SECONDS', default=60, cast=int),
+}
+
+# Per-process SKU lookup cache (see inventory/lookup.py)
+PRODUCT_LOOKUP = {
+    'MAX_SIZE': config('PRODUCT_LOOKUP_MAX_SIZE', default=10000, cast=int),
+    # Seconds other worker processes may serve a product after it changed
+    'TIMEOUT': config('PRODUCT_LOOKUP_TIMEOUT', default=5, cast=float),
+}
@@ -93,6 +93,7 @@ urlpatterns = [
     path('api/sales/', include('sales.urls')),
     path('api/purchases/', include('purchases.urls')),
     path('api/reports/', include('reports.urls')),
+    path('api/search/', include('search.urls')),
 ]
 
 # Serve media files in development
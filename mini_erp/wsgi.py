@@ -8,9 +8,16 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 """
 
 import os
+from importlib import import_module
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mini_erp.settings')
 
 application = get_wsgi_application()
+
+# Import the URLconf (and with it every view and serializer) now rather than
+# on the first request, so gunicorn's preload_app loads it once in the
+# master and the workers share it
+import_module(settings.ROOT_URLCONF)
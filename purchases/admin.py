@@ -24,3 +24,13 @@ class PurchaseInvoiceAdmin(admin.ModelAdmin):
     ordering = ['-created_at']
     inlines = [PurchaseInvoiceItemInline]
     readonly_fields = ['invoice_number', 'amount', 'created_at', 'updated_at']
+
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not PurchaseInvoiceItem:
+            return super().save_formset(request, form, formset, change)
+        # Items record their stock movement as the admin user
+        for obj in formset.save(commit=False):
+            obj.save(received_by=request.user)
+        for obj in formset.deleted_objects:
+            obj.delete()
+        formset.save_m2m()
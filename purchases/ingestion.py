@@ -0,0 +1,109 @@
+"""
+Batched purchase invoice ingestion
+
+Receives many invoices (and many lines per invoice) in a single
+transaction with a bounded number of queries: each invoice is inserted
+once with its final amount, all items go through bulk_create and stock is
+received through inventory.stock.apply_movements (one locking SELECT, one
+UPDATE per batch of products and one bulk insert of StockMovement rows).
+"""
+import csv
+import io
+import json
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.db import transaction
+
+from inventory.stock import apply_movements
+from .models import PurchaseInvoice, PurchaseInvoiceItem
+
+ITEM_BATCH_SIZE = 500
+
+
+def ingest_purchase_invoices(invoices, user):
+    """
+    Create purchase invoices with their items and receive their stock.
+
+    ``invoices`` is a list of validated dicts with ``supplier_id``,
+    ``invoice_date``, ``due_date``, optional ``notes`` and ``items`` (dicts
+    with ``product``, ``quantity`` and ``unit_price``). Returns the created
+    invoices.
+    """
+    created = []
+    with transaction.atomic():
+        for data in invoices:
+            items = data['items']
+            invoice = PurchaseInvoice(
+                supplier_id=data['supplier_id'],
+                invoice_date=data['invoice_date'],
+                due_date=data['due_date'],
+                notes=data.get('notes', ''),
+                amount=sum((item['quantity'] * item['unit_price'] for item in items), Decimal('0.00')),
+            )
+            invoice.save()
+            created.append((invoice, items))
+
+        PurchaseInvoiceItem.objects.bulk_create(
+            [
+                PurchaseInvoiceItem(
+                    invoice=invoice,
+                    product_id=item['product'],
+                    quantity=item['quantity'],
+                    unit_price=item['unit_price'],
+                    total_price=item['quantity'] * item['unit_price'],
+                )
+                for invoice, items in created
+                for item in items
+            ],
+            batch_size=ITEM_BATCH_SIZE,
+        )
+
+        apply_movements(
+            [
+                {
+                    'product_id': item['product'],
+                    'movement_type': 'in',
+                    'quantity': item['quantity'],
+                    'reference': invoice.invoice_number,
+                }
+                for invoice, items in created
+                for item in items
+            ],
+            user,
+        )
+    return [invoice for invoice, _ in created]
+
+
+def parse_invoices_file(content, file_format):
+    """
+    Parse an invoices file into the payload accepted by the bulk API.
+
+    JSON files contain a list of invoices (or ``{"invoices": [...]}``) in
+    the same shape as ``POST /api/purchases/invoices/``. CSV files have one
+    row per line with the columns ``reference, supplier_id, invoice_date,
+    due_date, product, quantity, unit_price`` and optional ``notes``; rows
+    sharing a ``reference`` belong to the same invoice. ``product`` may be
+    replaced by a ``sku`` column.
+    """
+    if file_format == 'json':
+        data = json.loads(content)
+        return data['invoices'] if isinstance(data, dict) else data
+
+    invoices = OrderedDict()
+    for row in csv.DictReader(io.StringIO(content)):
+        reference = row.get('reference') or f"row-{len(invoices)}"
+        invoice = invoices.setdefault(reference, {
+            'supplier_id': row['supplier_id'],
+            'invoice_date': row['invoice_date'],
+            'due_date': row['due_date'],
+            'notes': row.get('notes', ''),
+            'items': [],
+        })
+        item = {'quantity': row['quantity'], 'unit_price': row['unit_price']}
+        if row.get('product'):
+            item['product'] = row['product']
+        else:
+            item['sku'] = row['sku']
+        invoice['items'].append(item)
+    return list(invoices.values())
@@ -0,0 +1,54 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from purchases.ingestion import ingest_purchase_invoices, parse_invoices_file
+from purchases.serializers import PurchaseInvoiceBulkCreateSerializer
+
+
+class Command(BaseCommand):
+    help = 'Importa facturas de compra desde un archivo CSV o JSON y recibe su stock'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo con las facturas a importar')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'json'],
+            help='Formato del archivo (por defecto se toma de la extensión)',
+        )
+        parser.add_argument(
+            '--user',
+            help='Email del usuario que registra los movimientos de stock (por defecto el primer superusuario)',
+        )
+
+    def handle(self, *args, **options):
+        from users.models import User
+
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format not in ('csv', 'json'):
+            raise CommandError('No se pudo determinar el formato, usa --format csv|json')
+
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('id').first()
+        if user is None:
+            raise CommandError('No se encontró el usuario para registrar los movimientos')
+
+        try:
+            with open(path, encoding='utf-8') as f:
+                invoices = parse_invoices_file(f.read(), file_format)
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'No se pudo leer {path}: {e}')
+
+        self.stdout.write(self.style.WARNING(f'📦 Validando {len(invoices)} facturas...'))
+        serializer = PurchaseInvoiceBulkCreateSerializer(data={'invoices': invoices})
+        if not serializer.is_valid():
+            raise CommandError(f'Archivo inválido: {serializer.errors}')
+
+        created = ingest_purchase_invoices(serializer.validated_data['invoices'], user)
+        lines = sum(len(invoice['items']) for invoice in serializer.validated_data['invoices'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(created)} facturas importadas ({lines} líneas)'
+        ))
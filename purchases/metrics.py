@@ -0,0 +1,31 @@
+"""
+Summary metrics of purchases (see core/aggregation.py)
+"""
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from core.aggregation import register, register_aging, register_choices
+from .models import PurchaseInvoice
+
+OUTSTANDING = Q(status__in=['pending', 'partial'])
+
+register(PurchaseInvoice, 'total_purchases', Sum('amount'))
+register(PurchaseInvoice, 'this_month_purchases', lambda period: Sum(
+    'amount', filter=Q(invoice_date__gte=period.this_month)
+))
+register(PurchaseInvoice, 'last_month_purchases', lambda period: Sum(
+    'amount', filter=Q(invoice_date__gte=period.last_month, invoice_date__lt=period.this_month)
+))
+register_choices(PurchaseInvoice, 'invoices_{}', 'status', lambda q: Count('id', filter=q))
+register_choices(PurchaseInvoice, 'amount_{}', 'status', lambda q: Sum('amount', filter=q))
+register(PurchaseInvoice, 'outstanding_count', Count('id', filter=OUTSTANDING))
+register(PurchaseInvoice, 'outstanding_amount', Sum('amount', filter=OUTSTANDING))
+register(PurchaseInvoice, 'outstanding_paid', Sum('paid_amount', filter=OUTSTANDING))
+
+# Payables: outstanding balance of open invoices (no amount counts as zero, like PurchaseInvoice.balance)
+BALANCE = Coalesce('amount', Value(Decimal('0.00'))) - F('paid_amount')
+
+register(PurchaseInvoice, 'outstanding_balance', Sum(BALANCE, filter=OUTSTANDING))
+register_aging(PurchaseInvoice, 'due_date', BALANCE, OUTSTANDING)
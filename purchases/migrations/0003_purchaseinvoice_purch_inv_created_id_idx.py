@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('purchases', '0002_alter_purchaseinvoice_amount'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseinvoice',
+            index=models.Index(fields=['created_at', 'id'], name='purch_inv_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('purchases', '0003_purchaseinvoice_purch_inv_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseinvoice',
+            index=models.Index(fields=['invoice_date'], name='purch_inv_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseinvoice',
+            index=models.Index(fields=['status', 'due_date'], name='purch_inv_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseinvoice',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'partial'])), fields=['due_date'], name='purch_inv_open_due_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('purchases', '0004_purchaseinvoice_purch_inv_date_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['updated_at'], name='supplier_updated_idx'),
+        ),
+    ]
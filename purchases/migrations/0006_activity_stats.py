@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:49
+
+from django.db import migrations, models
+
+
+def backfill_stats(apps, schema_editor):
+    from purchases.stats import rebuild
+    rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('purchases', '0005_supplier_supplier_updated_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplier',
+            name='invoice_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='last_invoice_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='open_balance',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='total_purchases',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['total_purchases'], name='supplier_total_purch_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['last_invoice_at'], name='supplier_last_invoice_idx'),
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,12 @@
-from django.db import models
+from django.db import models, transaction
 from decimal import Decimal
 from inventory.models import Product
+from inventory.stock import apply_movements
+from core.counters import protect_counters
+from core.numbering import next_number
+
+# Activity stats maintained by purchases/stats.py
+STATS_FIELDS = ('invoice_count', 'total_purchases', 'last_invoice_at', 'open_balance')
 
 
 class Supplier(models.Model):
@@ -13,15 +19,29 @@ class Supplier(models.Model):
     address = models.TextField()
     contact_person = models.CharField(max_length=100, blank=True)
     is_active = models.BooleanField(default=True)
+    invoice_count = models.IntegerField(default=0, editable=False)
+    total_purchases = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    last_invoice_at = models.DateTimeField(null=True, blank=True, editable=False)
+    open_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'suppliers'
+        indexes = [
+            # High-water mark for conditional GETs (core.conditional)
+            models.Index(fields=['updated_at'], name='supplier_updated_idx'),
+            # Top suppliers and recent activity (supplier report)
+            models.Index(fields=['total_purchases'], name='supplier_total_purch_idx'),
+            models.Index(fields=['last_invoice_at'], name='supplier_last_invoice_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **protect_counters(self, STATS_FIELDS, kwargs))
+
 
 class PurchaseInvoice(models.Model):
     """
@@ -45,20 +65,29 @@ class PurchaseInvoice(models.Model):
 
     class Meta:
         db_table = 'purchase_invoices'
+        indexes = [
+            # Keyset pagination (core.pagination)
+            models.Index(fields=['created_at', 'id'], name='purch_inv_created_id_idx'),
+            models.Index(fields=['invoice_date'], name='purch_inv_date_idx'),
+            models.Index(fields=['status', 'due_date'], name='purch_inv_status_due_idx'),
+            # Open invoices (outstanding balances, aging)
+            models.Index(
+                fields=['due_date'],
+                condition=models.Q(status__in=['pending', 'partial']),
+                name='purch_inv_open_due_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.invoice_number
 
     def save(self, *args, **kwargs):
         if not self.invoice_number:
-            # Generate invoice number
-            last_invoice = PurchaseInvoice.objects.order_by('-id').first()
-            if last_invoice:
-                last_number = int(last_invoice.invoice_number.split('-')[1])
-                self.invoice_number = f"PINV-{last_number + 1:06d}"
-            else:
-                self.invoice_number = "PINV-000001"
-        super().save(*args, **kwargs)
+            self.invoice_number = next_number('purchase_invoice', using=kwargs.get('using'))
+        # pre_save handlers lock the stored row (purchases/reports signals)
+        # until post_save has applied the deltas: keep both in one transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
     @property
     def balance(self):
@@ -94,16 +123,32 @@ class PurchaseInvoiceItem(models.Model):
     def __str__(self):
         return f"{self.product.name} - {self.quantity}"
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, received_by=None, **kwargs):
+        """
+        Save the item, update the invoice amount and, on creation, receive
+        its stock through ``inventory.stock.apply_movements`` (an 'in'
+        movement referencing the invoice, recorded as ``received_by``, which
+        is then required).
+        """
         self.total_price = self.quantity * self.unit_price
         is_new = self.pk is None
-        super().save(*args, **kwargs)
-        
-        # Update invoice amount
-        self.invoice.amount = sum(item.total_price for item in self.invoice.items.all())
-        self.invoice.save()
-        
-        # Update product stock only on creation
-        if is_new:
-            self.product.stock_quantity += self.quantity
-            self.product.save()
+        if is_new and received_by is None:
+            raise ValueError('received_by is required to receive the stock of a new item')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            self.invoice.amount = self.invoice.items.aggregate(total=models.Sum('total_price'))['total']
+            self.invoice.save(update_fields=['amount', 'updated_at'])
+
+            if is_new:
+                movement, = apply_movements(
+                    [{
+                        'product_id': self.product_id,
+                        'movement_type': 'in',
+                        'quantity': self.quantity,
+                        'reference': self.invoice.invoice_number,
+                    }],
+                    received_by,
+                )
+        if is_new and PurchaseInvoiceItem.product.is_cached(self):
+            self.product.stock_quantity = movement.new_quantity
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from inventory.models import Product
+from .ingestion import ingest_purchase_invoices
 from .models import Supplier, PurchaseInvoice, PurchaseInvoiceItem
 
 
@@ -6,18 +8,19 @@ class SupplierSerializer(serializers.ModelSerializer):
     """
     Serializer for Supplier model
     """
-    invoices_count = serializers.SerializerMethodField()
+    # Maintained stats (purchases/stats.py), read without touching invoices
+    invoices_count = serializers.ReadOnlyField(source='invoice_count')
 
     class Meta:
         model = Supplier
         fields = [
-            'id', 'name', 'email', 'phone', 'address', 'contact_person',
-            'is_active', 'invoices_count', 'created_at', 'updated_at'
+            'id', 'name', 'email', 'phone', 'address', 'contact_person', 'is_active',
+            'invoices_count', 'total_purchases', 'last_invoice_at', 'open_balance',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'total_purchases', 'last_invoice_at', 'open_balance', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
-
-    def get_invoices_count(self, obj):
-        return obj.invoices.count()
 
 
 class PurchaseInvoiceItemSerializer(serializers.ModelSerializer):
@@ -58,42 +61,95 @@ class PurchaseInvoiceSerializer(serializers.ModelSerializer):
         ]
 
 
+class PurchaseInvoiceItemInputSerializer(serializers.Serializer):
+    """
+    Serializer for validating purchase invoice lines on creation. Products
+    are referenced by id or by SKU.
+    """
+    product = serializers.IntegerField(required=False)
+    sku = serializers.CharField(required=False)
+    quantity = serializers.IntegerField(min_value=1)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+
+    def validate(self, attrs):
+        if 'product' not in attrs and not attrs.get('sku'):
+            raise serializers.ValidationError('Either product or sku is required')
+        return attrs
+
+
+def resolve_products(items):
+    """
+    Check that every referenced product exists (one query for ids, one for
+    SKUs) and set ``item['product']`` to the product id.
+    """
+    product_ids = {item['product'] for item in items if 'product' in item}
+    skus = {item['sku'] for item in items if 'product' not in item}
+    existing = set(Product.objects.filter(id__in=product_ids).values_list('id', flat=True)) if product_ids else set()
+    by_sku = dict(Product.objects.filter(sku__in=skus).values_list('sku', 'id')) if skus else {}
+
+    missing = [str(pk) for pk in sorted(product_ids - existing)]
+    missing += sorted(skus - set(by_sku))
+    if missing:
+        raise serializers.ValidationError(f"Products not found: {', '.join(missing)}")
+
+    for item in items:
+        if 'product' not in item:
+            item['product'] = by_sku[item.pop('sku')]
+        item.pop('sku', None)
+    return items
+
+
 class PurchaseInvoiceCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating purchase invoices with items
     """
     supplier_id = serializers.IntegerField()
-    items = serializers.ListField(
-        child=serializers.DictField(),
-        write_only=True
-    )
+    items = PurchaseInvoiceItemInputSerializer(many=True, allow_empty=False, write_only=True)
 
     class Meta:
         model = PurchaseInvoice
         fields = [
-            'id', 'supplier_id', 'invoice_date', 'due_date', 'notes', 'items'
+            'id', 'invoice_number', 'supplier_id', 'invoice_date', 'due_date',
+            'amount', 'notes', 'items'
         ]
-        read_only_fields = ['id']
+        read_only_fields = ['id', 'invoice_number', 'amount']
+
+    def validate_items(self, items):
+        # Inside a bulk request products are checked once for all invoices
+        if self.parent is None:
+            resolve_products(items)
+        return items
+
+    def validate_supplier_id(self, supplier_id):
+        if self.parent is None and not Supplier.objects.filter(id=supplier_id).exists():
+            raise serializers.ValidationError(f'Supplier not found: {supplier_id}')
+        return supplier_id
 
     def create(self, validated_data):
-        items_data = validated_data.pop('items')
-        supplier_id = validated_data.pop('supplier_id')
-        
-        # Create the purchase invoice
-        purchase_invoice = PurchaseInvoice.objects.create(
-            supplier_id=supplier_id,
-            **validated_data
-        )
-        
-        # Create invoice items
-        for item_data in items_data:
-            product_id = item_data.pop('product')
-            PurchaseInvoiceItem.objects.create(
-                invoice=purchase_invoice,
-                product_id=product_id,
-                **item_data
+        # Items are bulk inserted, stock is received and the amount is
+        # computed once for the whole invoice
+        return ingest_purchase_invoices([validated_data], self.context['request'].user)[0]
+
+
+class PurchaseInvoiceBulkCreateSerializer(serializers.Serializer):
+    """
+    Serializer for receiving many purchase invoices in one request
+    """
+    invoices = PurchaseInvoiceCreateSerializer(many=True, allow_empty=False)
+
+    def validate_invoices(self, invoices):
+        resolve_products([item for invoice in invoices for item in invoice['items']])
+
+        supplier_ids = {invoice['supplier_id'] for invoice in invoices}
+        missing = sorted(supplier_ids - set(
+            Supplier.objects.filter(id__in=supplier_ids).values_list('id', flat=True)
+        ))
+        if missing:
+            raise serializers.ValidationError(
+                f"Suppliers not found: {', '.join(str(pk) for pk in missing)}"
             )
-        
-        # Refresh the invoice to get updated amount
-        purchase_invoice.refresh_from_db()
-        return purchase_invoice
+        return invoices
+
+    def create(self, validated_data):
+        invoices = ingest_purchase_invoices(validated_data['invoices'], self.context['request'].user)
+        return {'invoices': invoices}
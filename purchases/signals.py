@@ -0,0 +1,47 @@
+"""
+Signal handlers keeping the supplier activity stats current (purchases/stats.py)
+
+The values a save replaces are read from the row in pre_save/pre_delete,
+so an invoice loaded (or refreshed) before someone else changed it can't
+apply a wrong difference.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core import conditional, counters
+from . import stats
+from .models import PurchaseInvoice, Supplier
+
+
+@receiver(pre_save, sender=PurchaseInvoice, dispatch_uid='supplier_stats_pre_save')
+def invoice_saving(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if raw or instance._state.adding or not counters.writes_fields(sender, stats.INVOICE_FIELDS, update_fields):
+        return
+    instance._stats_values = counters.stored_values(sender, instance.pk, stats.INVOICE_FIELDS, using)
+
+
+@receiver(post_save, sender=PurchaseInvoice, dispatch_uid='supplier_stats_save')
+def invoice_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    old = None if created else instance.__dict__.pop('_stats_values', None)
+    if old is None and not created:
+        # None of the tracked fields was written
+        return
+    new = counters.saved_values(instance, stats.INVOICE_FIELDS, old, update_fields)
+    if old != new:
+        stats.apply_invoice_change(old, new)
+
+
+@receiver(pre_delete, sender=PurchaseInvoice, dispatch_uid='supplier_stats_pre_delete')
+def invoice_deleting(sender, instance, using=None, **kwargs):
+    instance._stats_values = counters.stored_values(sender, instance.pk, stats.INVOICE_FIELDS, using)
+
+
+@receiver(post_delete, sender=PurchaseInvoice, dispatch_uid='supplier_stats_delete')
+def invoice_deleted(sender, instance, **kwargs):
+    stats.apply_invoice_change(instance.__dict__.pop('_stats_values', None), None)
+
+
+# Deletions change the validators of the supplier list (core.conditional)
+conditional.track_deletions(Supplier, PurchaseInvoice)
@@ -0,0 +1,135 @@
+"""
+Denormalized supplier activity stats
+
+Every supplier carries its lifetime number of purchase invoices and their
+total (whatever their status, as the supplier report always counted
+them), when its last invoice was registered and what is still owed to it
+on open invoices, so the supplier list, "top suppliers" and "active
+suppliers" read indexed columns instead of aggregating purchase invoices
+on every request.
+
+Stats change with F() updates inside the transaction that saves or
+deletes an invoice (``purchases.signals``). Bulk inserts and ``update()``
+calls skip the signals: run ``manage.py rebuild_partner_stats`` after
+them.
+"""
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from core import counters
+from core.counters import CENT, ZERO, decimal
+from .models import STATS_FIELDS
+
+# Fields the stats depend on (attnames)
+INVOICE_FIELDS = ('supplier_id', 'amount', 'paid_amount', 'status', 'created_at')
+# Invoices with a balance still to pay
+OPEN_STATUSES = ('pending', 'partial')
+
+EMPTY = {'invoice_count': 0, 'total_purchases': ZERO, 'last_invoice_at': None, 'open_balance': ZERO}
+
+
+def _model(name, apps=global_apps):
+    return apps.get_model('purchases', name)
+
+
+def _contribution(invoice):
+    """Stats one invoice adds to its supplier (amounts are null until it has items)"""
+    amount = decimal(invoice['amount'])
+    is_open = invoice['status'] in OPEN_STATUSES
+    return {
+        'invoice_count': 1,
+        'total_purchases': amount,
+        'open_balance': amount - decimal(invoice['paid_amount']) if is_open else ZERO,
+    }
+
+
+def last_invoice_at(supplier_id):
+    """Subquery with the creation time of the latest invoice of a supplier"""
+    invoices = _model('PurchaseInvoice').objects.filter(supplier_id=supplier_id).order_by('-created_at')
+    return Subquery(invoices.values('created_at')[:1])
+
+
+def apply_invoice_change(old, new):
+    """
+    Move an invoice's contribution from ``old`` to ``new`` (values of
+    ``INVOICE_FIELDS``; None for a created or deleted invoice)
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for values, sign in ((old, -1), (new, 1)):
+        if values and values['supplier_id']:
+            for field, value in _contribution(values).items():
+                deltas[values['supplier_id']][field] += sign * value
+
+    assignments = {}
+    old_supplier = old and old['supplier_id']
+    new_supplier = new and new['supplier_id']
+    if old_supplier != new_supplier:
+        if old_supplier:
+            # The deleted or moved invoice may have been the latest one
+            assignments[old_supplier] = {'last_invoice_at': last_invoice_at(old_supplier)}
+        if new_supplier:
+            assignments[new_supplier] = {'last_invoice_at': counters.latest('last_invoice_at', new['created_at'])}
+
+    counters.bump(_model('Supplier'), deltas, assignments)
+
+
+# ---------------------------------------------------------------------------
+# Rebuild and consistency checks
+# ---------------------------------------------------------------------------
+
+def compute_from_raw(supplier_ids=None, apps=global_apps):
+    """``{supplier_id: stats}`` aggregated from purchase invoices (suppliers without any are left out)"""
+    invoices = _model('PurchaseInvoice', apps).objects.all()
+    if supplier_ids is not None:
+        invoices = invoices.filter(supplier_id__in=supplier_ids)
+    amount = Coalesce(F('amount'), Value(ZERO))
+    rows = invoices.order_by().values('supplier_id').annotate(
+        invoice_count=Count('id'),
+        total_purchases=Sum(amount),
+        last_invoice_at=Max('created_at'),
+        open_balance=Sum(amount - F('paid_amount'), filter=Q(status__in=OPEN_STATUSES)),
+    )
+    # SQLite sums decimals as floats
+    return {
+        row.pop('supplier_id'): {
+            **row,
+            'total_purchases': decimal(row['total_purchases']).quantize(CENT),
+            'open_balance': decimal(row['open_balance']).quantize(CENT),
+        }
+        for row in rows
+    }
+
+
+def rebuild(supplier_ids=None, apps=global_apps):
+    """
+    Recompute the stats of ``supplier_ids`` (every supplier by default).
+    Returns the drift found, as ``check_consistency`` does.
+    """
+    Supplier = _model('Supplier', apps)
+    suppliers = Supplier.objects.all()
+    if supplier_ids is not None:
+        suppliers = suppliers.filter(pk__in=supplier_ids)
+    with transaction.atomic():
+        # Lock the rows so no incremental update lands between reading and writing
+        list(suppliers.select_for_update().order_by('pk').values_list('pk', flat=True))
+        mismatches = check_consistency(supplier_ids, apps)
+        Supplier.objects.bulk_update(
+            [Supplier(pk=supplier_id, **expected) for supplier_id, _, expected, _ in mismatches],
+            STATS_FIELDS, batch_size=1000,
+        )
+    return mismatches
+
+
+def check_consistency(supplier_ids=None, apps=global_apps):
+    """
+    Compare the stats against purchase invoices. Returns a list of
+    ``(supplier_id, name, expected, actual)``, empty when consistent.
+    """
+    suppliers = _model('Supplier', apps).objects.all()
+    if supplier_ids is not None:
+        suppliers = suppliers.filter(pk__in=supplier_ids)
+    return counters.mismatches(suppliers, compute_from_raw(supplier_ids, apps), STATS_FIELDS, EMPTY)
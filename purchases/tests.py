@@ -1,10 +1,23 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.utils import timezone
 from decimal import Decimal
 from datetime import date, timedelta
+from rest_framework import status
+from rest_framework.test import APIClient
 
+from . import stats
 from .models import Supplier, PurchaseInvoice, PurchaseInvoiceItem
-from inventory.models import Category, Product
+from inventory.models import Category, Product, StockMovement
+from inventory.stock import apply_movements
 from users.models import User, Role
 
 
@@ -171,9 +184,14 @@ class PurchaseInvoiceItemModelTest(TestCase):
             'unit_price': Decimal('50.00')
         }
     
+    def create_item(self, **overrides):
+        item = PurchaseInvoiceItem(**{**self.item_data, **overrides})
+        item.save(received_by=self.user)
+        return item
+    
     def test_item_creation(self):
         """Test invoice item creation"""
-        item = PurchaseInvoiceItem.objects.create(**self.item_data)
+        item = self.create_item()
         self.assertEqual(item.invoice, self.invoice)
         self.assertEqual(item.product, self.product)
         self.assertEqual(item.quantity, 5)
@@ -181,28 +199,338 @@ class PurchaseInvoiceItemModelTest(TestCase):
     
     def test_item_str(self):
         """Test invoice item string representation"""
-        item = PurchaseInvoiceItem.objects.create(**self.item_data)
+        item = self.create_item()
         self.assertEqual(str(item), f"{self.product.name} - 5")
     
     def test_item_stock_update(self):
         """Test that creating an item updates product stock"""
         initial_stock = self.product.stock_quantity
-        item = PurchaseInvoiceItem.objects.create(**self.item_data)
+        item = self.create_item()
         
         # Refresh product from database
         self.product.refresh_from_db()
         self.assertEqual(self.product.stock_quantity, initial_stock + 5)
     
+    def test_item_stock_update_keeps_concurrent_changes(self):
+        """Test que recibir un item no pisa cambios de stock hechos después de cargar el producto"""
+        stale = Product.objects.get(pk=self.product.pk)
+        apply_movements([{'product_id': self.product.id, 'movement_type': 'out', 'quantity': 4}], self.user)
+
+        self.create_item(product=stale)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 10 - 4 + 5)
+        self.assertEqual(stale.stock_quantity, 11)
+
+        movement = self.product.stock_movements.get(movement_type='in')
+        self.assertEqual(movement.reference, self.invoice.invoice_number)
+        self.assertEqual((movement.previous_quantity, movement.new_quantity), (6, 11))
+
+    def test_item_creation_requires_receiving_user(self):
+        """Test que crear un item sin el usuario que recibe el stock falla sin cambiar nada"""
+        with self.assertRaises(ValueError):
+            PurchaseInvoiceItem.objects.create(**self.item_data)
+        self.assertFalse(PurchaseInvoiceItem.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 10)
+
+    def test_item_stock_movement_records_receiving_user(self):
+        """Test que el movimiento de entrada queda a nombre de quien recibe"""
+        receiver = User.objects.create_user(username='receiver', email='receiver@user.com', password='testpass123')
+        item = PurchaseInvoiceItem(**self.item_data)
+        item.save(received_by=receiver)
+        self.assertEqual(self.product.stock_movements.get(movement_type='in').created_by, receiver)
+
     def test_item_total_price_calculation(self):
         """Test item total price calculation"""
-        item = PurchaseInvoiceItem.objects.create(**self.item_data)
+        item = self.create_item()
         expected_total = Decimal('50.00') * 5
         self.assertEqual(item.total_price, expected_total)
     
     def test_invoice_amount_update(self):
         """Test that creating an item updates invoice amount"""
-        item = PurchaseInvoiceItem.objects.create(**self.item_data)
+        item = self.create_item()
         
         # Refresh invoice from database
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.amount, Decimal('250.00'))
+
+
+class PurchaseInvoiceItemConcurrencyTest(TransactionTestCase):
+    """Stress test: recepción de items mientras otros hilos mueven el mismo stock"""
+
+    THREADS = 4
+    ITEMS_PER_THREAD = 25
+    STOCK = 1000
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('In-memory SQLite does not support concurrent writers; '
+                          'set SQLITE_TEST_NAME to a file path')
+        self.user = User.objects.create_user(
+            username='stress', email='stress@example.com', password='testpass123'
+        )
+        self.supplier = Supplier.objects.create(
+            name='Stress Supplier', email='stress@supplier.com', phone='0', address='-'
+        )
+        self.product = Product.objects.create(
+            name='Hot', sku='HOT-1', price=Decimal('10.00'), stock_quantity=self.STOCK, created_by=self.user
+        )
+
+    def test_items_and_movements_do_not_lose_stock(self):
+        """Test que los items recibidos en paralelo con salidas de stock no pierden unidades"""
+        errors = []
+        start = threading.Barrier(self.THREADS * 2)
+
+        def receive():
+            try:
+                start.wait()
+                for _ in range(self.ITEMS_PER_THREAD):
+                    invoice = PurchaseInvoice.objects.create(
+                        supplier=self.supplier, invoice_date=date.today(), due_date=date.today()
+                    )
+                    # Each item works with a product loaded before the other changes
+                    PurchaseInvoiceItem(
+                        invoice=invoice, product=Product.objects.get(pk=self.product.pk),
+                        quantity=3, unit_price=Decimal('1.00')
+                    ).save(received_by=self.user)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        def ship():
+            try:
+                start.wait()
+                for _ in range(self.ITEMS_PER_THREAD):
+                    StockMovement.objects.create(
+                        product_id=self.product.id, movement_type='out', quantity=2, created_by=self.user
+                    )
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=target) for target in (receive, ship) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        received = self.THREADS * self.ITEMS_PER_THREAD
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, self.STOCK + received * 3 - received * 2)
+        self.assertEqual(self.product.stock_movements.count(), received * 2)
+
+
+class PurchaseInvoiceIngestionTest(TestCase):
+    """Tests para la recepción en lote de facturas de compra"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@user.com',
+            password='testpass123',
+            is_superuser=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.supplier = Supplier.objects.create(
+            name='Test Supplier',
+            email='test@supplier.com',
+            phone='+1234567890',
+            address='Test Address'
+        )
+        self.category = Category.objects.create(name='Test Category')
+        self.products = Product.objects.bulk_create([
+            Product(
+                name=f'Product {i}',
+                sku=f'ING-{i:03d}',
+                category=self.category,
+                price=Decimal('100.00'),
+                cost_price=Decimal('50.00'),
+                stock_quantity=10,
+                created_by=self.user
+            )
+            for i in range(500)
+        ])
+
+    def invoice_payload(self, lines):
+        return {
+            'supplier_id': self.supplier.id,
+            'invoice_date': date.today().isoformat(),
+            'due_date': (date.today() + timedelta(days=30)).isoformat(),
+            'items': [
+                {'product': product.id, 'quantity': 2, 'unit_price': '5.00'}
+                for product in self.products[:lines]
+            ]
+        }
+
+    def post_invoice(self, lines):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('purchaseinvoice-list'), self.invoice_payload(lines), format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_lines(self):
+        """Test que recibir 500 líneas usa un número acotado de consultas"""
+        _, single = self.post_invoice(1)
+        response, many = self.post_invoice(500)
+
+        # Only the batched statements (items, stock UPDATE, movements) grow
+        self.assertLessEqual(many - single, 6)
+        invoice = PurchaseInvoice.objects.get(pk=response.data['id'])
+        self.assertEqual(invoice.amount, Decimal('5000.00'))
+        self.assertEqual(invoice.items.count(), 500)
+
+    def test_stock_and_movements_are_recorded(self):
+        """Test que se incrementa el stock y se registran los movimientos"""
+        response, _ = self.post_invoice(3)
+
+        product = Product.objects.get(pk=self.products[0].pk)
+        self.assertEqual(product.stock_quantity, 12)
+        movements = StockMovement.objects.filter(reference=response.data['invoice_number'])
+        self.assertEqual(movements.count(), 3)
+        movement = movements.get(product=product)
+        self.assertEqual((movement.previous_quantity, movement.new_quantity), (10, 12))
+        self.assertEqual(movement.movement_type, 'in')
+
+    def test_bulk_endpoint(self):
+        """Test el endpoint de recepción de varias facturas"""
+        payload = {'invoices': [self.invoice_payload(2), self.invoice_payload(3)]}
+        response = self.client.post(reverse('purchaseinvoice-bulk'), payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock_quantity, 14)
+        self.assertEqual(Product.objects.get(pk=self.products[2].pk).stock_quantity, 12)
+
+    def test_bulk_endpoint_rejects_unknown_products(self):
+        """Test que un producto inexistente rechaza todo el lote"""
+        invalid = self.invoice_payload(1)
+        invalid['items'].append({'product': 999999, 'quantity': 1, 'unit_price': '1.00'})
+        payload = {'invoices': [self.invoice_payload(2), invalid]}
+        response = self.client.post(reverse('purchaseinvoice-bulk'), payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PurchaseInvoice.objects.exists())
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock_quantity, 10)
+
+    def test_import_command_groups_csv_rows(self):
+        """Test que el comando importa un CSV agrupando las líneas por referencia"""
+        rows = ['reference,supplier_id,invoice_date,due_date,sku,quantity,unit_price']
+        for reference, product in [('A', self.products[0]), ('A', self.products[1]), ('B', self.products[0])]:
+            rows.append(f'{reference},{self.supplier.id},2024-01-10,2024-02-10,{product.sku},4,2.50')
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('\n'.join(rows))
+        self.addCleanup(os.remove, f.name)
+        call_command('import_purchase_invoices', f.name, stdout=StringIO())
+
+        self.assertEqual(PurchaseInvoice.objects.count(), 2)
+        self.assertEqual(
+            sorted(PurchaseInvoice.objects.values_list('amount', flat=True)),
+            [Decimal('10.00'), Decimal('20.00')]
+        )
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock_quantity, 18)
+
+
+class SupplierStatsTest(TestCase):
+    """Tests para las estadísticas de actividad mantenidas por proveedor"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@user.com',
+            password='testpass123'
+        )
+        self.supplier = Supplier.objects.create(
+            name='Stats Supplier', email='stats@supplier.com', phone='+100', address='Address'
+        )
+        self.other = Supplier.objects.create(
+            name='Other Supplier', email='other@supplier.com', phone='+200', address='Address'
+        )
+        self.product = Product.objects.create(
+            name='Stats Product',
+            sku='STATS-001',
+            price=Decimal('20.00'),
+            cost_price=Decimal('10.00'),
+            stock_quantity=0,
+            created_by=self.user
+        )
+
+    def create_invoice(self, supplier, quantity=None):
+        invoice = PurchaseInvoice.objects.create(
+            supplier=supplier, invoice_date=date.today(), due_date=date.today() + timedelta(days=30)
+        )
+        if quantity:
+            self.add_item(invoice, quantity)
+        return invoice
+
+    def add_item(self, invoice, quantity):
+        PurchaseInvoiceItem(
+            invoice=invoice, product=self.product, quantity=quantity, unit_price=Decimal('10.00')
+        ).save(received_by=self.user)
+
+    def assertStats(self, supplier, invoice_count, total_purchases, open_balance):
+        supplier.refresh_from_db()
+        self.assertEqual(
+            (supplier.invoice_count, supplier.total_purchases, supplier.open_balance),
+            (invoice_count, Decimal(total_purchases), Decimal(open_balance))
+        )
+        self.assertEqual(stats.check_consistency(), [])
+
+    def test_stats_follow_invoices_and_payments(self):
+        """Test que las estadísticas siguen facturas, líneas, pagos y bajas"""
+        invoice = self.create_invoice(self.supplier)
+        # No amount until the invoice has items
+        self.assertStats(self.supplier, 1, '0.00', '0.00')
+        self.assertEqual(self.supplier.last_invoice_at, invoice.created_at)
+
+        self.add_item(invoice, 5)
+        self.assertStats(self.supplier, 1, '50.00', '50.00')
+
+        invoice.refresh_from_db()
+        invoice.paid_amount = Decimal('50.00')
+        invoice.update_status()
+        self.assertStats(self.supplier, 1, '50.00', '0.00')
+
+        latest = self.create_invoice(self.supplier, quantity=2)
+        self.assertStats(self.supplier, 2, '70.00', '20.00')
+        self.assertEqual(self.supplier.last_invoice_at, latest.created_at)
+
+        latest.supplier = self.other
+        latest.save()
+        self.assertStats(self.supplier, 1, '50.00', '0.00')
+        self.assertEqual(self.supplier.last_invoice_at, invoice.created_at)
+        self.assertStats(self.other, 1, '20.00', '20.00')
+
+        invoice.delete()
+        self.assertStats(self.supplier, 0, '0.00', '0.00')
+        self.assertIsNone(self.supplier.last_invoice_at)
+
+    def test_bulk_ingestion_and_rebuild(self):
+        """Test que la ingesta en lote mantiene las estadísticas y el comando corrige desvíos"""
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        payload = {'invoices': [
+            {
+                'supplier_id': supplier.id,
+                'invoice_date': str(date.today()),
+                'due_date': str(date.today() + timedelta(days=30)),
+                'items': [{'product': self.product.id, 'quantity': quantity, 'unit_price': '10.00'}],
+            }
+            for supplier, quantity in [(self.supplier, 3), (self.supplier, 1), (self.other, 4)]
+        ]}
+        response = client.post(reverse('purchaseinvoice-bulk'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertStats(self.supplier, 2, '40.00', '40.00')
+        self.assertStats(self.other, 1, '40.00', '40.00')
+
+        PurchaseInvoice.objects.filter(supplier=self.other).update(status='paid', paid_amount=Decimal('40.00'))
+        with self.assertRaises(CommandError):
+            call_command('rebuild_partner_stats', '--check', stdout=StringIO())
+        call_command('rebuild_partner_stats', stdout=StringIO())
+        self.assertStats(self.other, 1, '40.00', '0.00')
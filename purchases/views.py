@@ -3,17 +3,21 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Sum, Count
-from datetime import timedelta
-from django.utils import timezone
+from core.aggregation import choice_rows, summarize
+from core.compact import CompactListMixin
+from core.conditional import ConditionalListMixin
+from core.exports import ExportMixin
+from core.pagination import FlexiblePagination
+from core.query_plans import QueryPlanMixin
 
 from .models import Supplier, PurchaseInvoice
 from .serializers import (
-    SupplierSerializer, PurchaseInvoiceSerializer, PurchaseInvoiceCreateSerializer
+    SupplierSerializer, PurchaseInvoiceSerializer, PurchaseInvoiceCreateSerializer,
+    PurchaseInvoiceBulkCreateSerializer
 )
 
 
-class SupplierViewSet(viewsets.ModelViewSet):
+class SupplierViewSet(ConditionalListMixin, CompactListMixin, QueryPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing suppliers
     """
@@ -24,6 +28,12 @@ class SupplierViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'email', 'contact_person']
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
+    compact_fields = {
+        'id': 'id', 'name': 'name', 'email': 'email', 'contact_person': 'contact_person',
+        'is_active': 'is_active',
+    }
+    # The stats change with the invoices
+    last_modified_models = (Supplier, PurchaseInvoice)
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -41,20 +51,34 @@ class SupplierViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class PurchaseInvoiceViewSet(viewsets.ModelViewSet):
+class PurchaseInvoiceViewSet(ExportMixin, CompactListMixin, QueryPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing purchase invoices
     """
     queryset = PurchaseInvoice.objects.all()
+    pagination_class = FlexiblePagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['status', 'supplier']
     search_fields = ['invoice_number', 'supplier__name']
     ordering_fields = ['invoice_date', 'due_date', 'amount', 'created_at']
     ordering = ['-created_at']
+    export_fields = {
+        'id': 'id', 'invoice_number': 'invoice_number', 'supplier_id': 'supplier_id',
+        'supplier': 'supplier__name', 'invoice_date': 'invoice_date', 'due_date': 'due_date',
+        'amount': 'amount', 'paid_amount': 'paid_amount', 'status': 'status',
+        'created_at': 'created_at',
+    }
+    compact_fields = {
+        'id': 'id', 'invoice_number': 'invoice_number', 'supplier_id': 'supplier_id',
+        'supplier_name': 'supplier__name', 'status': 'status', 'invoice_date': 'invoice_date',
+        'due_date': 'due_date', 'amount': 'amount', 'paid_amount': 'paid_amount',
+    }
 
     def get_serializer_class(self):
         if self.action == 'create':
             return PurchaseInvoiceCreateSerializer
+        if self.action == 'bulk':
+            return PurchaseInvoiceBulkCreateSerializer
         return PurchaseInvoiceSerializer
 
     def get_queryset(self):
@@ -95,54 +119,46 @@ class PurchaseInvoiceViewSet(viewsets.ModelViewSet):
             'balance': float(invoice.balance)
         })
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Receive many purchase invoices in a single transaction
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        invoices = serializer.save()['invoices']
+
+        return Response({
+            'created': len(invoices),
+            'invoices': [
+                {
+                    'id': invoice.id,
+                    'invoice_number': invoice.invoice_number,
+                    'amount': float(invoice.amount)
+                }
+                for invoice in invoices
+            ]
+        }, status=status.HTTP_201_CREATED)
+
     @action(detail=False, methods=['get'])
     def purchase_summary(self, request):
         """
         Get purchase summary statistics
         """
-        today = timezone.now().date()
-        this_month = today.replace(day=1)
-        last_month = (this_month - timedelta(days=1)).replace(day=1)
-        
-        # Total purchases
-        total_purchases = PurchaseInvoice.objects.aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-        
-        # This month purchases
-        this_month_purchases = PurchaseInvoice.objects.filter(
-            invoice_date__gte=this_month
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Last month purchases
-        last_month_purchases = PurchaseInvoice.objects.filter(
-            invoice_date__gte=last_month,
-            invoice_date__lt=this_month
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Invoices by status
-        invoices_by_status = PurchaseInvoice.objects.values('status').annotate(
-            count=Count('id'),
-            total_amount=Sum('amount')
-        )
-        
-        # Outstanding invoices
-        outstanding_invoices = PurchaseInvoice.objects.filter(
-            status__in=['pending', 'partial']
-        ).aggregate(
-            count=Count('id'),
-            total_amount=Sum('amount'),
-            total_paid=Sum('paid_amount')
-        )
+        # Every registered metric (purchases/metrics.py) in a single scan
+        summary = summarize(PurchaseInvoice.objects.all())
         
         return Response({
-            'total_purchases': float(total_purchases),
-            'this_month_purchases': float(this_month_purchases),
-            'last_month_purchases': float(last_month_purchases),
-            'invoices_by_status': list(invoices_by_status),
+            'total_purchases': float(summary['total_purchases']),
+            'this_month_purchases': float(summary['this_month_purchases']),
+            'last_month_purchases': float(summary['last_month_purchases']),
+            'invoices_by_status': choice_rows(
+                summary, PurchaseInvoice, 'status', count='invoices_{}', total_amount='amount_{}'
+            ),
             'outstanding_invoices': {
-                'count': outstanding_invoices['count'] or 0,
-                'total_amount': float(outstanding_invoices['total_amount'] or 0),
-                'total_paid': float(outstanding_invoices['total_paid'] or 0)
+                'count': summary['outstanding_count'],
+                'total_amount': float(summary['outstanding_amount']),
+                'total_paid': float(summary['outstanding_paid']),
+                'balance': float(summary['outstanding_balance'])
             }
         })
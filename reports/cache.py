@@ -0,0 +1,147 @@
+"""
+Cached report payloads
+
+Payloads are stored in the Django cache (``REPORTS_CACHE['ALIAS']``) under
+a key per report and period, together with the *generation* they were
+computed for. Saving any model the reports read bumps the generation once
+the transaction commits (see ``reports.signals``), which makes every
+cached payload stale at once without knowing their keys.
+
+Stale payloads keep being served while a single background thread
+recomputes them (stale-while-revalidate), so readers only wait for the
+computation on a cold cache. Payloads older than ``STALE_TIMEOUT`` are
+dropped by the cache backend.
+
+Hits, misses and stale reads are counted in the cache as well, so with a
+shared backend (Redis, file) the generation and the counters cover every
+worker process.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 60,
+    'STALE_TIMEOUT': 3600,
+    'BACKGROUND_REFRESH': True,
+}
+COUNTERS = ('hits', 'misses', 'stale')
+KEY_PREFIX = 'reports'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REPORTS_CACHE', {})}
+
+
+def _cache():
+    return caches[get_config()['ALIAS']]
+
+
+def _key(*parts):
+    return ':'.join((KEY_PREFIX,) + parts)
+
+
+def _incr(key, initial):
+    cache = _cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Missing (never set or evicted)
+        if cache.add(key, initial, timeout=None):
+            return initial
+        return cache.incr(key)
+
+
+def generation():
+    """Current generation of the cached payloads"""
+    value = _cache().get(_key('generation'))
+    if value is None:
+        # Starting from the clock means an evicted counter never goes back
+        # to a value some cached payload was computed for
+        _cache().add(_key('generation'), time.time_ns(), timeout=None)
+        value = _cache().get(_key('generation'))
+    return value
+
+
+def invalidate():
+    """Make every cached payload stale"""
+    _incr(_key('generation'), time.time_ns())
+
+
+def invalidate_on_commit():
+    transaction.on_commit(invalidate)
+
+
+def cached(name, period, compute):
+    """
+    Return the payload of report ``name`` for ``period`` (a string),
+    calling ``compute()`` to build it when needed.
+    """
+    config = get_config()
+    key = _key(name, period)
+    current = generation()
+    entry = _cache().get(key)
+
+    if entry is None:
+        _incr(_key('misses'), 1)
+        return _store(key, current, compute)
+
+    if entry['generation'] == current and time.time() - entry['computed_at'] < config['TIMEOUT']:
+        _incr(_key('hits'), 1)
+        return entry['data']
+
+    _incr(_key('stale'), 1)
+    if not config['BACKGROUND_REFRESH']:
+        return _store(key, current, compute)
+    _refresh_in_background(key, current, compute)
+    return entry['data']
+
+
+def _store(key, current, compute):
+    data = compute()
+    _cache().set(
+        key,
+        {'generation': current, 'computed_at': time.time(), 'data': data},
+        timeout=get_config()['STALE_TIMEOUT'],
+    )
+    return data
+
+
+def _refresh_in_background(key, current, compute):
+    """Recompute ``key`` in a thread, unless another request already is"""
+    lock = _key(key, 'refreshing')
+    if not _cache().add(lock, True, timeout=max(get_config()['TIMEOUT'], 30)):
+        return None
+
+    def refresh():
+        try:
+            _store(key, current, compute)
+        except Exception:
+            logger.exception('Could not refresh %s', key)
+        finally:
+            _cache().delete(lock)
+            connections.close_all()
+
+    thread = threading.Thread(target=refresh, name=f'refresh {key}', daemon=True)
+    thread.start()
+    return thread
+
+
+def stats():
+    """Hit, miss and stale read counters"""
+    values = _cache().get_many([_key(name) for name in COUNTERS])
+    counters = {name: values.get(_key(name), 0) for name in COUNTERS}
+    reads = sum(counters.values())
+    counters['hit_ratio'] = round(counters['hits'] / reads, 4) if reads else None
+    return counters
+
+
+def reset_stats():
+    _cache().delete_many([_key(name) for name in COUNTERS])
@@ -0,0 +1,223 @@
+"""
+Background report jobs
+
+Slow reports can be requested as jobs (``POST /api/reports/jobs/``) instead
+of being computed while the client waits. Jobs are rows of ``ReportJob``,
+so the queue lives in the database and needs no broker: the report worker
+(``manage.py run_report_worker``) claims pending jobs, computes them with
+the same code as the synchronous endpoints (``reports.payloads``) and
+stores the JSON payload gzip compressed.
+
+- Identical requests (same report and parameters) share one job while it
+  is pending or running, and reuse a finished one for ``REUSE_SECONDS``.
+  A unique constraint on the active jobs settles concurrent requests.
+- Several worker threads and processes can run at once: on PostgreSQL
+  jobs are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED``, elsewhere
+  with a conditional update, so each job runs once.
+- Cancelling a pending job removes it from the queue; a running one can't
+  be interrupted, but its result is discarded.
+- Jobs left running longer than ``TIMEOUT`` (their worker died) are
+  queued again, up to ``MAX_ATTEMPTS`` times.
+- Finished jobs are kept for ``RETENTION`` seconds and then deleted by
+  ``manage.py cleanup_report_jobs``.
+"""
+import gzip
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.renderers import FastJSONRenderer
+from . import payloads
+from .models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WORKERS': 2,
+    'POLL_INTERVAL': 2,
+    'TIMEOUT': 900,
+    'MAX_ATTEMPTS': 3,
+    'RETENTION': 7 * 24 * 3600,
+    'REUSE_SECONDS': 60,
+    'COMPRESS_LEVEL': 6,
+}
+
+# Reports that can run as jobs: name -> (payload function, date parameters)
+REPORTS = {
+    'sales_report': (payloads.sales_report, ('start_date', 'end_date')),
+    'inventory_report': (payloads.inventory_report, ()),
+    'financial_report': (payloads.financial_report, ('start_date', 'end_date')),
+    'aging_report': (payloads.aging_report, ('as_of',)),
+}
+
+# Pending jobs a worker tries to claim per poll without SKIP LOCKED
+CLAIM_BATCH = 10
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REPORT_JOBS', {})}
+
+
+def params_hash(report, params):
+    key = json.dumps({'report': report, 'params': params}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _retention(now):
+    return now + timedelta(seconds=get_config()['RETENTION'])
+
+
+def _reusable(digest):
+    reuse_since = timezone.now() - timedelta(seconds=get_config()['REUSE_SECONDS'])
+    return ReportJob.objects.filter(params_hash=digest).filter(
+        Q(status__in=ReportJob.ACTIVE_STATUSES) | Q(status=ReportJob.DONE, finished_at__gte=reuse_since)
+    ).defer('result').order_by('-created_at').first()
+
+
+def enqueue(report, params=None, user=None, refresh=False):
+    """
+    Queue ``report`` with ``params`` (ISO dates) unless an identical job can
+    be shared. Returns ``(job, created)``; ``refresh`` skips finished jobs.
+    """
+    params = params or {}
+    digest = params_hash(report, params)
+    for _ in range(3):
+        job = None
+        if refresh:
+            job = ReportJob.objects.filter(
+                params_hash=digest, status__in=ReportJob.ACTIVE_STATUSES
+            ).defer('result').first()
+        else:
+            job = _reusable(digest)
+        if job is not None:
+            return job, False
+        try:
+            with transaction.atomic():
+                return ReportJob.objects.create(
+                    report=report, params=params, params_hash=digest, requested_by=user
+                ), True
+        except IntegrityError:
+            # An identical job was queued meanwhile: look it up again
+            continue
+    raise RuntimeError(f'Could not enqueue {report}')
+
+
+def claim(worker):
+    """Mark the oldest pending job as running for ``worker`` and return it"""
+    now = timezone.now()
+    queue = ReportJob.objects.filter(status=ReportJob.PENDING).order_by('created_at')
+    connection = connections[router.db_for_write(ReportJob)]
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=connection.alias):
+            job = queue.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status, job.worker, job.started_at = ReportJob.RUNNING, worker, now
+            job.attempts += 1
+            job.save(update_fields=['status', 'worker', 'started_at', 'attempts'])
+            return job
+
+    # Without SKIP LOCKED (SQLite) only one worker's conditional update wins
+    for pk in queue.values_list('pk', flat=True)[:CLAIM_BATCH]:
+        claimed = ReportJob.objects.filter(pk=pk, status=ReportJob.PENDING).update(
+            status=ReportJob.RUNNING, worker=worker, started_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return ReportJob.objects.get(pk=pk)
+    return None
+
+
+def _finish(job, status, **fields):
+    """Store the outcome unless the job was cancelled or taken over meanwhile"""
+    now = timezone.now()
+    return bool(ReportJob.objects.filter(
+        pk=job.pk, status=ReportJob.RUNNING, worker=job.worker
+    ).update(status=status, finished_at=now, expires_at=_retention(now), **fields))
+
+
+def execute(job):
+    """Compute a claimed job and store its result or error"""
+    function, date_params = REPORTS[job.report]
+    kwargs = {name: parse_date(job.params[name]) for name in date_params if job.params.get(name)}
+    try:
+        content = FastJSONRenderer().render(function(**kwargs))
+    except Exception as exc:
+        logger.exception('Report job %s failed', job.pk)
+        return _finish(job, ReportJob.FAILED, error=f'{type(exc).__name__}: {exc}')
+
+    stored = _finish(
+        job, ReportJob.DONE,
+        result=gzip.compress(content, compresslevel=get_config()['COMPRESS_LEVEL']),
+        result_size=len(content),
+    )
+    if not stored:
+        logger.info('Report job %s was cancelled, result discarded', job.pk)
+    return stored
+
+
+def result_content(job, compressed=False):
+    """JSON payload of a finished job (gzip encoded when ``compressed``)"""
+    content = bytes(job.result)
+    return content if compressed else gzip.decompress(content)
+
+
+def cancel(job):
+    """Cancel a pending or running job; False when it had already finished"""
+    now = timezone.now()
+    cancelled = ReportJob.objects.filter(pk=job.pk, status__in=ReportJob.ACTIVE_STATUSES).update(
+        status=ReportJob.CANCELLED, finished_at=now, expires_at=_retention(now)
+    )
+    job.refresh_from_db()
+    return bool(cancelled)
+
+
+def requeue_stale():
+    """Queue again jobs whose worker stopped while running them"""
+    config = get_config()
+    now = timezone.now()
+    stale = ReportJob.objects.filter(
+        status=ReportJob.RUNNING, started_at__lt=now - timedelta(seconds=config['TIMEOUT'])
+    )
+    failed = stale.filter(attempts__gte=config['MAX_ATTEMPTS']).update(
+        status=ReportJob.FAILED, error='Timed out', finished_at=now, expires_at=_retention(now)
+    )
+    requeued = stale.update(status=ReportJob.PENDING, worker='', started_at=None)
+    return requeued, failed
+
+
+def cleanup(now=None):
+    """Delete finished jobs past their retention; returns how many"""
+    expired = ReportJob.objects.filter(expires_at__lt=now or timezone.now()).exclude(
+        status__in=ReportJob.ACTIVE_STATUSES
+    )
+    return expired.delete()[0]
+
+
+def work(worker, stop, once=False):
+    """
+    Run jobs until ``stop`` (a ``threading.Event``) is set, or until the
+    queue is empty with ``once``.
+    """
+    poll_interval = get_config()['POLL_INTERVAL']
+    try:
+        while not stop.is_set():
+            # Long-running process: honour CONN_MAX_AGE and drop broken connections
+            close_old_connections()
+            job = claim(worker)
+            if job is None:
+                if once:
+                    return
+                requeue_stale()
+                stop.wait(poll_interval)
+                continue
+            execute(job)
+    finally:
+        connections.close_all()
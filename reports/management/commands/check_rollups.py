@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reports import rollups
+
+
+class Command(BaseCommand):
+    help = 'Compara las tablas de rollups contra las tablas de ventas y compras'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Reconstruye los rollups si se encuentran diferencias',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('🔍 Verificando rollups...'))
+        mismatches = rollups.check_consistency()
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('✅ Rollups consistentes'))
+            return
+
+        for name, key, expected, actual in mismatches:
+            self.stdout.write(f'   - {name} {key}: esperado={expected} actual={actual}')
+
+        if options['fix']:
+            rollups.rebuild()
+            self.stdout.write(self.style.SUCCESS('🎉 Rollups reconstruidos'))
+            return
+
+        raise CommandError(f'{len(mismatches)} diferencias encontradas en los rollups')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from reports import jobs
+
+
+class Command(BaseCommand):
+    help = 'Elimina los trabajos de reportes terminados cuya retención venció'
+
+    def handle(self, *args, **options):
+        requeued, failed = jobs.requeue_stale()
+        if requeued or failed:
+            self.stdout.write(f'   - {requeued} trabajos colgados reencolados, {failed} marcados como fallidos')
+        deleted = jobs.cleanup()
+        self.stdout.write(self.style.SUCCESS(f'🧹 {deleted} trabajos de reportes eliminados'))
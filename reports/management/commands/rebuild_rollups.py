@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from reports import cache, rollups
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero las tablas de rollups de ventas y compras'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Cantidad de filas por INSERT al reconstruir',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('🔄 Reconstruyendo rollups...'))
+        written = rollups.rebuild(batch_size=options['batch_size'])
+        cache.invalidate()
+        for name, count in written.items():
+            self.stdout.write(f'   - {name}: {count} filas')
+        self.stdout.write(self.style.SUCCESS('🎉 Rollups reconstruidos exitosamente!'))
@@ -0,0 +1,46 @@
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+
+from reports import jobs
+
+
+class Command(BaseCommand):
+    help = 'Procesa los trabajos de reportes en segundo plano (POST /api/reports/jobs/)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=jobs.get_config()['WORKERS'],
+            help='Cantidad de hilos que calculan reportes en paralelo',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesa los trabajos pendientes y termina',
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            # SIGTERM (docker stop) lets the running jobs finish
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda *_: stop.set())
+
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        threads = [
+            threading.Thread(
+                target=jobs.work, args=(f'{prefix}:{n}', stop, options['once']), name=f'report-worker-{n}'
+            )
+            for n in range(max(options['threads'], 1))
+        ]
+        self.stdout.write(self.style.WARNING(f'⚙️  Worker de reportes iniciado ({len(threads)} hilos)'))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stdout.write(self.style.SUCCESS('✅ Worker de reportes detenido'))
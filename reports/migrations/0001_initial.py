@@ -0,0 +1,91 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('purchases', '0002_alter_purchaseinvoice_amount'),
+        ('sales', '0002_initial'),
+        ('inventory', '0003_alter_product_category_alter_product_cost_price_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPurchaseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('invoice_count', models.IntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'rollup_daily_purchases',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('order_count', models.IntegerField(default=0)),
+                ('total_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'rollup_daily_sales',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SupplierPurchaseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('invoice_count', models.IntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchase_rollups', to='purchases.supplier')),
+            ],
+            options={
+                'db_table': 'rollup_supplier_purchases',
+                'unique_together': {('supplier', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CustomerSalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('order_count', models.IntegerField(default=0)),
+                ('total_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='sales.customer')),
+            ],
+            options={
+                'db_table': 'rollup_customer_sales',
+                'unique_together': {('customer', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CategorySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('total_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='inventory.category')),
+            ],
+            options={
+                'db_table': 'rollup_category_sales',
+                'unique_together': {('category', 'date')},
+            },
+        ),
+    ]
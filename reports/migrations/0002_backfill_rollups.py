@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def backfill_rollups(apps, schema_editor):
+    from reports.rollups import rebuild
+    rebuild(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
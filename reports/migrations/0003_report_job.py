@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reports', '0002_backfill_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report', models.CharField(max_length=50)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('params_hash', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('result', models.BinaryField(blank=True, null=True)),
+                ('result_size', models.PositiveIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'report_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='report_job_queue_idx'), models.Index(fields=['params_hash', 'status'], name='report_job_params_idx'), models.Index(fields=['expires_at'], name='report_job_expires_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('params_hash',), name='report_job_active_unique'),
+        ),
+    ]
@@ -1,3 +1,151 @@
 from django.db import models
+from inventory.models import Category
+from sales.models import Customer
+from purchases.models import Supplier
+from users.models import User
 
-# Create your models here.
+
+class DailySalesRollup(models.Model):
+    """
+    Delivered sales aggregated per order date
+    """
+    date = models.DateField(unique=True)
+    order_count = models.IntegerField(default=0)
+    total_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'rollup_daily_sales'
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date}: {self.total_sales}"
+
+
+class CustomerSalesRollup(models.Model):
+    """
+    Delivered sales aggregated per customer and order date
+    """
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='sales_rollups')
+    date = models.DateField()
+    order_count = models.IntegerField(default=0)
+    total_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'rollup_customer_sales'
+        unique_together = ['customer', 'date']
+
+    def __str__(self):
+        return f"{self.customer_id} {self.date}: {self.total_sales}"
+
+
+class CategorySalesRollup(models.Model):
+    """
+    Delivered sale order items aggregated per product category and order date
+    """
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='sales_rollups')
+    date = models.DateField()
+    quantity = models.IntegerField(default=0)
+    total_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'rollup_category_sales'
+        unique_together = ['category', 'date']
+
+    def __str__(self):
+        return f"{self.category_id} {self.date}: {self.total_sales}"
+
+
+class DailyPurchaseRollup(models.Model):
+    """
+    Purchase invoices aggregated per invoice date
+    """
+    date = models.DateField(unique=True)
+    invoice_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'rollup_daily_purchases'
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date}: {self.total_amount}"
+
+
+class SupplierPurchaseRollup(models.Model):
+    """
+    Purchase invoices aggregated per supplier and invoice date
+    """
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, related_name='purchase_rollups')
+    date = models.DateField()
+    invoice_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'rollup_supplier_purchases'
+        unique_together = ['supplier', 'date']
+
+    def __str__(self):
+        return f"{self.supplier_id} {self.date}: {self.total_amount}"
+
+
+class ReportJob(models.Model):
+    """
+    A report computed in the background by the report worker (see reports/jobs.py)
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+    ]
+    ACTIVE_STATUSES = (PENDING, RUNNING)
+
+    report = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    # Identifies report and parameters: identical requests share a job
+    params_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    # gzip compressed JSON payload, as returned by the synchronous endpoint
+    result = models.BinaryField(null=True, blank=True)
+    result_size = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='report_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'report_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='report_job_queue_idx'),
+            models.Index(fields=['params_hash', 'status'], name='report_job_params_idx'),
+            models.Index(fields=['expires_at'], name='report_job_expires_idx'),
+        ]
+        constraints = [
+            # At most one pending or running job per report and parameters
+            models.UniqueConstraint(
+                fields=['params_hash'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='report_job_active_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.report} #{self.pk} ({self.status})"
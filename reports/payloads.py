@@ -0,0 +1,188 @@
+"""
+Report payloads
+
+The data of the reports that can also be computed in the background
+(``reports.jobs``), built outside of a request so the API views and the
+report worker return the same payload.
+"""
+from django.db.models import Sum, F, DecimalField, ExpressionWrapper
+
+from core.aggregation import AGING_BUCKETS, aging_rows, current_period, summarize, summarize_by
+from inventory.models import Product, Category, StockMovement
+from sales.metrics import OUTSTANDING as OPEN_INVOICES
+from sales.models import Invoice
+from purchases.metrics import OUTSTANDING as OPEN_PURCHASE_INVOICES
+from purchases.models import PurchaseInvoice
+from . import rollups
+
+# Customers/suppliers with the largest balances listed in the aging report
+AGING_TOP = 20
+
+
+def inventory_products():
+    """Active products with their stock value, most valuable first"""
+    return Product.objects.filter(is_active=True).annotate(
+        stock_value=ExpressionWrapper(
+            F('stock_quantity') * F('cost_price'),
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        )
+    ).order_by('-stock_value')
+
+
+def sales_report(start_date=None, end_date=None):
+    # Sales by date, top customers and categories (closed days come from rollups)
+    sales_by_date = rollups.sales_by_date(start_date, end_date)
+    top_customers = rollups.top_customers(start_date, end_date, limit=10)
+    sales_by_category = rollups.sales_by_category(start_date, end_date)
+
+    # Sales summary
+    total_orders, total_sales = rollups.sales_totals(start_date, end_date)
+    avg_order_value = total_sales / total_orders if total_orders else 0
+
+    return {
+        'summary': {
+            'total_sales': total_sales,
+            'total_orders': total_orders,
+            'average_order_value': avg_order_value
+        },
+        'sales_by_date': sales_by_date,
+        'top_customers': top_customers,
+        'sales_by_category': sales_by_category
+    }
+
+
+def inventory_report():
+    # Stock levels
+    products = inventory_products().select_related('category')
+
+    # Categories summary (maintained counters, see inventory/counters.py)
+    categories_summary = Category.objects.order_by('name')
+
+    # Low stock products
+    low_stock_products = Product.objects.filter(
+        stock_quantity__lte=F('min_stock_level'),
+        is_active=True
+    )
+
+    # Recent stock movements
+    recent_movements = StockMovement.objects.select_related('product').order_by('-created_at')[:20]
+
+    return {
+        'products': [
+            {
+                'id': product.id,
+                'name': product.name,
+                'sku': product.sku,
+                'stock_quantity': product.stock_quantity,
+                'stock_value': product.stock_value,
+                'category': product.category.name if product.category else None
+            } for product in products
+        ],
+        'categories_summary': [
+            {
+                'name': cat.name,
+                'product_count': cat.product_count,
+                'total_stock': cat.total_stock,
+                'total_value': cat.total_stock_value
+            } for cat in categories_summary
+        ],
+        'low_stock_products': [
+            {
+                'id': product.id,
+                'name': product.name,
+                'sku': product.sku,
+                'stock_quantity': product.stock_quantity,
+                'min_stock_level': product.min_stock_level
+            } for product in low_stock_products
+        ],
+        'recent_movements': [
+            {
+                'product': movement.product.name,
+                'movement_type': movement.movement_type,
+                'quantity': movement.quantity,
+                'created_at': movement.created_at
+            } for movement in recent_movements
+        ]
+    }
+
+
+def financial_report(start_date=None, end_date=None):
+    # Sales revenue
+    _, total_revenue = rollups.sales_totals(start_date, end_date)
+
+    # Purchase costs
+    _, total_costs = rollups.purchase_totals(start_date, end_date)
+
+    # Inventory value
+    inventory_value = Product.objects.filter(is_active=True).aggregate(
+        total=Sum(F('stock_quantity') * F('cost_price'))
+    )['total'] or 0
+
+    # Outstanding invoices
+    outstanding_sales = summarize(
+        Invoice.objects.filter(OPEN_INVOICES), ['outstanding_balance']
+    )['outstanding_balance']
+
+    outstanding_purchases = summarize(
+        PurchaseInvoice.objects.filter(OPEN_PURCHASE_INVOICES), ['outstanding_balance']
+    )['outstanding_balance']
+
+    # Profit calculation
+    gross_profit = total_revenue - total_costs
+
+    return {
+        'revenue': {
+            'total_revenue': total_revenue,
+            'outstanding_receivables': outstanding_sales
+        },
+        'costs': {
+            'total_costs': total_costs,
+            'outstanding_payables': outstanding_purchases
+        },
+        'inventory': {
+            'inventory_value': inventory_value
+        },
+        'profitability': {
+            'gross_profit': gross_profit,
+            'gross_margin': (gross_profit / total_revenue * 100) if total_revenue > 0 else 0
+        }
+    }
+
+
+def _aging(open_invoices, partner, period):
+    """Totals and buckets of ``open_invoices``, and the partners owing the most"""
+    buckets = [f'aging_{bucket}' for bucket, _, _ in AGING_BUCKETS]
+    summary = summarize(
+        open_invoices,
+        ['outstanding_count', 'outstanding_balance'] + buckets + [f'{name}_count' for name in buckets],
+        period,
+    )
+    partners = summarize_by(
+        open_invoices, [partner, f'{partner}__name'], ['outstanding_count', 'outstanding_balance'] + buckets,
+        period, order_by=['-outstanding_balance', partner], limit=AGING_TOP,
+    )
+    return {
+        'outstanding_count': summary['outstanding_count'],
+        'outstanding_balance': summary['outstanding_balance'],
+        'aging': aging_rows(summary),
+        'top': [
+            {
+                'id': row[partner],
+                'name': row[f'{partner}__name'],
+                'outstanding_count': row['outstanding_count'],
+                'outstanding_balance': row['outstanding_balance'],
+                'aging': {bucket: row[f'aging_{bucket}'] for bucket, _, _ in AGING_BUCKETS},
+            } for row in partners
+        ],
+    }
+
+
+def aging_report(as_of=None):
+    """Receivables and payables aging, by days past due on ``as_of`` (today)"""
+    period = current_period(as_of)
+    return {
+        'as_of': period.today,
+        'receivables': _aging(Invoice.objects.filter(OPEN_INVOICES), 'sale_order__customer', period),
+        'payables': _aging(PurchaseInvoice.objects.filter(OPEN_PURCHASE_INVOICES), 'supplier', period),
+    }
+
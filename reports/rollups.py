@@ -0,0 +1,469 @@
+"""
+Materialized sales/purchase rollups
+
+Report endpoints read closed days from the rollup tables and only scan the
+raw ``sale_orders``/``purchase_invoices`` tables for the current (still
+open) day onwards. Rollups are kept current incrementally by the handlers
+in ``reports.signals`` and can be rebuilt or verified with the
+``rebuild_rollups`` and ``check_rollups`` management commands.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+ZERO = Decimal('0.00')
+
+# model label -> (key fields, value fields)
+ROLLUP_TABLES = {
+    'DailySalesRollup': (('date',), ('order_count', 'total_sales')),
+    'CustomerSalesRollup': (('customer_id', 'date'), ('order_count', 'total_sales')),
+    'CategorySalesRollup': (('category_id', 'date'), ('quantity', 'total_sales')),
+    'DailyPurchaseRollup': (('date',), ('invoice_count', 'total_amount')),
+    'SupplierPurchaseRollup': (('supplier_id', 'date'), ('invoice_count', 'total_amount')),
+}
+
+
+def _model(name, apps=global_apps):
+    return apps.get_model('reports', name)
+
+
+def _decimal(value):
+    if value is None:
+        return ZERO
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def bump(model, keys, **deltas):
+    """
+    Add ``deltas`` to the rollup row identified by ``keys``, creating it
+    when missing. Uses F() updates so concurrent writers don't lose updates.
+    """
+    updated = model.objects.filter(**keys).update(
+        **{field: F(field) + value for field, value in deltas.items()}
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **deltas)
+    except IntegrityError:
+        # Another writer created the row first
+        model.objects.filter(**keys).update(
+            **{field: F(field) + value for field, value in deltas.items()}
+        )
+
+
+# ---------------------------------------------------------------------------
+# Incremental maintenance
+# ---------------------------------------------------------------------------
+
+def _delivered(values):
+    if values is None or values.get('status') != 'delivered':
+        return None
+    return values
+
+
+def _apply_sale(values, sign):
+    total = _decimal(values['total_amount']) * sign
+    bump(_model('DailySalesRollup'), {'date': values['order_date']},
+         order_count=sign, total_sales=total)
+    bump(_model('CustomerSalesRollup'),
+         {'customer_id': values['customer_id'], 'date': values['order_date']},
+         order_count=sign, total_sales=total)
+
+
+def _order_category_totals(order_id):
+    SaleOrderItem = global_apps.get_model('sales', 'SaleOrderItem')
+    return SaleOrderItem.objects.filter(
+        order_id=order_id, product__category__isnull=False
+    ).values('product__category_id').annotate(
+        quantity=Sum('quantity'), total=Sum('total_price')
+    )
+
+
+def _apply_categories(rows, date, sign):
+    CategorySalesRollup = _model('CategorySalesRollup')
+    for row in rows:
+        bump(CategorySalesRollup,
+             {'category_id': row['product__category_id'], 'date': date},
+             quantity=row['quantity'] * sign,
+             total_sales=_decimal(row['total']) * sign)
+
+
+def apply_sale_order_change(order_id, old, new):
+    """
+    Apply the rollup delta of a sale order going from ``old`` to ``new``
+    tracked values (either may be None for creation/deletion). Only
+    delivered orders contribute to the rollups.
+    """
+    old, new = _delivered(old), _delivered(new)
+    if old == new:
+        return
+    if old:
+        _apply_sale(old, -1)
+    if new:
+        _apply_sale(new, 1)
+
+    # Per-category rows depend on the items, so they only move when the
+    # order enters/leaves "delivered" or changes date. Item edits on a
+    # delivered order are handled by apply_sale_item_change.
+    if (old is None) != (new is None) or old['order_date'] != new['order_date']:
+        rows = list(_order_category_totals(order_id))
+        if old:
+            _apply_categories(rows, old['order_date'], -1)
+        if new:
+            _apply_categories(rows, new['order_date'], 1)
+
+
+def apply_sale_order_deletion(old):
+    """
+    Revert a deleted sale order. Its per-category rows are reverted by the
+    item deletes cascaded before it.
+    """
+    old = _delivered(old)
+    if old:
+        _apply_sale(old, -1)
+
+
+def apply_sale_item_change(order_date, old, new):
+    """Apply the per-category delta of an item edit on a delivered order"""
+    if old == new:
+        return
+    Product = global_apps.get_model('inventory', 'Product')
+    product_ids = {v['product_id'] for v in (old, new) if v}
+    categories = dict(
+        Product.objects.filter(pk__in=product_ids).values_list('id', 'category_id')
+    )
+    for values, sign in ((old, -1), (new, 1)):
+        if not values or not categories.get(values['product_id']):
+            continue
+        bump(_model('CategorySalesRollup'),
+             {'category_id': categories[values['product_id']], 'date': order_date},
+             quantity=(values['quantity'] or 0) * sign,
+             total_sales=_decimal(values['total_price']) * sign)
+
+
+def apply_purchase_invoice_change(old, new):
+    """Apply the rollup delta of a purchase invoice going from ``old`` to ``new``"""
+    if old == new:
+        return
+    for values, sign in ((old, -1), (new, 1)):
+        if not values:
+            continue
+        amount = _decimal(values['amount']) * sign
+        bump(_model('DailyPurchaseRollup'), {'date': values['invoice_date']},
+             invoice_count=sign, total_amount=amount)
+        bump(_model('SupplierPurchaseRollup'),
+             {'supplier_id': values['supplier_id'], 'date': values['invoice_date']},
+             invoice_count=sign, total_amount=amount)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def _date_range(field, start, end):
+    q = Q()
+    if start:
+        q &= Q(**{f'{field}__gte': start})
+    if end:
+        q &= Q(**{f'{field}__lte': end})
+    return q
+
+
+def split_range(start=None, end=None):
+    """
+    Split ``[start, end]`` into the closed-days part served from rollups
+    and the live part (today onwards) that is scanned from the raw tables.
+    Either part is None when empty.
+    """
+    today = timezone.localdate()
+    yesterday = today - timedelta(days=1)
+
+    rollup_end = yesterday if end is None or end > yesterday else end
+    rollup = (start, rollup_end) if start is None or start <= rollup_end else None
+
+    live_start = today if start is None or start < today else start
+    live = (live_start, end) if end is None or end >= live_start else None
+    return rollup, live
+
+
+def _delivered_orders(start, end):
+    SaleOrder = global_apps.get_model('sales', 'SaleOrder')
+    return SaleOrder.objects.filter(_date_range('order_date', start, end), status='delivered')
+
+
+def _purchase_invoices(start, end):
+    PurchaseInvoice = global_apps.get_model('purchases', 'PurchaseInvoice')
+    return PurchaseInvoice.objects.filter(_date_range('invoice_date', start, end))
+
+
+def sales_totals(start=None, end=None):
+    """Return ``(order_count, total_sales)`` of delivered orders in range"""
+    rollup, live = split_range(start, end)
+    count, total = 0, ZERO
+    if rollup:
+        totals = _model('DailySalesRollup').objects.filter(
+            _date_range('date', *rollup)
+        ).aggregate(count=Sum('order_count'), total=Sum('total_sales'))
+        count += totals['count'] or 0
+        total += _decimal(totals['total'])
+    if live:
+        totals = _delivered_orders(*live).aggregate(
+            count=Count('id'), total=Sum('total_amount')
+        )
+        count += totals['count'] or 0
+        total += _decimal(totals['total'])
+    return count, total
+
+
+def sales_by_date(start=None, end=None):
+    """Return delivered sales grouped by order date, oldest first"""
+    rollup, live = split_range(start, end)
+    rows = []
+    if rollup:
+        rows += [
+            {'order_date': row['date'], 'total_sales': row['total_sales'],
+             'order_count': row['order_count']}
+            for row in _model('DailySalesRollup').objects.filter(
+                _date_range('date', *rollup), order_count__gt=0
+            ).order_by('date').values('date', 'total_sales', 'order_count')
+        ]
+    if live:
+        rows += list(
+            _delivered_orders(*live).values('order_date').annotate(
+                total_sales=Sum('total_amount'), order_count=Count('id')
+            ).order_by('order_date')
+        )
+    return rows
+
+
+def top_customers(start=None, end=None, limit=10):
+    """Return the customers with the highest delivered sales in range"""
+    rollup, live = split_range(start, end)
+    merged = defaultdict(lambda: {'total_sales': ZERO, 'order_count': 0})
+    sources = []
+    if rollup:
+        sources.append(
+            _model('CustomerSalesRollup').objects.filter(
+                _date_range('date', *rollup)
+            ).values('customer__name').annotate(
+                total=Sum('total_sales'), count=Sum('order_count')
+            )
+        )
+    if live:
+        sources.append(
+            _delivered_orders(*live).values('customer__name').annotate(
+                total=Sum('total_amount'), count=Count('id')
+            )
+        )
+    for source in sources:
+        for row in source:
+            entry = merged[row['customer__name']]
+            entry['total_sales'] += _decimal(row['total'])
+            entry['order_count'] += row['count'] or 0
+
+    customers = [
+        {'customer__name': name, **values}
+        for name, values in merged.items() if values['order_count'] > 0
+    ]
+    customers.sort(key=lambda row: row['total_sales'], reverse=True)
+    return customers[:limit]
+
+
+def sales_by_category(start=None, end=None):
+    """Return delivered sales grouped by product category"""
+    rollup, live = split_range(start, end)
+    merged = defaultdict(lambda: {'quantity': 0, 'total_sales': ZERO})
+    sources = []
+    if rollup:
+        sources.append(
+            _model('CategorySalesRollup').objects.filter(
+                _date_range('date', *rollup)
+            ).values(name=F('category__name')).annotate(
+                qty=Sum('quantity'), total=Sum('total_sales')
+            )
+        )
+    if live:
+        SaleOrderItem = global_apps.get_model('sales', 'SaleOrderItem')
+        sources.append(
+            SaleOrderItem.objects.filter(
+                _date_range('order__order_date', *live),
+                order__status='delivered',
+                product__category__isnull=False,
+            ).values(name=F('product__category__name')).annotate(
+                qty=Sum('quantity'), total=Sum('total_price')
+            )
+        )
+    for source in sources:
+        for row in source:
+            entry = merged[row['name']]
+            entry['quantity'] += row['qty'] or 0
+            entry['total_sales'] += _decimal(row['total'])
+
+    categories = [
+        {'category': name, **values}
+        for name, values in merged.items() if values['quantity']
+    ]
+    categories.sort(key=lambda row: row['total_sales'], reverse=True)
+    return categories
+
+
+def purchase_totals(start=None, end=None):
+    """Return ``(invoice_count, total_amount)`` of purchase invoices in range"""
+    rollup, live = split_range(start, end)
+    count, total = 0, ZERO
+    if rollup:
+        totals = _model('DailyPurchaseRollup').objects.filter(
+            _date_range('date', *rollup)
+        ).aggregate(count=Sum('invoice_count'), total=Sum('total_amount'))
+        count += totals['count'] or 0
+        total += _decimal(totals['total'])
+    if live:
+        totals = _purchase_invoices(*live).aggregate(
+            count=Count('id'), total=Sum('amount')
+        )
+        count += totals['count'] or 0
+        total += _decimal(totals['total'])
+    return count, total
+
+
+def _totals_since(starts, rollup_name, rollup_fields, live_queryset, date_field, amount_field):
+    """
+    ``(count, total)`` from each of ``starts`` (None for all time) onwards,
+    with one conditional aggregate over the rollup table and one over the
+    live rows instead of two queries per start.
+    """
+    count_field, total_field = rollup_fields
+    rollup_aggregates, live_aggregates = {}, {}
+    for i, start in enumerate(starts):
+        rollup, live = split_range(start)
+        if rollup:
+            q = _date_range('date', *rollup) or None
+            rollup_aggregates[f'count_{i}'] = Sum(count_field, filter=q)
+            rollup_aggregates[f'total_{i}'] = Sum(total_field, filter=q)
+        if live:
+            q = _date_range(date_field, *live) or None
+            live_aggregates[f'count_{i}'] = Count('id', filter=q)
+            live_aggregates[f'total_{i}'] = Sum(amount_field, filter=q)
+
+    results = [[0, ZERO] for _ in starts]
+    for queryset, aggregates in ((_model(rollup_name).objects.all(), rollup_aggregates),
+                                 (live_queryset, live_aggregates)):
+        if not aggregates:
+            continue
+        totals = queryset.aggregate(**aggregates)
+        for i, result in enumerate(results):
+            if f'count_{i}' in totals:
+                result[0] += totals[f'count_{i}'] or 0
+                result[1] += _decimal(totals[f'total_{i}'])
+    return [tuple(result) for result in results]
+
+
+def sales_totals_since(*starts):
+    """``sales_totals(start)`` for each of ``starts``, in two queries"""
+    return _totals_since(
+        starts, 'DailySalesRollup', ('order_count', 'total_sales'),
+        _delivered_orders(timezone.localdate(), None), 'order_date', 'total_amount',
+    )
+
+
+def purchase_totals_since(*starts):
+    """``purchase_totals(start)`` for each of ``starts``, in two queries"""
+    return _totals_since(
+        starts, 'DailyPurchaseRollup', ('invoice_count', 'total_amount'),
+        _purchase_invoices(timezone.localdate(), None), 'invoice_date', 'amount',
+    )
+
+
+# ---------------------------------------------------------------------------
+# Rebuild and consistency checks
+# ---------------------------------------------------------------------------
+
+def compute_from_raw(apps=global_apps):
+    """
+    Aggregate the raw tables into ``{model name: {key: values}}``, matching
+    the rows the rollup tables should contain.
+    """
+    SaleOrder = apps.get_model('sales', 'SaleOrder')
+    SaleOrderItem = apps.get_model('sales', 'SaleOrderItem')
+    PurchaseInvoice = apps.get_model('purchases', 'PurchaseInvoice')
+    amount = Coalesce(Sum('amount'), Value(ZERO))
+
+    delivered = SaleOrder.objects.filter(status='delivered')
+    queries = {
+        'DailySalesRollup': delivered.values('order_date').annotate(
+            order_count=Count('id'), total_sales=Sum('total_amount')),
+        'CustomerSalesRollup': delivered.values('customer_id', 'order_date').annotate(
+            order_count=Count('id'), total_sales=Sum('total_amount')),
+        'CategorySalesRollup': SaleOrderItem.objects.filter(
+            order__status='delivered', product__category__isnull=False
+        ).values(category_id=F('product__category_id'), order_date=F('order__order_date')).annotate(
+            quantity=Sum('quantity'), total_sales=Sum('total_price')),
+        'DailyPurchaseRollup': PurchaseInvoice.objects.values('invoice_date').annotate(
+            invoice_count=Count('id'), total_amount=amount),
+        'SupplierPurchaseRollup': PurchaseInvoice.objects.values('supplier_id', 'invoice_date').annotate(
+            invoice_count=Count('id'), total_amount=amount),
+    }
+
+    expected = {}
+    for name, queryset in queries.items():
+        key_fields, value_fields = ROLLUP_TABLES[name]
+        rows = {}
+        for row in queryset.order_by():
+            row['date'] = row.pop('order_date', None) or row.pop('invoice_date', None)
+            key = tuple(row[field] for field in key_fields)
+            rows[key] = tuple(_decimal(row[field]) if 'total' in field else row[field]
+                              for field in value_fields)
+        expected[name] = rows
+    return expected
+
+
+def rebuild(apps=global_apps, batch_size=1000):
+    """
+    Replace the contents of every rollup table with a fresh aggregation of
+    the raw tables. Returns the number of rows written per table.
+    """
+    expected = compute_from_raw(apps)
+    written = {}
+    with transaction.atomic():
+        for name, rows in expected.items():
+            model = _model(name, apps)
+            key_fields, value_fields = ROLLUP_TABLES[name]
+            model.objects.all().delete()
+            model.objects.bulk_create(
+                [model(**dict(zip(key_fields + value_fields, key + values)))
+                 for key, values in rows.items()],
+                batch_size=batch_size,
+            )
+            written[name] = len(rows)
+    return written
+
+
+def check_consistency(apps=global_apps):
+    """
+    Compare the rollup tables against the raw tables. Returns a list of
+    ``(model name, key, expected, actual)`` tuples, empty when consistent.
+    """
+    expected = compute_from_raw(apps)
+    mismatches = []
+    for name, expected_rows in expected.items():
+        model = _model(name, apps)
+        key_fields, value_fields = ROLLUP_TABLES[name]
+        actual_rows = {}
+        for row in model.objects.values(*key_fields, *value_fields):
+            values = tuple(row[field] for field in value_fields)
+            if any(values):
+                actual_rows[tuple(row[field] for field in key_fields)] = values
+        for key in sorted(set(expected_rows) | set(actual_rows), key=str):
+            if expected_rows.get(key) != actual_rows.get(key):
+                mismatches.append((name, key, expected_rows.get(key), actual_rows.get(key)))
+    return mismatches
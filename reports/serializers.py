@@ -0,0 +1,66 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from . import jobs
+from .models import ReportJob
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for ReportJob model (the result is downloaded from ``result_url``)
+    """
+    report = serializers.ChoiceField(choices=sorted(jobs.REPORTS))
+    params = serializers.DictField(required=False, default=dict)
+    refresh = serializers.BooleanField(
+        write_only=True, required=False, default=False,
+        help_text='Compute again even if an identical job finished recently'
+    )
+    result_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'report', 'params', 'refresh', 'status', 'attempts', 'error', 'result_size',
+            'result_url', 'requested_by', 'created_at', 'started_at', 'finished_at', 'expires_at'
+        ]
+        read_only_fields = [
+            'id', 'status', 'attempts', 'error', 'result_size', 'requested_by',
+            'created_at', 'started_at', 'finished_at', 'expires_at'
+        ]
+
+    def get_result_url(self, obj):
+        if obj.status != ReportJob.DONE:
+            return None
+        url = reverse('report-job-result', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def validate(self, attrs):
+        _, date_params = jobs.REPORTS[attrs['report']]
+        params = attrs.get('params') or {}
+        unknown = sorted(set(params) - set(date_params))
+        if unknown:
+            raise serializers.ValidationError({
+                'params': f"Unknown parameters for {attrs['report']}: {', '.join(unknown)}"
+            })
+        # Normalized to ISO dates so identical requests hash the same
+        dates = {}
+        for name in date_params:
+            if params.get(name):
+                try:
+                    dates[name] = serializers.DateField().run_validation(params[name])
+                except serializers.ValidationError as exc:
+                    raise serializers.ValidationError({'params': {name: exc.detail}})
+        if dates.get('start_date') and dates.get('end_date') and dates['start_date'] > dates['end_date']:
+            raise serializers.ValidationError({'params': 'start_date must not be after end_date'})
+        attrs['params'] = {name: value.isoformat() for name, value in dates.items()}
+        return attrs
+
+    def create(self, validated_data):
+        job, self.created = jobs.enqueue(
+            validated_data['report'],
+            validated_data['params'],
+            user=validated_data.get('requested_by'),
+            refresh=validated_data.get('refresh', False),
+        )
+        return job
@@ -0,0 +1,109 @@
+"""
+Signal handlers keeping the report rollups current
+
+The values a save replaces are read from the row in pre_save/pre_delete
+(locked until the save commits), not from a snapshot taken when the
+instance was loaded: two stale instances saving the same change must not
+apply its delta twice.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core import counters
+from inventory.models import Product
+from inventory.stock import stock_changed
+from purchases.models import PurchaseInvoice, Supplier
+from sales.models import Customer, SaleOrder, SaleOrderItem
+from . import cache, rollups
+
+# Fields each rollup depends on (attnames)
+TRACKED_FIELDS = {
+    SaleOrder: ('status', 'order_date', 'customer_id', 'total_amount'),
+    SaleOrderItem: ('product_id', 'quantity', 'total_price'),
+    PurchaseInvoice: ('invoice_date', 'supplier_id', 'amount'),
+}
+
+
+def rollups_saving(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    fields = TRACKED_FIELDS[sender]
+    if raw or instance._state.adding or not counters.writes_fields(sender, fields, update_fields):
+        return
+    instance._rollup_values = counters.stored_values(sender, instance.pk, fields, using)
+
+
+def rollups_deleting(sender, instance, using=None, **kwargs):
+    instance._rollup_values = counters.stored_values(sender, instance.pk, TRACKED_FIELDS[sender], using)
+
+
+for model in TRACKED_FIELDS:
+    pre_save.connect(rollups_saving, sender=model, dispatch_uid=f'rollups_pre_save_{model.__name__}')
+    pre_delete.connect(rollups_deleting, sender=model, dispatch_uid=f'rollups_pre_delete_{model.__name__}')
+
+
+def _saved(sender, instance, created, update_fields):
+    """``(old, new)`` values of a save, or None when the rollups are unaffected"""
+    old = None if created else instance.__dict__.pop('_rollup_values', None)
+    if old is None and not created:
+        # None of the tracked fields was written
+        return None
+    new = counters.saved_values(instance, TRACKED_FIELDS[sender], old, update_fields)
+    return None if old == new else (old, new)
+
+
+def _order(order_id):
+    return SaleOrder.objects.filter(pk=order_id).values('status', 'order_date').first()
+
+
+@receiver(post_save, sender=SaleOrder, dispatch_uid='rollups_sale_order_save')
+def sale_order_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    change = None if raw else _saved(sender, instance, created, update_fields)
+    if change:
+        rollups.apply_sale_order_change(instance.pk, *change)
+
+
+@receiver(post_delete, sender=SaleOrder, dispatch_uid='rollups_sale_order_delete')
+def sale_order_deleted(sender, instance, **kwargs):
+    rollups.apply_sale_order_deletion(instance.__dict__.pop('_rollup_values', None))
+
+
+@receiver(post_save, sender=SaleOrderItem, dispatch_uid='rollups_sale_item_save')
+def sale_item_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    change = None if raw else _saved(sender, instance, created, update_fields)
+    order = change and _order(instance.order_id)
+    if order and order['status'] == 'delivered':
+        rollups.apply_sale_item_change(order['order_date'], *change)
+
+
+@receiver(post_delete, sender=SaleOrderItem, dispatch_uid='rollups_sale_item_delete')
+def sale_item_deleted(sender, instance, **kwargs):
+    old = instance.__dict__.pop('_rollup_values', None)
+    order = _order(instance.order_id)
+    if order and order['status'] == 'delivered':
+        rollups.apply_sale_item_change(order['order_date'], old, None)
+
+
+@receiver(post_save, sender=PurchaseInvoice, dispatch_uid='rollups_purchase_invoice_save')
+def purchase_invoice_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    change = None if raw else _saved(sender, instance, created, update_fields)
+    if change:
+        rollups.apply_purchase_invoice_change(*change)
+
+
+@receiver(post_delete, sender=PurchaseInvoice, dispatch_uid='rollups_purchase_invoice_delete')
+def purchase_invoice_deleted(sender, instance, **kwargs):
+    rollups.apply_purchase_invoice_change(instance.__dict__.pop('_rollup_values', None), None)
+
+
+# Models read by the cached reports (reports/cache.py)
+CACHED_REPORT_MODELS = (SaleOrder, PurchaseInvoice, Product, Customer, Supplier)
+
+
+def invalidate_report_cache(sender, raw=False, **kwargs):
+    if not raw:
+        cache.invalidate_on_commit()
+
+
+for model in CACHED_REPORT_MODELS:
+    post_save.connect(invalidate_report_cache, sender=model, dispatch_uid=f'report_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_report_cache, sender=model, dispatch_uid=f'report_cache_delete_{model.__name__}')
+stock_changed.connect(invalidate_report_cache, dispatch_uid='report_cache_stock')
@@ -1,3 +1,562 @@
-from django.test import TestCase
+import gzip
+import json
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.cache import cache as default_cache
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import User
+from inventory.models import Category, Product, StockMovement
+from sales.models import Customer, SaleOrder, SaleOrderItem, Invoice
+from purchases.models import Supplier, PurchaseInvoice
+from . import cache, jobs, rollups
+from .models import (
+    DailySalesRollup, CustomerSalesRollup, CategorySalesRollup,
+    DailyPurchaseRollup, SupplierPurchaseRollup, ReportJob
+)
+
+
+class RollupTestMixin:
+    """Datos comunes para los tests de rollups"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.customer = Customer.objects.create(name="Cliente Rollup")
+        self.supplier = Supplier.objects.create(
+            name="Proveedor Rollup",
+            email="proveedor@example.com",
+            phone="+1234567890",
+            address="Dirección"
+        )
+        self.category = Category.objects.create(name="Rollup Category")
+        self.product = Product.objects.create(
+            name="Rollup Product",
+            sku="ROLL-001",
+            category=self.category,
+            price=Decimal('100.00'),
+            cost_price=Decimal('60.00'),
+            stock_quantity=100,
+            created_by=self.user
+        )
+        self.yesterday = timezone.localdate() - timedelta(days=1)
+
+    def create_order(self, order_date, quantity=2, status='draft'):
+        order = SaleOrder.objects.create(
+            customer=self.customer,
+            order_date=order_date,
+            status=status,
+            created_by=self.user
+        )
+        SaleOrderItem.objects.create(
+            order=order,
+            product=self.product,
+            quantity=quantity,
+            unit_price=Decimal('100.00')
+        )
+        order.refresh_from_db()
+        return order
+
+    def deliver(self, order):
+        order.status = 'delivered'
+        order.save()
+        return order
+
+
+class SalesRollupTest(RollupTestMixin, TestCase):
+    """Tests para el mantenimiento incremental de rollups de ventas"""
+
+    def test_delivered_order_is_rolled_up(self):
+        """Test que una orden entregada suma en los rollups diario, cliente y categoría"""
+        order = self.deliver(self.create_order(self.yesterday))
+
+        daily = DailySalesRollup.objects.get(date=self.yesterday)
+        self.assertEqual(daily.order_count, 1)
+        self.assertEqual(daily.total_sales, order.total_amount)
+
+        per_customer = CustomerSalesRollup.objects.get(customer=self.customer, date=self.yesterday)
+        self.assertEqual(per_customer.total_sales, Decimal('220.00'))
+
+        per_category = CategorySalesRollup.objects.get(category=self.category, date=self.yesterday)
+        self.assertEqual(per_category.quantity, 2)
+        self.assertEqual(per_category.total_sales, Decimal('200.00'))
+        self.assertEqual(rollups.check_consistency(), [])
+
+    def test_draft_order_is_not_rolled_up(self):
+        """Test que las órdenes no entregadas no suman"""
+        self.create_order(self.yesterday)
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+    def test_cancelling_delivered_order_reverts_rollup(self):
+        """Test que sacar una orden de 'delivered' revierte su aporte"""
+        order = self.deliver(self.create_order(self.yesterday))
+        order.status = 'cancelled'
+        order.save()
+
+        self.assertEqual(rollups.sales_totals(), (0, Decimal('0.00')))
+        self.assertEqual(rollups.check_consistency(), [])
+
+    def test_changes_on_delivered_order(self):
+        """Test cambios de fecha, items y borrado de una orden entregada"""
+        order = self.deliver(self.create_order(self.yesterday))
+
+        order.order_date = self.yesterday - timedelta(days=3)
+        order.save()
+        SaleOrderItem.objects.create(
+            order=order,
+            product=self.product,
+            quantity=1,
+            unit_price=Decimal('50.00')
+        )
+        self.assertEqual(rollups.check_consistency(), [])
+        self.assertEqual(rollups.sales_totals()[1], Decimal('275.00'))
+
+        SaleOrder.objects.get(pk=order.pk).delete()
+        self.assertEqual(rollups.check_consistency(), [])
+        self.assertEqual(rollups.sales_totals(), (0, Decimal('0.00')))
+
+    def test_stale_instances_apply_a_transition_once(self):
+        """Test que dos instancias viejas de la misma orden que guardan la misma entrega suman una vez"""
+        order = self.create_order(self.yesterday)
+        first = SaleOrder.objects.get(pk=order.pk)
+        second = SaleOrder.objects.get(pk=order.pk)
+
+        self.deliver(first)
+        self.deliver(second)
+        self.assertEqual(rollups.sales_totals(), (1, Decimal('220.00')))
+
+        # A stale item instance edited twice to the same quantity (loaded
+        # apart from ``order``, whose stale status calculate_totals would save)
+        item = SaleOrderItem.objects.get(order_id=order.pk)
+        stale_item = SaleOrderItem.objects.get(pk=item.pk)
+        item.quantity = 3
+        item.save()
+        stale_item.quantity = 3
+        stale_item.save()
+        self.assertEqual(CategorySalesRollup.objects.get(category=self.category).quantity, 3)
+        self.assertEqual(rollups.check_consistency(), [])
+
+    def test_split_range(self):
+        """Test la división entre días cerrados y día en curso"""
+        today = timezone.localdate()
+        self.assertEqual(rollups.split_range(), ((None, self.yesterday), (today, None)))
+        self.assertEqual(rollups.split_range(end=self.yesterday), ((None, self.yesterday), None))
+        self.assertEqual(rollups.split_range(start=today), (None, (today, None)))
+
+
+class PurchaseRollupTest(RollupTestMixin, TestCase):
+    """Tests para el mantenimiento incremental de rollups de compras"""
+
+    def test_invoice_amount_changes_are_rolled_up(self):
+        """Test que los cambios de monto de una factura de compra se reflejan"""
+        invoice = PurchaseInvoice.objects.create(
+            supplier=self.supplier,
+            invoice_date=self.yesterday,
+            due_date=self.yesterday + timedelta(days=30),
+            amount=Decimal('100.00')
+        )
+        invoice.amount = Decimal('150.00')
+        invoice.save()
+
+        daily = DailyPurchaseRollup.objects.get(date=self.yesterday)
+        self.assertEqual(daily.invoice_count, 1)
+        self.assertEqual(daily.total_amount, Decimal('150.00'))
+        per_supplier = SupplierPurchaseRollup.objects.get(supplier=self.supplier)
+        self.assertEqual(per_supplier.total_amount, Decimal('150.00'))
+
+        stale = PurchaseInvoice.objects.get(pk=invoice.pk)
+        stale.amount = Decimal('150.00')
+        stale.save()
+        self.assertEqual(rollups.purchase_totals(), (1, Decimal('150.00')))
+
+        invoice.delete()
+        self.assertEqual(rollups.purchase_totals(), (0, Decimal('0.00')))
+        self.assertEqual(rollups.check_consistency(), [])
+
+
+class RollupCommandsTest(RollupTestMixin, TestCase):
+    """Tests para los comandos rebuild_rollups y check_rollups"""
+
+    def test_check_detects_drift_and_rebuild_fixes_it(self):
+        """Test que check_rollups detecta diferencias y rebuild_rollups las corrige"""
+        self.deliver(self.create_order(self.yesterday))
+        # Changes through update() bypass the signal handlers
+        SaleOrder.objects.update(total_amount=Decimal('999.00'))
+
+        with self.assertRaises(CommandError):
+            call_command('check_rollups', stdout=StringIO())
+
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(rollups.check_consistency(), [])
+        self.assertEqual(DailySalesRollup.objects.get().total_sales, Decimal('999.00'))
+
+
+class SalesReportRollupTest(RollupTestMixin, TestCase):
+    """Tests para los reportes servidos desde rollups"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_sales_report_combines_rollups_and_live_day(self):
+        """Test que el reporte suma días cerrados (rollups) y el día en curso (en vivo)"""
+        self.deliver(self.create_order(self.yesterday))
+        self.deliver(self.create_order(timezone.localdate(), quantity=1))
+
+        response = self.client.get(reverse('report-sales-report'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = response.data['summary']
+        self.assertEqual(summary['total_orders'], 2)
+        self.assertEqual(summary['total_sales'], 330.0)
+        self.assertEqual(len(response.data['sales_by_date']), 2)
+        self.assertEqual(response.data['top_customers'][0]['order_count'], 2)
+        self.assertEqual(response.data['sales_by_category'][0]['quantity'], 3)
+
+    def test_sales_report_date_filter(self):
+        """Test el filtro por fechas del reporte de ventas"""
+        self.deliver(self.create_order(self.yesterday))
+        self.deliver(self.create_order(timezone.localdate(), quantity=1))
+
+        response = self.client.get(
+            reverse('report-sales-report'), {'end_date': self.yesterday.isoformat()}
+        )
+        self.assertEqual(response.data['summary']['total_orders'], 1)
+
+        response = self.client.get(reverse('report-sales-report'), {'start_date': 'not-a-date'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(REPORTS_CACHE={'BACKGROUND_REFRESH': False})
+class DashboardCacheTest(RollupTestMixin, TestCase):
+    """Tests para el cache del dashboard"""
+
+    def setUp(self):
+        super().setUp()
+        default_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('report-dashboard-summary')
+
+    def test_second_read_is_served_from_cache(self):
+        """Test que la segunda lectura no consulta la base de datos"""
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'stale': 0, 'hit_ratio': 0.5})
+
+    def test_saves_invalidate_after_commit(self):
+        """Test que guardar un modelo del dashboard invalida el cache al confirmar la transacción"""
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Customer.objects.create(name="Otro Cliente")
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data['partners']['total_customers'], 2)
+        self.assertEqual(cache.stats()['stale'], 1)
+
+    def test_stock_movements_invalidate(self):
+        """Test que los cambios de stock (UPDATE sin post_save de Product) invalidan el cache"""
+        self.product.min_stock_level = 50
+        self.product.save()
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            StockMovement.objects.create(
+                product=self.product, movement_type='out', quantity=60, created_by=self.user
+            )
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data['inventory']['low_stock_products'], 1)
+        self.assertEqual(response.data['inventory']['total_inventory_value'], 2400.0)
+
+    @override_settings(REPORTS_CACHE={'BACKGROUND_REFRESH': True})
+    def test_stale_payload_is_served_while_refreshing(self):
+        """Test que un valor viejo se sirve mientras se recalcula en segundo plano"""
+        self.assertEqual(cache.cached('test', 'p', lambda: 1), 1)
+        cache.invalidate()
+
+        self.assertEqual(cache.cached('test', 'p', lambda: 2), 1)
+
+        deadline = time.monotonic() + 5
+        while cache.cached('test', 'p', lambda: 3) != 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(cache.cached('test', 'p', lambda: 3), 2)
+
+    def test_cache_stats_requires_admin(self):
+        """Test que los contadores solo los ve un administrador"""
+        url = reverse('report-cache-stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hit_ratio', response.data)
+
+
+class AgingReportTest(RollupTestMixin, TestCase):
+    """Tests para los saldos pendientes y el reporte de antigüedad"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.today = timezone.localdate()
+
+    def create_invoice(self, days_past_due, amount, paid='0.00', status='pending'):
+        return Invoice.objects.create(
+            sale_order=self.create_order(self.today),
+            invoice_date=self.today - timedelta(days=days_past_due + 30),
+            due_date=self.today - timedelta(days=days_past_due),
+            amount=Decimal(amount),
+            paid_amount=Decimal(paid),
+            status=status
+        )
+
+    def create_purchase_invoice(self, days_past_due, amount, paid='0.00', status='pending'):
+        return PurchaseInvoice.objects.create(
+            supplier=self.supplier,
+            invoice_date=self.today - timedelta(days=days_past_due + 30),
+            due_date=self.today - timedelta(days=days_past_due),
+            amount=None if amount is None else Decimal(amount),
+            paid_amount=Decimal(paid),
+            status=status
+        )
+
+    def test_financial_report_outstanding_balances(self):
+        """Test que el reporte financiero suma los saldos pendientes en la base de datos"""
+        self.create_invoice(10, '100.00')
+        self.create_invoice(40, '300.00', paid='120.00', status='partial')
+        self.create_invoice(5, '500.00', paid='500.00', status='paid')
+        self.create_purchase_invoice(0, '80.00', paid='30.00', status='partial')
+        self.create_purchase_invoice(0, None)
+
+        response = self.client.get(reverse('report-financial-report'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['revenue']['outstanding_receivables'], Decimal('280.00'))
+        self.assertEqual(response.data['costs']['outstanding_payables'], Decimal('50.00'))
+
+    def test_aging_buckets(self):
+        """Test que los saldos se agrupan por días de atraso, incluyendo los bordes de cada tramo"""
+        for days in (-5, 0, 30, 31, 60, 61, 90, 91, 400):
+            self.create_invoice(days, '10.00')
+        self.create_invoice(45, '100.00', paid='40.00', status='partial')
+        self.create_invoice(45, '100.00', paid='100.00', status='paid')
+        self.create_purchase_invoice(120, '70.00')
+
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('report-aging-report'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        receivables = response.data['receivables']
+        self.assertEqual(receivables['outstanding_count'], 10)
+        self.assertEqual(receivables['outstanding_balance'], Decimal('150.00'))
+        self.assertEqual(
+            [(row['bucket'], row['count'], row['balance']) for row in receivables['aging']],
+            [
+                ('not_due', 1, Decimal('10.00')),
+                ('0_30', 2, Decimal('20.00')),
+                ('31_60', 3, Decimal('80.00')),
+                ('61_90', 2, Decimal('20.00')),
+                ('90_plus', 2, Decimal('20.00')),
+            ]
+        )
+        self.assertEqual(receivables['top'][0]['id'], self.customer.id)
+        self.assertEqual(receivables['top'][0]['aging']['31_60'], Decimal('80.00'))
+        payables = response.data['payables']
+        self.assertEqual(payables['top'][0]['name'], self.supplier.name)
+        self.assertEqual(payables['aging'][-1]['balance'], Decimal('70.00'))
+
+    def test_aging_as_of_date(self):
+        """Test que ?as_of calcula la antigüedad a otra fecha"""
+        self.create_invoice(0, '10.00')
+
+        response = self.client.get(
+            reverse('report-aging-report'), {'as_of': (self.today + timedelta(days=45)).isoformat()}
+        )
+
+        self.assertEqual(response.data['receivables']['aging'][2]['count'], 1)
+        self.assertEqual(
+            self.client.get(reverse('report-aging-report'), {'as_of': 'nope'}).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+
+class ReportJobTest(RollupTestMixin, TestCase):
+    """Tests para los reportes calculados en segundo plano"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('report-job-list')
+
+    def enqueue(self, report='sales_report', **params):
+        return self.client.post(self.url, {'report': report, 'params': params}, format='json')
+
+    def run_pending(self):
+        while (job := jobs.claim('test-worker')) is not None:
+            jobs.execute(job)
+
+    def test_identical_requests_share_a_job(self):
+        """Test que pedidos idénticos comparten el trabajo y otros parámetros crean uno nuevo"""
+        first = self.enqueue(start_date=self.yesterday.isoformat())
+        second = self.enqueue(start_date=self.yesterday.isoformat())
+        other = self.enqueue(start_date=timezone.localdate().isoformat())
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(first.data['status'], ReportJob.PENDING)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertEqual(other.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(other.data['id'], first.data['id'])
+
+        # A finished job is reused until REUSE_SECONDS, unless a refresh is asked for
+        self.run_pending()
+        self.assertEqual(self.enqueue(start_date=self.yesterday.isoformat()).data['id'], first.data['id'])
+        refreshed = self.client.post(self.url, {
+            'report': 'sales_report', 'params': {'start_date': self.yesterday.isoformat()}, 'refresh': True
+        }, format='json')
+        self.assertEqual(refreshed.status_code, status.HTTP_201_CREATED)
+
+    def test_worker_stores_the_synchronous_payload_compressed(self):
+        """Test que el worker guarda comprimido el mismo resultado que el endpoint síncrono"""
+        self.deliver(self.create_order(self.yesterday))
+        job_id = self.enqueue().data['id']
+
+        self.run_pending()
+
+        job = self.client.get(reverse('report-job-detail', args=[job_id])).data
+        self.assertEqual(job['status'], ReportJob.DONE)
+        self.assertEqual(job['attempts'], 1)
+        self.assertTrue(job['result_url'].endswith(reverse('report-job-result', args=[job_id])))
+        self.assertLess(len(ReportJob.objects.get(pk=job_id).result), job['result_size'])
+
+        expected = self.client.get(reverse('report-sales-report')).json()
+        response = self.client.get(job['result_url'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content), expected)
+        self.assertEqual(expected['summary']['total_orders'], 1)
+
+        response = self.client.get(job['result_url'], HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), expected)
+
+    def test_result_of_unfinished_job_is_a_conflict(self):
+        """Test que pedir el resultado de un trabajo pendiente responde 409"""
+        job_id = self.enqueue('inventory_report').data['id']
+
+        response = self.client.get(reverse('report-job-result', args=[job_id]))
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['status'], ReportJob.PENDING)
+
+    def test_invalid_parameters_are_rejected(self):
+        """Test que se rechazan reportes, parámetros y fechas inválidos"""
+        self.assertEqual(self.enqueue('unknown_report').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.enqueue('inventory_report', start_date='2024-01-01').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.enqueue(start_date='not-a-date').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.enqueue(start_date='2024-02-01', end_date='2024-01-01').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_cancel_pending_job(self):
+        """Test que cancelar un trabajo pendiente lo saca de la cola"""
+        job_id = self.enqueue().data['id']
+        other_user = User.objects.create_user(username="otro", email="otro@example.com", password="testpass123")
+        other_client = APIClient()
+        other_client.force_authenticate(user=other_user)
+        url = reverse('report-job-cancel', args=[job_id])
+
+        self.assertEqual(other_client.post(url).status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], ReportJob.CANCELLED)
+        self.assertIsNone(jobs.claim('test-worker'))
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_409_CONFLICT)
+        # The user's list shows it, other users' lists don't
+        self.assertEqual(self.client.get(self.url).data['count'], 1)
+        self.assertEqual(other_client.get(self.url).data['count'], 0)
+
+    def test_cancelled_running_job_discards_result(self):
+        """Test que el resultado de un trabajo cancelado mientras corría se descarta"""
+        self.enqueue()
+        job = jobs.claim('test-worker')
+        self.client.post(reverse('report-job-cancel', args=[job.pk]))
+
+        self.assertFalse(jobs.execute(job))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.CANCELLED)
+        self.assertIsNone(job.result)
+
+    def test_failed_job_records_error(self):
+        """Test que un reporte que falla deja el error en el trabajo"""
+        def broken():
+            raise ValueError('boom')
+
+        job_id = self.enqueue('inventory_report').data['id']
+        with mock.patch.dict(jobs.REPORTS, {'inventory_report': (broken, ())}), \
+                self.assertLogs('reports.jobs', 'ERROR'):
+            self.run_pending()
+
+        job = ReportJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, ReportJob.FAILED)
+        self.assertEqual(job.error, 'ValueError: boom')
+        self.assertIsNotNone(job.expires_at)
+
+    def test_stale_jobs_are_requeued_and_expired_ones_deleted(self):
+        """Test que los trabajos colgados se reencolan y los vencidos se eliminan"""
+        self.enqueue()
+        job = jobs.claim('dead-worker')
+        ReportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(jobs.requeue_stale(), (1, 0))
+        self.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.DONE)
+        self.assertEqual(job.attempts, 2)
+
+        call_command('cleanup_report_jobs', stdout=StringIO())
+        self.assertTrue(ReportJob.objects.filter(pk=job.pk).exists())
+        self.assertEqual(jobs.cleanup(now=job.expires_at + timedelta(seconds=1)), 1)
+
+
+class ReportWorkerCommandTest(TransactionTestCase):
+    """Tests para el comando run_report_worker"""
+
+    def test_once_processes_pending_jobs(self):
+        """Test que run_report_worker --once procesa la cola y termina"""
+        inventory, _ = jobs.enqueue('inventory_report')
+        jobs.enqueue('sales_report', {'start_date': '2024-01-01'})
+
+        call_command('run_report_worker', '--once', '--threads', '1', stdout=StringIO())
+
+        self.assertEqual(
+            set(ReportJob.objects.values_list('status', flat=True)), {ReportJob.DONE}
+        )
+        self.assertIn('products', json.loads(jobs.result_content(ReportJob.objects.get(pk=inventory.pk))))
 
-# Create your tests here.
@@ -1,8 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ReportViewSet
+from .views import ReportViewSet, ReportJobViewSet
 
 router = DefaultRouter()
+router.register(r'jobs', ReportJobViewSet, basename='report-job')
 router.register(r'reports', ReportViewSet, basename='report')
 
 urlpatterns = [
@@ -1,14 +1,24 @@
 from django.shortcuts import render
-from rest_framework import viewsets, status, permissions
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import mixins, viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q, Sum, Count, Avg, F
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta, datetime
+from core.aggregation import summarize
+from core import middleware as connection_metrics
+from core.exports import EXPORT_RENDERERS, export_format, export_response, stream_values
 from users.models import User
-from inventory.models import Product, Category, StockMovement
-from sales.models import SaleOrder, Customer, Invoice
+from inventory.models import Product
+from sales.models import SaleOrder, Customer
 from purchases.models import Supplier, PurchaseInvoice
+from . import cache, jobs, payloads, rollups
+from .models import ReportJob
+from .serializers import ReportJobSerializer
 
 
 class ReportViewSet(viewsets.ViewSet):
@@ -16,272 +26,166 @@ class ReportViewSet(viewsets.ViewSet):
     ViewSet for generating various reports
     """
     permission_classes = [permissions.IsAuthenticated]
+    # Every report is read-only: read from the replicas (core.routers)
+    replica_actions = '__all__'
+
+    def _date_range(self, request):
+        """Parse the optional start_date/end_date query params"""
+        dates = []
+        for param in ('start_date', 'end_date'):
+            value = request.query_params.get(param)
+            parsed = parse_date(value) if value else None
+            if value and parsed is None:
+                raise ValueError(f'Invalid {param}: expected YYYY-MM-DD')
+            dates.append(parsed)
+        return dates
 
     @action(detail=False, methods=['get'])
     def dashboard_summary(self, request):
         """
-        Get dashboard summary statistics
+        Get dashboard summary statistics (cached, see reports/cache.py)
         """
         today = timezone.now().date()
+        return Response(cache.cached(
+            'dashboard_summary', today.isoformat(), lambda: self._dashboard_summary(today)
+        ))
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def cache_stats(self, request):
+        """
+        Hit/miss counters of the report cache
+        """
+        return Response(cache.stats())
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def connection_stats(self, request):
+        """
+        Database connection reuse counters of the process serving the request
+        """
+        return Response(connection_metrics.stats())
+
+    def _dashboard_summary(self, today):
         this_month = today.replace(day=1)
-        last_month = (this_month - timedelta(days=1)).replace(day=1)
-        
-        # Sales statistics
-        total_sales = SaleOrder.objects.filter(status='delivered').aggregate(
-            total=Sum('total_amount')
-        )['total'] or 0
-        
-        this_month_sales = SaleOrder.objects.filter(
-            status='delivered',
-            order_date__gte=this_month
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        # Purchase statistics
-        total_purchases = PurchaseInvoice.objects.aggregate(
-            total=Sum('amount')
-        )['total'] or 0
         
-        this_month_purchases = PurchaseInvoice.objects.filter(
-            invoice_date__gte=this_month
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        # Sales and purchase statistics (one pass over each rollup table
+        # and over today's rows)
+        (_, total_sales), (_, this_month_sales) = rollups.sales_totals_since(None, this_month)
+        (_, total_purchases), (_, this_month_purchases) = rollups.purchase_totals_since(None, this_month)
         
-        # Inventory statistics
-        total_products = Product.objects.filter(is_active=True).count()
-        low_stock_products = Product.objects.filter(
-            stock_quantity__lte=F('min_stock_level'),
-            is_active=True
-        ).count()
-        
-        total_inventory_value = Product.objects.filter(is_active=True).aggregate(
-            total=Sum(F('stock_quantity') * F('cost_price'))
-        )['total'] or 0
+        # Inventory statistics (inventory/metrics.py)
+        inventory = summarize(
+            Product.objects.filter(is_active=True),
+            ['total_products', 'low_stock_products', 'total_inventory_value'],
+        )
         
         # Customer and supplier statistics
         total_customers = Customer.objects.filter(is_active=True).count()
         total_suppliers = Supplier.objects.filter(is_active=True).count()
         
         # Recent activities
-        recent_sales = SaleOrder.objects.all().order_by('-created_at')[:5]
-        recent_purchases = PurchaseInvoice.objects.all().order_by('-created_at')[:5]
+        recent_sales = SaleOrder.objects.select_related('customer').order_by('-created_at')[:5]
+        recent_purchases = PurchaseInvoice.objects.select_related('supplier').order_by('-created_at')[:5]
         
-        return Response({
+        return {
             'sales': {
-                'total_sales': float(total_sales),
-                'this_month_sales': float(this_month_sales),
+                'total_sales': total_sales,
+                'this_month_sales': this_month_sales,
                 'recent_sales': [
                     {
                         'order_number': sale.order_number,
                         'customer': sale.customer.name,
-                        'total_amount': float(sale.total_amount),
+                        'total_amount': sale.total_amount,
                         'status': sale.status
                     } for sale in recent_sales
                 ]
             },
             'purchases': {
-                'total_purchases': float(total_purchases),
-                'this_month_purchases': float(this_month_purchases),
+                'total_purchases': total_purchases,
+                'this_month_purchases': this_month_purchases,
                 'recent_purchases': [
                     {
                         'invoice_number': purchase.invoice_number,
                         'supplier': purchase.supplier.name,
-                        'amount': float(purchase.amount),
+                        'amount': purchase.amount or 0,
                         'status': purchase.status
                     } for purchase in recent_purchases
                 ]
             },
             'inventory': {
-                'total_products': total_products,
-                'low_stock_products': low_stock_products,
-                'total_inventory_value': float(total_inventory_value)
+                'total_products': inventory['total_products'],
+                'low_stock_products': inventory['low_stock_products'],
+                'total_inventory_value': inventory['total_inventory_value']
             },
             'partners': {
                 'total_customers': total_customers,
                 'total_suppliers': total_suppliers
             }
-        })
+        }
 
     @action(detail=False, methods=['get'])
     def sales_report(self, request):
         """
         Generate sales report
         """
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        
-        queryset = SaleOrder.objects.filter(status='delivered')
-        
-        if start_date:
-            queryset = queryset.filter(order_date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(order_date__lte=end_date)
-        
-        # Sales by date
-        sales_by_date = queryset.values('order_date').annotate(
-            total_sales=Sum('total_amount'),
-            order_count=Count('id')
-        ).order_by('order_date')
-        
-        # Top customers
-        top_customers = queryset.values('customer__name').annotate(
-            total_sales=Sum('total_amount'),
-            order_count=Count('id')
-        ).order_by('-total_sales')[:10]
-        
-        # Sales summary
-        total_sales = queryset.aggregate(total=Sum('total_amount'))['total'] or 0
-        total_orders = queryset.count()
-        avg_order_value = queryset.aggregate(avg=Avg('total_amount'))['avg'] or 0
-        
-        return Response({
-            'summary': {
-                'total_sales': float(total_sales),
-                'total_orders': total_orders,
-                'average_order_value': float(avg_order_value)
-            },
-            'sales_by_date': list(sales_by_date),
-            'top_customers': list(top_customers)
-        })
+        try:
+            start_date, end_date = self._date_range(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payloads.sales_report(start_date, end_date))
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS)
     def inventory_report(self, request):
         """
-        Generate inventory report
+        Generate inventory report (?format=csv|ndjson streams the stock levels)
         """
-        # Stock levels
-        products = Product.objects.filter(is_active=True).annotate(
-            stock_value=F('stock_quantity') * F('cost_price')
-        ).order_by('-stock_value')
-        
-        # Categories summary
-        categories_summary = Category.objects.annotate(
-            product_count=Count('products'),
-            total_stock=Sum('products__stock_quantity'),
-            total_value=Sum(F('products__stock_quantity') * F('products__cost_price'))
-        )
-        
-        # Low stock products
-        low_stock_products = Product.objects.filter(
-            stock_quantity__lte=F('min_stock_level'),
-            is_active=True
-        )
-        
-        # Recent stock movements
-        recent_movements = StockMovement.objects.all().order_by('-created_at')[:20]
-        
-        return Response({
-            'products': [
-                {
-                    'id': product.id,
-                    'name': product.name,
-                    'sku': product.sku,
-                    'stock_quantity': product.stock_quantity,
-                    'stock_value': float(product.stock_value),
-                    'category': product.category.name
-                } for product in products
-            ],
-            'categories_summary': [
-                {
-                    'name': cat.name,
-                    'product_count': cat.product_count,
-                    'total_stock': cat.total_stock or 0,
-                    'total_value': float(cat.total_value or 0)
-                } for cat in categories_summary
-            ],
-            'low_stock_products': [
-                {
-                    'id': product.id,
-                    'name': product.name,
-                    'sku': product.sku,
-                    'stock_quantity': product.stock_quantity,
-                    'min_stock_level': product.min_stock_level
-                } for product in low_stock_products
-            ],
-            'recent_movements': [
-                {
-                    'product': movement.product.name,
-                    'movement_type': movement.movement_type,
-                    'quantity': movement.quantity,
-                    'created_at': movement.created_at
-                } for movement in recent_movements
-            ]
-        })
+        file_format = export_format(request)
+        if file_format:
+            fields = {
+                'id': 'id', 'name': 'name', 'sku': 'sku', 'category': 'category__name',
+                'stock_quantity': 'stock_quantity', 'min_stock_level': 'min_stock_level',
+                'stock_value': 'stock_value',
+            }
+            return export_response(
+                stream_values(payloads.inventory_products(), fields), list(fields), file_format, 'inventory_report'
+            )
+        return Response(payloads.inventory_report())
 
     @action(detail=False, methods=['get'])
     def financial_report(self, request):
         """
         Generate financial report
         """
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        
-        # Sales revenue
-        sales_queryset = SaleOrder.objects.filter(status='delivered')
-        if start_date:
-            sales_queryset = sales_queryset.filter(order_date__gte=start_date)
-        if end_date:
-            sales_queryset = sales_queryset.filter(order_date__lte=end_date)
-        
-        total_revenue = sales_queryset.aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        # Purchase costs
-        purchase_queryset = PurchaseInvoice.objects.all()
-        if start_date:
-            purchase_queryset = purchase_queryset.filter(invoice_date__gte=start_date)
-        if end_date:
-            purchase_queryset = purchase_queryset.filter(invoice_date__lte=end_date)
-        
-        total_costs = purchase_queryset.aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Inventory value
-        inventory_value = Product.objects.filter(is_active=True).aggregate(
-            total=Sum(F('stock_quantity') * F('cost_price'))
-        )['total'] or 0
-        
-        # Outstanding invoices
-        outstanding_sales = Invoice.objects.filter(
-            status__in=['pending', 'partial']
-        ).aggregate(total=Sum('balance'))['total'] or 0
-        
-        outstanding_purchases = PurchaseInvoice.objects.filter(
-            status__in=['pending', 'partial']
-        ).aggregate(total=Sum('balance'))['total'] or 0
-        
-        # Profit calculation
-        gross_profit = total_revenue - total_costs
-        
-        return Response({
-            'revenue': {
-                'total_revenue': float(total_revenue),
-                'outstanding_receivables': float(outstanding_sales)
-            },
-            'costs': {
-                'total_costs': float(total_costs),
-                'outstanding_payables': float(outstanding_purchases)
-            },
-            'inventory': {
-                'inventory_value': float(inventory_value)
-            },
-            'profitability': {
-                'gross_profit': float(gross_profit),
-                'gross_margin': float((gross_profit / total_revenue * 100) if total_revenue > 0 else 0)
-            }
-        })
+        try:
+            start_date, end_date = self._date_range(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payloads.financial_report(start_date, end_date))
+
+    @action(detail=False, methods=['get'])
+    def aging_report(self, request):
+        """
+        Receivables and payables aging by days past due (?as_of=YYYY-MM-DD, today by default)
+        """
+        value = request.query_params.get('as_of')
+        as_of = parse_date(value) if value else None
+        if value and as_of is None:
+            return Response({'error': 'Invalid as_of: expected YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payloads.aging_report(as_of))
 
     @action(detail=False, methods=['get'])
     def customer_report(self, request):
         """
         Generate customer report
         """
-        # Top customers by sales
-        top_customers = Customer.objects.filter(is_active=True).annotate(
-            total_sales=Sum('orders__total_amount'),
-            order_count=Count('orders')
-        ).filter(total_sales__isnull=False).order_by('-total_sales')[:20]
+        # Top customers by sales (maintained stats, see sales/stats.py)
+        top_customers = Customer.objects.filter(
+            is_active=True, order_count__gt=0
+        ).order_by('-total_sales')[:20]
         
         # Customer activity
         active_customers = Customer.objects.filter(
-            orders__created_at__gte=timezone.now() - timedelta(days=30)
-        ).distinct().count()
+            last_order_at__gte=timezone.now() - timedelta(days=30)
+        ).count()
         
         total_customers = Customer.objects.filter(is_active=True).count()
         
@@ -295,7 +199,7 @@ class ReportViewSet(viewsets.ViewSet):
                     'id': customer.id,
                     'name': customer.name,
                     'email': customer.email,
-                    'total_sales': float(customer.total_sales or 0),
+                    'total_sales': customer.total_sales,
                     'order_count': customer.order_count
                 } for customer in top_customers
             ]
@@ -306,16 +210,15 @@ class ReportViewSet(viewsets.ViewSet):
         """
         Generate supplier report
         """
-        # Top suppliers by purchases
-        top_suppliers = Supplier.objects.filter(is_active=True).annotate(
-            total_purchases=Sum('invoices__amount'),
-            invoice_count=Count('invoices')
-        ).filter(total_purchases__isnull=False).order_by('-total_purchases')[:20]
+        # Top suppliers by purchases (maintained stats, see purchases/stats.py)
+        top_suppliers = Supplier.objects.filter(
+            is_active=True, invoice_count__gt=0
+        ).order_by('-total_purchases')[:20]
         
         # Supplier activity
         active_suppliers = Supplier.objects.filter(
-            invoices__created_at__gte=timezone.now() - timedelta(days=30)
-        ).distinct().count()
+            last_invoice_at__gte=timezone.now() - timedelta(days=30)
+        ).count()
         
         total_suppliers = Supplier.objects.filter(is_active=True).count()
         
@@ -324,13 +227,84 @@ class ReportViewSet(viewsets.ViewSet):
                 'total_suppliers': total_suppliers,
                 'active_suppliers': active_suppliers
             },
-                            'top_suppliers': [
-                    {
-                        'id': supplier.id,
-                        'name': supplier.name,
-                        'email': supplier.email,
-                        'total_purchases': float(supplier.total_purchases or 0),
-                        'invoice_count': supplier.invoice_count
-                    } for supplier in top_suppliers
-                ]
+            'top_suppliers': [
+                {
+                    'id': supplier.id,
+                    'name': supplier.name,
+                    'email': supplier.email,
+                    'total_purchases': supplier.total_purchases,
+                    'invoice_count': supplier.invoice_count
+                } for supplier in top_suppliers
+            ]
         })
+
+
+class ReportJobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                       mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Reports computed in the background (see reports/jobs.py)
+
+    POST queues a report (or returns the identical job already queued or
+    just finished), GET shows its status and ``result`` downloads it.
+    """
+    queryset = ReportJob.objects.select_related('requested_by')
+    serializer_class = ReportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status', 'report']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'result':
+            queryset = queryset.defer('result')
+        # Job results are reports any user can read, but the list shows
+        # the user's own jobs (every job for staff)
+        if self.action == 'list' and not self.request.user.is_staff:
+            queryset = queryset.filter(requested_by=self.request.user)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(requested_by=request.user)
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if serializer.created else status.HTTP_200_OK
+        )
+
+    @action(detail=True, methods=['get'])
+    def result(self, request, pk=None):
+        """
+        Download the JSON payload of a finished job (gzip encoded when accepted)
+        """
+        job = self.get_object()
+        if job.status != ReportJob.DONE:
+            return Response(
+                {'error': f'Report job is {job.status}', 'status': job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+        # Payloads are stored gzip compressed: send them as they are
+        gzipped = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        response = HttpResponse(jobs.result_content(job, compressed=gzipped), content_type='application/json')
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """
+        Cancel a pending or running job
+        """
+        job = self.get_object()
+        if job.requested_by_id != request.user.pk and not request.user.is_staff:
+            return Response(
+                {'error': 'Only the user who requested the job can cancel it'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if not jobs.cancel(job):
+            return Response(
+                {'error': f'Report job is already {job.status}', 'status': job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(self.get_serializer(job).data)
@@ -0,0 +1,26 @@
+"""
+Summary metrics of sales (see core/aggregation.py)
+"""
+from django.db.models import Count, F, Q, Sum
+
+from core.aggregation import register, register_aging, register_choices
+from .models import Invoice, SaleOrder
+
+DELIVERED = Q(status='delivered')
+
+register(SaleOrder, 'total_sales', Sum('total_amount', filter=DELIVERED))
+register(SaleOrder, 'this_month_sales', lambda period: Sum(
+    'total_amount', filter=DELIVERED & Q(order_date__gte=period.this_month)
+))
+register(SaleOrder, 'last_month_sales', lambda period: Sum(
+    'total_amount', filter=DELIVERED & Q(order_date__gte=period.last_month, order_date__lt=period.this_month)
+))
+register_choices(SaleOrder, 'orders_{}', 'status', lambda q: Count('id', filter=q))
+
+# Receivables: open invoices and their outstanding balance
+OUTSTANDING = Q(status__in=['pending', 'partial'])
+BALANCE = F('amount') - F('paid_amount')
+
+register(Invoice, 'outstanding_count', Count('id', filter=OUTSTANDING))
+register(Invoice, 'outstanding_balance', Sum(BALANCE, filter=OUTSTANDING))
+register_aging(Invoice, 'due_date', BALANCE, OUTSTANDING)
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['created_at', 'id'], name='invoice_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saleorder',
+            index=models.Index(fields=['created_at', 'id'], name='sale_order_created_id_idx'),
+        ),
+    ]
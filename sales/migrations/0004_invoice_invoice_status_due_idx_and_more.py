@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0003_invoice_invoice_created_id_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['status', 'due_date'], name='invoice_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'partial'])), fields=['due_date'], name='invoice_open_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saleorder',
+            index=models.Index(fields=['status', 'order_date'], name='sale_order_status_date_idx'),
+        ),
+    ]
@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from core.indexes import TrigramIndexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_invoice_invoice_status_due_idx_and_more'),
+    ]
+
+    operations = [
+        TrigramIndexes('customers', ['name', 'email']),
+    ]
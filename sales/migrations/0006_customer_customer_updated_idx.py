@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0005_customer_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['updated_at'], name='customer_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:49
+
+from django.db import migrations, models
+
+
+def backfill_stats(apps, schema_editor):
+    from sales.stats import rebuild
+    rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0006_customer_customer_updated_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='last_order_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='open_balance',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='order_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='total_sales',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['total_sales'], name='customer_total_sales_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['last_order_at'], name='customer_last_order_idx'),
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,14 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from decimal import Decimal
 from users.models import User
+from core.counters import protect_counters
+from core.numbering import next_number
 from inventory.models import Product
+from inventory.stock import apply_movements
+
+# Activity stats maintained by sales/stats.py
+STATS_FIELDS = ('order_count', 'total_sales', 'last_order_at', 'open_balance')
 
 
 class Customer(models.Model):
@@ -13,15 +20,29 @@ class Customer(models.Model):
     phone = models.CharField(max_length=20, blank=True)
     address = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
+    order_count = models.IntegerField(default=0, editable=False)
+    total_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    last_order_at = models.DateTimeField(null=True, blank=True, editable=False)
+    open_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'customers'
+        indexes = [
+            # High-water mark for conditional GETs (core.conditional)
+            models.Index(fields=['updated_at'], name='customer_updated_idx'),
+            # Top customers and recent activity (customer report)
+            models.Index(fields=['total_sales'], name='customer_total_sales_idx'),
+            models.Index(fields=['last_order_at'], name='customer_last_order_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **protect_counters(self, STATS_FIELDS, kwargs))
+
 
 class SaleOrder(models.Model):
     """
@@ -51,45 +72,90 @@ class SaleOrder(models.Model):
     class Meta:
         db_table = 'sale_orders'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination (core.pagination)
+            models.Index(fields=['created_at', 'id'], name='sale_order_created_id_idx'),
+            models.Index(fields=['status', 'order_date'], name='sale_order_status_date_idx'),
+        ]
 
     def __str__(self):
         return f"SO-{self.order_number}"
 
     def save(self, *args, **kwargs):
         if not self.order_number:
-            # Generate order number
-            last_order = SaleOrder.objects.order_by('-id').first()
-            if last_order:
-                last_number = int(last_order.order_number.split('-')[1])
-                self.order_number = f"SO-{last_number + 1:06d}"
-            else:
-                self.order_number = "SO-000001"
-        super().save(*args, **kwargs)
+            self.order_number = next_number('sale_order', using=kwargs.get('using'))
+        # pre_save handlers lock the stored row (sales/reports signals) until
+        # post_save has applied the deltas: keep both in one transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
     def calculate_totals(self):
         """Calculate order totals"""
         subtotal = sum(item.total_price for item in self.items.all())
+        self.set_totals(subtotal)
+        self.save()
+
+    def set_totals(self, subtotal):
+        """Set subtotal, tax and total from an items subtotal"""
         self.subtotal = subtotal
         self.tax_amount = subtotal * Decimal('0.10')  # 10% tax
         self.total_amount = self.subtotal + self.tax_amount
-        self.save()
+
+    def add_items(self, items):
+        """
+        Insert many items at once and recalculate totals a single time.
+
+        ``items`` is an iterable of dicts with ``product_id``, ``quantity``
+        and ``unit_price``. Unlike ``SaleOrderItem.save`` this doesn't
+        recalculate the order once per item.
+        """
+        order_items = [
+            SaleOrderItem(
+                order=self,
+                product_id=item['product_id'],
+                quantity=item['quantity'],
+                unit_price=item['unit_price'],
+                total_price=item['quantity'] * item['unit_price'],
+            )
+            for item in items
+        ]
+        SaleOrderItem.objects.bulk_create(order_items)
+
+        subtotal = self.items.aggregate(total=models.Sum('total_price'))['total'] or Decimal('0')
+        self.set_totals(subtotal)
+        self.save(update_fields=['subtotal', 'tax_amount', 'total_amount', 'updated_at'])
+        return order_items
     
-    def confirm(self):
-        """Confirm order and update stock"""
-        if self.status == 'draft':
-            # Check if we have enough stock for all items
-            for item in self.items.all():
-                if item.product.stock_quantity < item.quantity:
-                    raise ValueError(f"Insufficient stock for {item.product.name}. Available: {item.product.stock_quantity}, Required: {item.quantity}")
-            
-            # Update stock for all items
-            for item in self.items.all():
-                item.product.stock_quantity -= item.quantity
-                item.product.save()
-            
-            # Update order status
-            self.status = 'confirmed'
-            self.save()
+    def confirm(self, user=None):
+        """
+        Confirm order and reserve its stock in a single transaction.
+
+        Raises InsufficientStockError listing every short product; nothing
+        is changed in that case. Returns False if the order was not a draft.
+        """
+        with transaction.atomic():
+            # Claim the draft with a conditional UPDATE so the same order
+            # can't be confirmed (and its stock taken) twice concurrently
+            claimed = SaleOrder.objects.filter(pk=self.pk, status='draft').update(
+                status='confirmed', updated_at=timezone.now()
+            )
+            if not claimed:
+                return False
+
+            apply_movements(
+                [
+                    {
+                        'product_id': product_id,
+                        'movement_type': 'out',
+                        'quantity': quantity,
+                        'reference': self.order_number,
+                    }
+                    for product_id, quantity in self.items.values_list('product_id', 'quantity')
+                ],
+                user or self.created_by,
+            )
+        self.status = 'confirmed'
+        return True
 
 
 class SaleOrderItem(models.Model):
@@ -111,10 +177,11 @@ class SaleOrderItem(models.Model):
 
     def save(self, *args, **kwargs):
         self.total_price = self.quantity * self.unit_price
-        super().save(*args, **kwargs)
-        
-        # Update order totals
-        self.order.calculate_totals()
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+            # Update order totals
+            self.order.calculate_totals()
 
 
 class Invoice(models.Model):
@@ -138,20 +205,27 @@ class Invoice(models.Model):
 
     class Meta:
         db_table = 'invoices'
+        indexes = [
+            # Keyset pagination (core.pagination)
+            models.Index(fields=['created_at', 'id'], name='invoice_created_id_idx'),
+            models.Index(fields=['status', 'due_date'], name='invoice_status_due_idx'),
+            # Open invoices (outstanding balances, aging)
+            models.Index(
+                fields=['due_date'],
+                condition=models.Q(status__in=['pending', 'partial']),
+                name='invoice_open_due_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"INV-{self.invoice_number}"
 
     def save(self, *args, **kwargs):
         if not self.invoice_number:
-            # Generate invoice number
-            last_invoice = Invoice.objects.order_by('-id').first()
-            if last_invoice:
-                last_number = int(last_invoice.invoice_number.split('-')[1])
-                self.invoice_number = f"INV-{last_number + 1:06d}"
-            else:
-                self.invoice_number = "INV-000001"
-        super().save(*args, **kwargs)
+            self.invoice_number = next_number('invoice', using=kwargs.get('using'))
+        # See SaleOrder.save
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
     @property
     def balance(self):
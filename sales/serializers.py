@@ -1,4 +1,6 @@
+from django.db import transaction
 from rest_framework import serializers
+from inventory.models import Product
 from .models import Customer, SaleOrder, SaleOrderItem, Invoice
 
 
@@ -6,18 +8,18 @@ class CustomerSerializer(serializers.ModelSerializer):
     """
     Serializer for Customer model
     """
-    orders_count = serializers.SerializerMethodField()
+    # Maintained stats (sales/stats.py), read without touching sale orders
+    orders_count = serializers.ReadOnlyField(source='order_count')
 
     class Meta:
         model = Customer
         fields = [
-            'id', 'name', 'email', 'phone', 'address', 'is_active',
-            'orders_count', 'created_at', 'updated_at'
+            'id', 'name', 'email', 'phone', 'address', 'is_active', 'orders_count',
+            'total_sales', 'last_order_at', 'open_balance', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'total_sales', 'last_order_at', 'open_balance', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
-
-    def get_orders_count(self, obj):
-        return obj.orders.count()
 
 
 class SaleOrderItemSerializer(serializers.ModelSerializer):
@@ -59,15 +61,21 @@ class SaleOrderSerializer(serializers.ModelSerializer):
         ]
 
 
+class SaleOrderItemInputSerializer(serializers.Serializer):
+    """
+    Serializer for validating order lines on creation
+    """
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+
+
 class SaleOrderCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating sale orders with items
     """
     customer_id = serializers.IntegerField()
-    items = serializers.ListField(
-        child=serializers.DictField(),
-        write_only=True
-    )
+    items = SaleOrderItemInputSerializer(many=True, write_only=True)
 
     class Meta:
         model = SaleOrder
@@ -76,24 +84,37 @@ class SaleOrderCreateSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id']
 
+    def validate_items(self, items):
+        # Load every referenced product with a single query
+        product_ids = {item['product'] for item in items}
+        products = Product.objects.in_bulk(product_ids)
+        missing = sorted(product_ids - set(products))
+        if missing:
+            raise serializers.ValidationError(
+                f"Products not found: {', '.join(str(pk) for pk in missing)}"
+            )
+        return items
+
     def create(self, validated_data):
         items_data = validated_data.pop('items')
         customer_id = validated_data.pop('customer_id')
         
-        # Create the sale order
-        sale_order = SaleOrder.objects.create(
-            customer_id=customer_id,
-            created_by=self.context['request'].user,
-            **validated_data
-        )
-        
-        # Create order items
-        for item_data in items_data:
-            product_id = item_data.pop('product')
-            SaleOrderItem.objects.create(
-                order=sale_order,
-                product_id=product_id,
-                **item_data
+        with transaction.atomic():
+            # Create the sale order
+            sale_order = SaleOrder.objects.create(
+                customer_id=customer_id,
+                created_by=self.context['request'].user,
+                **validated_data
+            )
+            
+            # Create order items in bulk and compute totals once
+            sale_order.add_items(
+                {
+                    'product_id': item['product'],
+                    'quantity': item['quantity'],
+                    'unit_price': item['unit_price'],
+                }
+                for item in items_data
             )
         
         return sale_order
@@ -0,0 +1,72 @@
+"""
+Signal handlers keeping the customer activity stats current (sales/stats.py)
+
+The values a save replaces are read from the row in pre_save/pre_delete,
+so an order or invoice loaded (or refreshed) before someone else changed
+it can't apply a wrong difference.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core import conditional, counters
+from . import stats
+from .models import Customer, Invoice, SaleOrder
+
+TRACKED_FIELDS = {
+    SaleOrder: stats.ORDER_FIELDS,
+    Invoice: stats.INVOICE_FIELDS,
+}
+
+
+def stats_saving(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    fields = TRACKED_FIELDS[sender]
+    if raw or instance._state.adding or not counters.writes_fields(sender, fields, update_fields):
+        return
+    instance._stats_values = counters.stored_values(sender, instance.pk, fields, using)
+
+
+def stats_deleting(sender, instance, using=None, **kwargs):
+    instance._stats_values = counters.stored_values(sender, instance.pk, TRACKED_FIELDS[sender], using)
+
+
+for model in TRACKED_FIELDS:
+    pre_save.connect(stats_saving, sender=model, dispatch_uid=f'customer_stats_pre_save_{model.__name__}')
+    pre_delete.connect(stats_deleting, sender=model, dispatch_uid=f'customer_stats_pre_delete_{model.__name__}')
+
+
+def _saved(sender, instance, created, update_fields):
+    """``(old, new)`` values of a save, or None when the stats are unaffected"""
+    old = None if created else instance.__dict__.pop('_stats_values', None)
+    if old is None and not created:
+        # None of the tracked fields was written
+        return None
+    new = counters.saved_values(instance, TRACKED_FIELDS[sender], old, update_fields)
+    return None if old == new else (old, new)
+
+
+@receiver(post_save, sender=SaleOrder, dispatch_uid='customer_stats_order_save')
+def order_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    change = None if raw else _saved(sender, instance, created, update_fields)
+    if change:
+        stats.apply_order_change(instance.pk, *change)
+
+
+@receiver(post_delete, sender=SaleOrder, dispatch_uid='customer_stats_order_delete')
+def order_deleted(sender, instance, **kwargs):
+    stats.apply_order_change(instance.pk, instance.__dict__.pop('_stats_values', None), None)
+
+
+@receiver(post_save, sender=Invoice, dispatch_uid='customer_stats_invoice_save')
+def invoice_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    change = None if raw else _saved(sender, instance, created, update_fields)
+    if change:
+        stats.apply_invoice_change(*change)
+
+
+@receiver(post_delete, sender=Invoice, dispatch_uid='customer_stats_invoice_delete')
+def invoice_deleted(sender, instance, **kwargs):
+    stats.apply_invoice_change(instance.__dict__.pop('_stats_values', None), None)
+
+
+# Deletions change the validators of the customer list (core.conditional)
+conditional.track_deletions(Customer, SaleOrder, Invoice)
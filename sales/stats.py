@@ -0,0 +1,168 @@
+"""
+Denormalized customer activity stats
+
+Every customer carries its lifetime number of orders and their total
+(whatever their status, as the customer report always counted them), when
+it placed its last order and what it still owes on open invoices, so the
+customer list, "top customers" and "active customers" read indexed
+columns instead of aggregating sale orders on every request.
+
+Stats change with F() updates inside the transaction that saves or
+deletes an order or invoice (``sales.signals``). Order status changes
+(``confirm()`` uses ``update()``) don't affect them. Bulk inserts and
+``update()`` calls on totals or invoices skip the signals: run
+``manage.py rebuild_partner_stats`` after them.
+"""
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, Max, Subquery, Sum
+
+from core import counters
+from core.counters import CENT, ZERO, decimal
+from .models import STATS_FIELDS
+
+# Fields the stats depend on (attnames)
+ORDER_FIELDS = ('customer_id', 'total_amount', 'created_at')
+INVOICE_FIELDS = ('sale_order_id', 'amount', 'paid_amount', 'status')
+# Invoices with a balance still to collect
+OPEN_STATUSES = ('pending', 'partial')
+
+EMPTY = {'order_count': 0, 'total_sales': ZERO, 'last_order_at': None, 'open_balance': ZERO}
+
+
+def _model(name, apps=global_apps):
+    return apps.get_model('sales', name)
+
+
+def _balance(invoice):
+    if not invoice or invoice['status'] not in OPEN_STATUSES:
+        return ZERO
+    return decimal(invoice['amount']) - decimal(invoice['paid_amount'])
+
+
+def _customer_of(order_id):
+    return _model('SaleOrder').objects.filter(pk=order_id).values_list('customer_id', flat=True).first()
+
+
+def last_order_at(customer_id):
+    """Subquery with the creation time of the latest order of a customer"""
+    orders = _model('SaleOrder').objects.filter(customer_id=customer_id).order_by('-created_at')
+    return Subquery(orders.values('created_at')[:1])
+
+
+def apply_order_change(order_id, old, new):
+    """
+    Move an order's contribution from ``old`` to ``new`` (values of
+    ``ORDER_FIELDS``; None for a created or deleted order)
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    assignments = {}
+    old_customer = old and old['customer_id']
+    new_customer = new and new['customer_id']
+    if old_customer:
+        deltas[old_customer]['order_count'] -= 1
+        deltas[old_customer]['total_sales'] -= decimal(old['total_amount'])
+    if new_customer:
+        deltas[new_customer]['order_count'] += 1
+        deltas[new_customer]['total_sales'] += decimal(new['total_amount'])
+
+    if old_customer != new_customer:
+        if old_customer:
+            # The deleted or moved order may have been the latest one
+            assignments[old_customer] = {'last_order_at': last_order_at(old_customer)}
+        if new_customer:
+            assignments[new_customer] = {'last_order_at': counters.latest('last_order_at', new['created_at'])}
+        if old and new:
+            # Its invoice's balance moves along
+            invoice = _model('Invoice').objects.filter(sale_order_id=order_id).values(*INVOICE_FIELDS).first()
+            balance = _balance(invoice)
+            deltas[old_customer]['open_balance'] -= balance
+            deltas[new_customer]['open_balance'] += balance
+
+    counters.bump(_model('Customer'), deltas, assignments)
+
+
+def apply_invoice_change(old, new):
+    """
+    Move an invoice's open balance from ``old`` to ``new`` (values of
+    ``INVOICE_FIELDS``; None for a created or deleted invoice)
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for values, sign in ((old, -1), (new, 1)):
+        balance = _balance(values)
+        if balance:
+            customer_id = _customer_of(values['sale_order_id'])
+            if customer_id:
+                deltas[customer_id]['open_balance'] += sign * balance
+    counters.bump(_model('Customer'), deltas)
+
+
+# ---------------------------------------------------------------------------
+# Rebuild and consistency checks
+# ---------------------------------------------------------------------------
+
+def compute_from_raw(customer_ids=None, apps=global_apps):
+    """
+    ``{customer_id: stats}`` aggregated from orders and invoices (customers
+    without any are left out)
+    """
+    orders = _model('SaleOrder', apps).objects.all()
+    invoices = _model('Invoice', apps).objects.filter(status__in=OPEN_STATUSES)
+    if customer_ids is not None:
+        orders = orders.filter(customer_id__in=customer_ids)
+        invoices = invoices.filter(sale_order__customer_id__in=customer_ids)
+
+    # Two grouped queries: joining invoices into the order aggregation
+    # would repeat rows
+    stats = defaultdict(lambda: dict(EMPTY))
+    for row in orders.order_by().values('customer_id').annotate(
+        order_count=Count('id'), total_sales=Sum('total_amount'), last_order_at=Max('created_at'),
+    ):
+        stats[row.pop('customer_id')].update(row, total_sales=decimal(row['total_sales']))
+    for customer_id, balance in invoices.order_by().values('sale_order__customer_id').annotate(
+        balance=Sum(F('amount') - F('paid_amount')),
+    ).values_list('sale_order__customer_id', 'balance'):
+        stats[customer_id]['open_balance'] = decimal(balance)
+
+    # SQLite sums decimals as floats
+    return {
+        customer_id: {
+            **values,
+            'total_sales': values['total_sales'].quantize(CENT),
+            'open_balance': values['open_balance'].quantize(CENT),
+        }
+        for customer_id, values in stats.items()
+    }
+
+
+def rebuild(customer_ids=None, apps=global_apps):
+    """
+    Recompute the stats of ``customer_ids`` (every customer by default).
+    Returns the drift found, as ``check_consistency`` does.
+    """
+    Customer = _model('Customer', apps)
+    customers = Customer.objects.all()
+    if customer_ids is not None:
+        customers = customers.filter(pk__in=customer_ids)
+    with transaction.atomic():
+        # Lock the rows so no incremental update lands between reading and writing
+        list(customers.select_for_update().order_by('pk').values_list('pk', flat=True))
+        mismatches = check_consistency(customer_ids, apps)
+        Customer.objects.bulk_update(
+            [Customer(pk=customer_id, **expected) for customer_id, _, expected, _ in mismatches],
+            STATS_FIELDS, batch_size=1000,
+        )
+    return mismatches
+
+
+def check_consistency(customer_ids=None, apps=global_apps):
+    """
+    Compare the stats against orders and invoices. Returns a list of
+    ``(customer_id, name, expected, actual)``, empty when consistent.
+    """
+    customers = _model('Customer', apps).objects.all()
+    if customer_ids is not None:
+        customers = customers.filter(pk__in=customer_ids)
+    return counters.mismatches(customers, compute_from_raw(customer_ids, apps), STATS_FIELDS, EMPTY)
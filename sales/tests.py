@@ -1,8 +1,19 @@
-from django.test import TestCase
+import threading
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
 from decimal import Decimal
 from users.models import User
-from inventory.models import Category, Product
+from inventory.models import Category, Product, StockMovement
+from inventory.stock import InsufficientStockError
+from . import stats
 from .models import Customer, SaleOrder, SaleOrderItem, Invoice
 
 
@@ -254,3 +265,380 @@ class InvoiceModelTest(TestCase):
         self.invoice.paid_amount = 1000.00
         self.invoice.update_status()
         self.assertEqual(self.invoice.status, "paid")
+
+
+class SaleOrderBulkCreateTest(TestCase):
+    """Tests para la creación de órdenes con muchos items"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.customer = Customer.objects.create(name="Test Customer")
+        self.category = Category.objects.create(name="Test Category")
+        self.products = Product.objects.bulk_create([
+            Product(
+                name=f"Product {i}",
+                sku=f"BULK-{i:03d}",
+                category=self.category,
+                price=Decimal('10.00'),
+                created_by=self.user
+            )
+            for i in range(150)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def post_order(self, lines):
+        return self.client.post(reverse('saleorder-list'), {
+            "customer_id": self.customer.id,
+            "order_date": timezone.now().date().isoformat(),
+            "items": [
+                {"product": product.id, "quantity": 2, "unit_price": "10.00"}
+                for product in self.products[:lines]
+            ]
+        }, format='json')
+    
+    def count_queries(self, lines):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_order(lines)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return len(queries)
+    
+    def test_totals_are_computed_once(self):
+        """Test que los totales de una orden grande son correctos"""
+        response = self.post_order(150)
+        
+        order = SaleOrder.objects.get(id=response.data['id'])
+        self.assertEqual(order.items.count(), 150)
+        self.assertEqual(order.subtotal, Decimal('3000.00'))
+        self.assertEqual(order.tax_amount, Decimal('300.00'))
+        self.assertEqual(order.total_amount, Decimal('3300.00'))
+    
+    def test_query_count_does_not_grow_with_order_size(self):
+        """Test que la cantidad de consultas no depende de la cantidad de items"""
+        self.count_queries(1)  # warm up numbering and authentication
+        self.assertEqual(self.count_queries(1), self.count_queries(100))
+    
+    def test_unknown_products_are_reported(self):
+        """Test que se informan los productos inexistentes sin crear la orden"""
+        response = self.client.post(reverse('saleorder-list'), {
+            "customer_id": self.customer.id,
+            "order_date": timezone.now().date().isoformat(),
+            "items": [{"product": 999999, "quantity": 1, "unit_price": "10.00"}]
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('999999', str(response.data['items']))
+        self.assertFalse(SaleOrder.objects.exists())
+
+
+class SaleOrderConfirmTest(TestCase):
+    """Tests para la reserva de stock al confirmar órdenes"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.customer = Customer.objects.create(name="Test Customer")
+        self.category = Category.objects.create(name="Test Category")
+        self.products = Product.objects.bulk_create([
+            Product(
+                name=f"Product {i}",
+                sku=f"CONF-{i:03d}",
+                category=self.category,
+                price=Decimal('10.00'),
+                stock_quantity=5,
+                created_by=self.user
+            )
+            for i in range(100)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def create_order(self, quantities):
+        order = SaleOrder.objects.create(
+            customer=self.customer,
+            order_date=timezone.now().date(),
+            created_by=self.user
+        )
+        order.add_items(
+            {'product_id': product.id, 'quantity': quantity, 'unit_price': Decimal('10.00')}
+            for product, quantity in zip(self.products, quantities)
+        )
+        return order
+    
+    def test_confirm_reserves_stock_and_records_movements(self):
+        """Test que confirmar descuenta stock y registra los movimientos"""
+        order = self.create_order([2, 5])
+        
+        self.assertTrue(order.confirm())
+        
+        self.assertEqual(SaleOrder.objects.get(pk=order.pk).status, 'confirmed')
+        stock = dict(Product.objects.filter(pk__in=[p.pk for p in self.products[:2]])
+                     .values_list('sku', 'stock_quantity'))
+        self.assertEqual(stock, {'CONF-000': 3, 'CONF-001': 0})
+        movements = StockMovement.objects.filter(reference=order.order_number, movement_type='out')
+        self.assertEqual(movements.count(), 2)
+        self.assertFalse(order.confirm())  # already confirmed, stock untouched
+        self.assertEqual(StockMovement.objects.count(), 2)
+    
+    def test_confirming_twice_is_rejected(self):
+        """Test que confirmar dos veces la misma orden responde 400 y no toca el stock"""
+        order = self.create_order([2])
+        url = reverse('saleorder-confirm', kwargs={'pk': order.pk})
+
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_200_OK)
+        response = self.client.post(url)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Only draft orders can be confirmed')
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock_quantity, 3)
+        self.assertEqual(StockMovement.objects.count(), 1)
+    
+    def test_all_shortfalls_are_reported(self):
+        """Test que se informan todos los faltantes y no se modifica nada"""
+        order = self.create_order([6, 1, 9])
+        
+        response = self.client.post(reverse('saleorder-confirm', kwargs={'pk': order.pk}))
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        shortfalls = response.data['shortfalls']
+        self.assertEqual([s['product_name'] for s in shortfalls], ['Product 0', 'Product 2'])
+        self.assertEqual((shortfalls[1]['available'], shortfalls[1]['required']), (5, 9))
+        self.assertEqual(SaleOrder.objects.get(pk=order.pk).status, 'draft')
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock_quantity, 5)
+        self.assertFalse(StockMovement.objects.exists())
+    
+    def test_query_count_does_not_grow_with_order_size(self):
+        """Test que confirmar no hace consultas por item"""
+        small, large = self.create_order([1]), self.create_order([1] * 100)
+        
+        with CaptureQueriesContext(connection) as small_queries:
+            small.confirm()
+        with CaptureQueriesContext(connection) as large_queries:
+            large.confirm()
+        self.assertEqual(len(small_queries), len(large_queries))
+
+
+class SaleOrderConfirmConcurrencyTest(TransactionTestCase):
+    """Stress test: confirmación concurrente de órdenes sobre los mismos productos"""
+    
+    THREADS = 8
+    ORDERS_PER_THREAD = 20
+    STOCK = 100
+    
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('In-memory SQLite does not support concurrent writers; '
+                          'set SQLITE_TEST_NAME to a file path')
+        self.user = User.objects.create_user(
+            username="stress",
+            email="stress@example.com",
+            password="testpass123"
+        )
+        customer = Customer.objects.create(name="Stress Customer")
+        self.hot_products = [
+            Product.objects.create(
+                name=f"Hot {i}",
+                sku=f"HOT-{i}",
+                price=Decimal('10.00'),
+                stock_quantity=self.STOCK,
+                created_by=self.user
+            )
+            for i in range(3)
+        ]
+        self.orders = []
+        for _ in range(self.THREADS * self.ORDERS_PER_THREAD):
+            order = SaleOrder.objects.create(
+                customer=customer,
+                order_date=timezone.now().date(),
+                created_by=self.user
+            )
+            order.add_items(
+                {'product_id': product.id, 'quantity': 1, 'unit_price': Decimal('10.00')}
+                for product in self.hot_products
+            )
+            self.orders.append(order)
+    
+    def test_hot_products_are_never_oversold(self):
+        """Test que con más demanda que stock nunca se vende de más"""
+        confirmed = []
+        errors = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.THREADS)
+        
+        def worker(orders):
+            try:
+                start.wait()
+                for order in orders:
+                    try:
+                        order.confirm()
+                        with lock:
+                            confirmed.append(order.pk)
+                    except InsufficientStockError:
+                        pass
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+        
+        threads = [
+            threading.Thread(target=worker, args=(self.orders[i::self.THREADS],))
+            for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(len(confirmed), self.STOCK)
+        for product in Product.objects.filter(pk__in=[p.pk for p in self.hot_products]):
+            self.assertEqual(product.stock_quantity, 0)
+            self.assertEqual(product.stock_movements.count(), self.STOCK)
+        self.assertEqual(SaleOrder.objects.filter(status='confirmed').count(), self.STOCK)
+
+
+class CustomerStatsTest(TestCase):
+    """Tests para las estadísticas de actividad mantenidas por cliente"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.customer = Customer.objects.create(name="Stats Customer")
+        self.other = Customer.objects.create(name="Other Customer")
+        self.product = Product.objects.create(
+            name="Stats Product",
+            sku="STATS-001",
+            price=Decimal('50.00'),
+            cost_price=Decimal('30.00'),
+            stock_quantity=100,
+            created_by=self.user
+        )
+
+    def create_order(self, customer, quantity=2):
+        order = SaleOrder.objects.create(
+            customer=customer, order_date=timezone.now().date(), created_by=self.user
+        )
+        order.add_items([{'product_id': self.product.id, 'quantity': quantity, 'unit_price': Decimal('50.00')}])
+        return order
+
+    def create_invoice(self, order):
+        return Invoice.objects.create(
+            sale_order=order,
+            invoice_date=timezone.now().date(),
+            due_date=timezone.now().date() + timezone.timedelta(days=30),
+            amount=order.total_amount
+        )
+
+    def assertStats(self, customer, order_count, total_sales, open_balance):
+        customer.refresh_from_db()
+        self.assertEqual(
+            (customer.order_count, customer.total_sales, customer.open_balance),
+            (order_count, Decimal(total_sales), Decimal(open_balance))
+        )
+        self.assertEqual(stats.check_consistency(), [])
+
+    def test_stats_follow_orders_and_invoices(self):
+        """Test que las estadísticas siguen órdenes, facturas y pagos"""
+        order = self.create_order(self.customer)
+        self.assertStats(self.customer, 1, '110.00', '0.00')
+        self.assertEqual(self.customer.last_order_at, order.created_at)
+
+        # Confirming changes the status with update(): totals stay the same
+        order.confirm(self.user)
+        self.assertStats(self.customer, 1, '110.00', '0.00')
+
+        invoice = self.create_invoice(order)
+        self.assertStats(self.customer, 1, '110.00', '110.00')
+
+        invoice.paid_amount = Decimal('60.00')
+        invoice.update_status()
+        self.assertStats(self.customer, 1, '110.00', '50.00')
+
+        invoice.paid_amount = Decimal('110.00')
+        invoice.update_status()
+        self.assertStats(self.customer, 1, '110.00', '0.00')
+
+        second = self.create_order(self.customer, quantity=1)
+        self.assertStats(self.customer, 2, '165.00', '0.00')
+        self.assertEqual(self.customer.last_order_at, second.created_at)
+
+        second.delete()
+        self.assertStats(self.customer, 1, '110.00', '0.00')
+        self.assertEqual(self.customer.last_order_at, order.created_at)
+
+    def test_moving_an_order_moves_its_stats(self):
+        """Test que cambiar el cliente de una orden mueve sus totales, saldo y última fecha"""
+        order = self.create_order(self.customer)
+        self.create_invoice(order)
+
+        order.customer = self.other
+        order.save()
+        self.assertStats(self.customer, 0, '0.00', '0.00')
+        self.assertIsNone(self.customer.last_order_at)
+        self.assertStats(self.other, 1, '110.00', '110.00')
+        self.assertEqual(self.other.last_order_at, order.created_at)
+
+    def test_saving_a_loaded_customer_keeps_stats(self):
+        """Test que guardar un cliente cargado antes de una orden no pisa sus estadísticas"""
+        loaded = Customer.objects.get(pk=self.customer.pk)
+        self.create_order(self.customer)
+        loaded.name = "Renamed"
+        loaded.save()
+        self.assertStats(self.customer, 1, '110.00', '0.00')
+
+    def test_reconciliation_after_mixed_operations(self):
+        """Test que tras una secuencia mixta de operaciones las estadísticas coinciden con los datos"""
+        orders = [self.create_order(customer, quantity) for customer, quantity in
+                  [(self.customer, 1), (self.other, 3), (self.customer, 4), (self.other, 2)]]
+        invoices = [self.create_invoice(order) for order in orders[:3]]
+        stale = SaleOrder.objects.get(pk=orders[1].pk)
+
+        invoices[0].paid_amount = Decimal('20.00')
+        invoices[0].update_status()
+        invoices[1].status = 'overdue'
+        invoices[1].save()
+        SaleOrderItem.objects.create(order=orders[2], product=self.product, quantity=1, unit_price=Decimal('10.00'))
+        orders[3].customer = self.customer
+        orders[3].save()
+        # A stale instance: its snapshot misses the other changes
+        stale.refresh_from_db()
+        stale.notes = "Stale"
+        stale.save()
+        invoices[2].delete()
+        orders[0].delete()
+
+        self.assertEqual(stats.check_consistency(), [])
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.order_count, 2)
+
+        # Changes made with update() are only picked up by a rebuild
+        SaleOrder.objects.filter(pk=orders[2].pk).update(total_amount=Decimal('1.00'))
+        with self.assertRaises(CommandError):
+            call_command('rebuild_partner_stats', '--check', stdout=StringIO())
+        call_command('rebuild_partner_stats', stdout=StringIO())
+        self.assertEqual(stats.check_consistency(), [])
+
+    def test_customer_list_reads_stats(self):
+        """Test que el listado de clientes no agrega las órdenes de venta"""
+        self.create_order(self.customer)
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('customer-list'))
+
+        results = {row['id']: row for row in response.data['results']}
+        self.assertEqual(results[self.customer.id]['orders_count'], 1)
+        self.assertEqual(results[self.customer.id]['total_sales'], '110.00')
+        # Only the conditional GET high-water mark reads the orders table
+        self.assertFalse(any('JOIN "sale_orders"' in query['sql'] for query in queries.captured_queries))
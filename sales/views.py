@@ -2,9 +2,15 @@ from django.shortcuts import render
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q, Sum, Count
+from django.db.models import Q
 from django.utils import timezone
-from datetime import timedelta
+from core.aggregation import choice_rows, summarize
+from core.compact import CompactListMixin
+from core.conditional import ConditionalListMixin
+from core.exports import ExportMixin, nest, stream_values
+from core.pagination import FlexiblePagination
+from core.query_plans import QueryPlanMixin, apply_query_plan
+from inventory.stock import InsufficientStockError
 from .models import Customer, SaleOrder, SaleOrderItem, Invoice
 from .serializers import (
     CustomerSerializer, SaleOrderSerializer, SaleOrderCreateSerializer,
@@ -12,13 +18,18 @@ from .serializers import (
 )
 
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(ConditionalListMixin, CompactListMixin, QueryPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing customers
     """
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     permission_classes = [permissions.IsAuthenticated]
+    compact_fields = {
+        'id': 'id', 'name': 'name', 'email': 'email', 'phone': 'phone', 'is_active': 'is_active',
+    }
+    # The stats change with orders and invoices
+    last_modified_models = (Customer, SaleOrder, Invoice)
 
     def get_queryset(self):
         queryset = Customer.objects.all().order_by('-created_at')
@@ -38,18 +49,35 @@ class CustomerViewSet(viewsets.ModelViewSet):
         Get all orders for a customer
         """
         customer = self.get_object()
-        orders = SaleOrder.objects.filter(customer=customer)
+        orders = apply_query_plan(SaleOrder.objects.filter(customer=customer), SaleOrderSerializer)
         serializer = SaleOrderSerializer(orders, many=True)
         return Response(serializer.data)
 
 
-class SaleOrderViewSet(viewsets.ModelViewSet):
+class SaleOrderViewSet(ExportMixin, CompactListMixin, QueryPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing sale orders
     """
     queryset = SaleOrder.objects.all()
     serializer_class = SaleOrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FlexiblePagination
+    export_fields = {
+        'id': 'id', 'order_number': 'order_number', 'customer_id': 'customer_id',
+        'customer': 'customer__name', 'status': 'status', 'order_date': 'order_date',
+        'delivery_date': 'delivery_date', 'subtotal': 'subtotal', 'tax_amount': 'tax_amount',
+        'total_amount': 'total_amount', 'created_at': 'created_at',
+    }
+    export_item_fields = {
+        'item_id': 'items__id', 'product_id': 'items__product_id',
+        'product_sku': 'items__product__sku', 'quantity': 'items__quantity',
+        'unit_price': 'items__unit_price', 'total_price': 'items__total_price',
+    }
+    compact_fields = {
+        'id': 'id', 'order_number': 'order_number', 'customer_id': 'customer_id',
+        'customer_name': 'customer__name', 'status': 'status', 'order_date': 'order_date',
+        'delivery_date': 'delivery_date', 'total_amount': 'total_amount', 'created_at': 'created_at',
+    }
 
     def get_queryset(self):
         queryset = SaleOrder.objects.all().order_by('-created_at')
@@ -76,6 +104,19 @@ class SaleOrderViewSet(viewsets.ModelViewSet):
             return SaleOrderCreateSerializer
         return SaleOrderSerializer
 
+    def export_rows(self, queryset, file_format):
+        # One row per item (orders without items keep one row with empty
+        # item columns); NDJSON nests the items back into their order
+        rows = stream_values(
+            queryset.order_by('pk', 'items__id'), {**self.export_fields, **self.export_item_fields}
+        )
+        if file_format == 'csv':
+            return rows
+        return nest(rows, 'id', list(self.export_fields), 'items', list(self.export_item_fields))
+
+    def export_columns(self, file_format):
+        return [*self.export_fields, *self.export_item_fields]
+
     def perform_create(self, serializer):
         serializer.save()
 
@@ -86,8 +127,17 @@ class SaleOrderViewSet(viewsets.ModelViewSet):
         """
         order = self.get_object()
         try:
-            order.confirm()
+            if not order.confirm(user=request.user):
+                return Response(
+                    {'error': 'Only draft orders can be confirmed'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             return Response({'message': 'Order confirmed successfully'})
+        except InsufficientStockError as e:
+            return Response(
+                {'error': str(e), 'shortfalls': e.shortfalls},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except ValueError as e:
             return Response(
                 {'error': str(e)}, 
@@ -134,42 +184,18 @@ class SaleOrderViewSet(viewsets.ModelViewSet):
         """
         Get sales summary statistics
         """
-        today = timezone.now().date()
-        this_month = today.replace(day=1)
-        last_month = (this_month - timedelta(days=1)).replace(day=1)
-        
-        # Total sales
-        total_sales = SaleOrder.objects.filter(status='delivered').aggregate(
-            total=Sum('total_amount')
-        )['total'] or 0
-        
-        # This month sales
-        this_month_sales = SaleOrder.objects.filter(
-            status='delivered',
-            order_date__gte=this_month
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        # Last month sales
-        last_month_sales = SaleOrder.objects.filter(
-            status='delivered',
-            order_date__gte=last_month,
-            order_date__lt=this_month
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        # Orders by status
-        orders_by_status = SaleOrder.objects.values('status').annotate(
-            count=Count('id')
-        )
+        # Every registered metric (sales/metrics.py) in a single scan
+        summary = summarize(SaleOrder.objects.all())
         
         return Response({
-            'total_sales': float(total_sales),
-            'this_month_sales': float(this_month_sales),
-            'last_month_sales': float(last_month_sales),
-            'orders_by_status': list(orders_by_status)
+            'total_sales': float(summary['total_sales']),
+            'this_month_sales': float(summary['this_month_sales']),
+            'last_month_sales': float(summary['last_month_sales']),
+            'orders_by_status': choice_rows(summary, SaleOrder, 'status', count='orders_{}')
         })
 
 
-class SaleOrderItemViewSet(viewsets.ModelViewSet):
+class SaleOrderItemViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing sale order items
     """
@@ -181,13 +207,25 @@ class SaleOrderItemViewSet(viewsets.ModelViewSet):
         return SaleOrderItem.objects.all().order_by('-created_at')
 
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(ExportMixin, CompactListMixin, QueryPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing invoices
     """
     queryset = Invoice.objects.all()
     serializer_class = InvoiceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FlexiblePagination
+    export_fields = {
+        'id': 'id', 'invoice_number': 'invoice_number',
+        'order_number': 'sale_order__order_number', 'customer': 'sale_order__customer__name',
+        'invoice_date': 'invoice_date', 'due_date': 'due_date', 'amount': 'amount',
+        'paid_amount': 'paid_amount', 'status': 'status', 'created_at': 'created_at',
+    }
+    compact_fields = {
+        'id': 'id', 'invoice_number': 'invoice_number', 'sale_order_id': 'sale_order_id',
+        'customer_name': 'sale_order__customer__name', 'invoice_date': 'invoice_date',
+        'due_date': 'due_date', 'amount': 'amount', 'paid_amount': 'paid_amount', 'status': 'status',
+    }
 
     def get_queryset(self):
         queryset = Invoice.objects.all().order_by('-created_at')
@@ -54,18 +54,22 @@ fi
 echo "📥 Descargando última imagen de Docker Hub..."
 $COMPOSE_CMD pull web
 
+# Ejecutar migraciones con la nueva imagen, una sola vez, antes de reemplazar web
+wait_for_db
+echo "📊 Ejecutando migraciones..."
+$COMPOSE_CMD run --rm migrate
+
 # Recrear solo el contenedor web (sin downtime de la DB)
 echo "🔄 Recreando contenedor web..."
 $COMPOSE_CMD up -d --force-recreate --no-deps web
 
+# Recrear el worker de reportes con la nueva imagen (termina los trabajos en curso)
+echo "🔄 Recreando worker de reportes..."
+$COMPOSE_CMD up -d --force-recreate --no-deps report-worker
+
 # Esperar a que todo esté listo
-wait_for_db
 wait_for_django
 
-# Ejecutar migraciones
-echo "📊 Ejecutando migraciones..."
-$COMPOSE_CMD exec -T web python manage.py migrate
-
 # Cargar datos iniciales (solo si la DB está vacía)
 echo "📦 Verificando datos iniciales..."
 $COMPOSE_CMD exec -T web python manage.py load_initial_data || true
@@ -80,10 +84,6 @@ for user in User.objects.all():
     print(f'Contraseña actualizada para {user.email}')
 " || true
 
-# Recolectar archivos estáticos
-echo "📁 Recolectando archivos estáticos..."
-$COMPOSE_CMD exec -T web python manage.py collectstatic --noinput || true
-
 # Verificar estado de los servicios
 echo "📊 Estado de los servicios:"
 $COMPOSE_CMD ps
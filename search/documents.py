@@ -0,0 +1,129 @@
+"""
+Search documents
+
+Every product, customer, supplier, sale order, invoice and purchase
+invoice has a row in ``SearchDocument`` with its text already normalized
+(lowercase words without accents), so one indexed table answers searches
+across all of them. Rows are written after the transaction that saved or
+deleted the source commits (``search.signals``), and only when one of the
+indexed fields changed. Bulk inserts skip the signals: run
+``manage.py rebuild_search_index`` after them.
+"""
+import re
+import unicodedata
+from collections import namedtuple
+
+from django.apps import apps as global_apps
+from django.db import transaction
+
+from inventory.models import Product
+from purchases.models import PurchaseInvoice, Supplier
+from sales.models import Customer, Invoice, SaleOrder
+from .models import SearchDocument
+
+# kind: model, indexed fields (attnames) and the function building the document
+Source = namedtuple('Source', 'model fields build')
+
+WORD = re.compile(r'[a-z0-9]+')
+DOCUMENT_FIELDS = ('title', 'subtitle', 'code', 'title_terms', 'terms')
+
+
+def words(*values):
+    """Lowercase words of ``values`` without accents (``"Café-2"`` -> ``['cafe', '2']``)"""
+    text = ' '.join(str(value) for value in values if value)
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower()
+    return WORD.findall(text)
+
+
+def normalize_code(value):
+    return re.sub(r'\s+', '', str(value or '')).upper()
+
+
+def _document(title, subtitle='', code='', extra=()):
+    return {
+        'title': title[:255],
+        'subtitle': (subtitle or '')[:255],
+        'code': normalize_code(code)[:50],
+        'title_terms': ' '.join(words(title)),
+        'terms': ' '.join(words(subtitle, code, *extra)),
+    }
+
+
+SOURCES = {
+    'product': Source(
+        Product, ('name', 'sku', 'description'),
+        lambda product: _document(product.name, product.sku, product.sku, [product.description]),
+    ),
+    'customer': Source(
+        Customer, ('name', 'email', 'phone'),
+        lambda customer: _document(customer.name, customer.email, extra=[customer.phone]),
+    ),
+    'supplier': Source(
+        Supplier, ('name', 'email', 'phone', 'contact_person'),
+        lambda supplier: _document(
+            supplier.name, supplier.email, extra=[supplier.phone, supplier.contact_person]
+        ),
+    ),
+    'sale_order': Source(
+        SaleOrder, ('order_number', 'order_date'),
+        lambda order: _document(order.order_number, str(order.order_date), order.order_number),
+    ),
+    'invoice': Source(
+        Invoice, ('invoice_number', 'invoice_date'),
+        lambda invoice: _document(invoice.invoice_number, str(invoice.invoice_date), invoice.invoice_number),
+    ),
+    'purchase_invoice': Source(
+        PurchaseInvoice, ('invoice_number', 'invoice_date'),
+        lambda invoice: _document(invoice.invoice_number, str(invoice.invoice_date), invoice.invoice_number),
+    ),
+}
+
+
+def write(kind, object_id, document):
+    """Insert or update the document of ``kind`` ``object_id`` (one query)"""
+    SearchDocument.objects.bulk_create(
+        [SearchDocument(kind=kind, object_id=object_id, **document)],
+        update_conflicts=True, unique_fields=['kind', 'object_id'],
+        update_fields=[*DOCUMENT_FIELDS, 'updated_at'],
+    )
+    _changed()
+
+
+def delete(kind, object_id):
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+    _changed()
+
+
+def _changed():
+    # The engine imports this module
+    from .engine import memory_index
+    memory_index.invalidate()
+
+
+def index_on_commit(kind, instance):
+    object_id, document = instance.pk, SOURCES[kind].build(instance)
+    transaction.on_commit(lambda: write(kind, object_id, document))
+
+
+def delete_on_commit(kind, object_id):
+    transaction.on_commit(lambda: delete(kind, object_id))
+
+
+def rebuild(apps=global_apps, batch_size=2000):
+    """Recreate every document from the source tables; returns rows per kind"""
+    document_model = apps.get_model('search', 'SearchDocument')
+    written = {}
+    with transaction.atomic():
+        document_model.objects.all().delete()
+        for kind, source in SOURCES.items():
+            model = apps.get_model(source.model._meta.label)
+            queryset = model.objects.only('pk', *source.fields).order_by('pk')
+            written[kind] = 0
+            batch = []
+            for instance in queryset.iterator(chunk_size=batch_size):
+                batch.append(document_model(kind=kind, object_id=instance.pk, **source.build(instance)))
+                if len(batch) == batch_size:
+                    written[kind] += len(document_model.objects.bulk_create(batch))
+                    batch = []
+            written[kind] += len(document_model.objects.bulk_create(batch))
+    return written
@@ -0,0 +1,181 @@
+"""
+Search engine
+
+``search(query)`` returns the best matching documents of every kind in
+one ranked list. Each word of the query must match the beginning of a word
+of the document (``"lap pro"`` finds "Laptop Pro 15"), and a query that is
+the beginning of a SKU or document number ranks that document first, so
+partial barcode scans work.
+
+- PostgreSQL: one query on ``search_documents`` served by a GIN index on
+  the weighted ``tsvector`` (title words weigh more) and a pattern index
+  on ``code``, ranked with ``ts_rank``.
+- Other databases: an inverted index kept in process memory (word ->
+  documents, with a sorted word list for prefixes), loaded from
+  ``search_documents`` on the first search and refreshed with the rows
+  changed since, spotted with a ``MAX(updated_at)``/``COUNT(*)`` query.
+  Documents written by this process refresh it on the next search; those
+  written by other processes within ``REFRESH_INTERVAL`` seconds. Meant
+  for development on SQLite: each process keeps its own copy.
+"""
+import bisect
+import heapq
+import threading
+import time
+from collections import namedtuple
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections, router
+from django.db.models import Case, Count, F, FloatField, Max, Q, Value, When
+
+from .documents import normalize_code, words
+from .models import SearchDocument
+
+Hit = namedtuple('Hit', 'kind object_id title subtitle code score')
+
+# ts_rank's default weights of the title (A) and other (B) words
+TITLE_WEIGHT = 1.0
+TERM_WEIGHT = 0.4
+# Added to the score of documents whose code is the query, or starts with it
+CODE_EXACT_BONUS = 2.0
+CODE_PREFIX_BONUS = 1.0
+# Seconds between checks for documents written by other processes
+REFRESH_INTERVAL = 2.0
+
+HIT_FIELDS = ('kind', 'object_id', 'title', 'subtitle', 'code')
+
+
+def search(query, kinds=None, limit=20):
+    """Ranked ``Hit`` list for ``query``, optionally only of ``kinds``"""
+    tokens = words(query)
+    code = normalize_code(query)
+    if not tokens and not code:
+        return []
+    if connections[router.db_for_read(SearchDocument)].vendor == 'postgresql':
+        return _postgresql_search(tokens, code, kinds, limit)
+    return memory_index.search(tokens, code, kinds, limit)
+
+
+def _postgresql_search(tokens, code, kinds, limit):
+    matches = Q(code__startswith=code) if code else Q()
+    score = Case(
+        When(code=code, then=Value(CODE_EXACT_BONUS)),
+        When(code__startswith=code, then=Value(CODE_PREFIX_BONUS)),
+        default=Value(0.0), output_field=FloatField(),
+    ) if code else Value(0.0)
+    if tokens:
+        # Words are [a-z0-9]+ (documents.words), safe to pass as a raw tsquery
+        query = SearchQuery(' & '.join(f'{token}:*' for token in tokens), search_type='raw', config='simple')
+        matches |= Q(search_vector=query)
+        score = score + SearchRank(F('search_vector'), query)
+    documents = SearchDocument.objects.filter(matches)
+    if kinds:
+        documents = documents.filter(kind__in=kinds)
+    documents = documents.annotate(score=score).order_by('-score', 'kind', 'object_id')
+    return [Hit(*row) for row in documents.values_list(*HIT_FIELDS, 'score')[:limit]]
+
+
+class InvertedIndex:
+    """Word -> documents index of ``search_documents`` in process memory"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.documents = {}  # pk -> (kind, object_id, title, subtitle, code, words)
+        self.postings = {}  # word -> {pk: weight}
+        self.words = []  # sorted, for prefix lookups
+        self.codes = {}  # code -> pks
+        self.sorted_codes = []
+        self._mark = None  # (MAX(updated_at), COUNT(*)) the index reflects
+        self._checked = None  # time.monotonic() of the last check
+        self._dirty = False
+
+    def invalidate(self):
+        """Check for changes on the next search (documents were written)"""
+        self._checked = None
+
+    def refresh(self):
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < REFRESH_INTERVAL:
+            return
+        self._checked = now
+        mark = SearchDocument.objects.aggregate(updated=Max('updated_at'), count=Count('pk'))
+        mark = (mark['updated'], mark['count'])
+        if mark == self._mark:
+            return
+        changed = SearchDocument.objects.all()
+        if self._mark is not None and self._mark[0] is not None:
+            # Rows saved in the same instant as the last one seen come again
+            changed = changed.filter(updated_at__gte=self._mark[0])
+        for row in changed.values_list('pk', *HIT_FIELDS, 'title_terms', 'terms').iterator():
+            self._add(*row)
+        if len(self.documents) != mark[1]:
+            # Documents were deleted: load everything again
+            self.clear()
+            for row in SearchDocument.objects.values_list('pk', *HIT_FIELDS, 'title_terms', 'terms').iterator():
+                self._add(*row)
+        if self._dirty:
+            self.words = sorted(self.postings)
+            self.codes = {}
+            for pk, document in self.documents.items():
+                if document[4]:
+                    self.codes.setdefault(document[4], []).append(pk)
+            self.sorted_codes = sorted(self.codes)
+            self._dirty = False
+        self._mark = mark
+
+    def _add(self, pk, kind, object_id, title, subtitle, code, title_terms, terms):
+        if pk in self.documents:
+            for word in self.documents[pk][5]:
+                self.postings[word].pop(pk, None)
+                if not self.postings[word]:
+                    del self.postings[word]
+        weights = {}
+        for word in terms.split():
+            weights[word] = TERM_WEIGHT
+        for word in title_terms.split():
+            weights[word] = TITLE_WEIGHT
+        for word, weight in weights.items():
+            self.postings.setdefault(word, {})[pk] = weight
+        self.documents[pk] = (kind, object_id, title, subtitle, code, tuple(weights))
+        self._dirty = True
+
+    @staticmethod
+    def _prefixed(sorted_values, prefix):
+        position = bisect.bisect_left(sorted_values, prefix)
+        while position < len(sorted_values) and sorted_values[position].startswith(prefix):
+            yield sorted_values[position]
+            position += 1
+
+    def search(self, tokens, code, kinds=None, limit=20):
+        with self._lock:
+            self.refresh()
+            scores = None
+            for token in tokens:
+                # Every word of the query must match (best weight of its prefixed words)
+                token_scores = {}
+                for word in self._prefixed(self.words, token):
+                    for pk, weight in self.postings[word].items():
+                        token_scores[pk] = max(token_scores.get(pk, 0.0), weight)
+                scores = token_scores if scores is None else {
+                    pk: score + token_scores[pk] for pk, score in scores.items() if pk in token_scores
+                }
+            scores = scores or {}
+            if code:
+                for document_code in self._prefixed(self.sorted_codes, code):
+                    bonus = CODE_EXACT_BONUS if document_code == code else CODE_PREFIX_BONUS
+                    for pk in self.codes[document_code]:
+                        scores[pk] = scores.get(pk, 0.0) + bonus
+            if kinds:
+                scores = {pk: score for pk, score in scores.items() if self.documents[pk][0] in kinds}
+            # Broad prefixes match many documents: only order the best ``limit``
+            best = heapq.nsmallest(
+                limit, scores.items(),
+                key=lambda item: (-item[1], self.documents[item[0]][0], self.documents[item[0]][1]),
+            )
+            return [Hit(*self.documents[pk][:5], score) for pk, score in best]
+
+
+memory_index = InvertedIndex()
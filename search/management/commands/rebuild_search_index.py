@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from search import documents
+from search.engine import memory_index
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el índice de búsqueda de productos, socios y documentos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Cantidad de documentos por INSERT al reconstruir',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('🔄 Reconstruyendo índice de búsqueda...'))
+        written = documents.rebuild(batch_size=options['batch_size'])
+        memory_index.clear()
+        for kind, count in written.items():
+            self.stdout.write(f'   - {kind}: {count} documentos')
+        self.stdout.write(self.style.SUCCESS('🎉 Índice de búsqueda reconstruido exitosamente!'))
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:26
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Product'), ('customer', 'Customer'), ('supplier', 'Supplier'), ('sale_order', 'Sale order'), ('invoice', 'Invoice'), ('purchase_invoice', 'Purchase invoice')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('subtitle', models.CharField(blank=True, max_length=255)),
+                ('code', models.CharField(blank=True, max_length=50)),
+                ('title_terms', models.TextField(blank=True)),
+                ('terms', models.TextField(blank=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'search_documents',
+                'indexes': [models.Index(fields=['updated_at'], name='search_doc_updated_idx')],
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+# Keeps search_vector current on every INSERT and UPDATE, bulk ones included
+CREATE_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION search_documents_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', COALESCE(NEW.title_terms, '')), 'A') ||
+            setweight(to_tsvector('simple', COALESCE(NEW.terms, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER search_documents_vector BEFORE INSERT OR UPDATE ON search_documents
+    FOR EACH ROW EXECUTE FUNCTION search_documents_vector()
+    """,
+    'CREATE INDEX IF NOT EXISTS search_doc_vector_idx ON search_documents USING gin (search_vector)',
+    # code LIKE 'PREFIX%' whatever the database collation
+    'CREATE INDEX IF NOT EXISTS search_doc_code_idx ON search_documents (code varchar_pattern_ops)',
+]
+
+DROP_SQL = [
+    'DROP INDEX IF EXISTS search_doc_code_idx',
+    'DROP INDEX IF EXISTS search_doc_vector_idx',
+    'DROP TRIGGER IF EXISTS search_documents_vector ON search_documents',
+    'DROP FUNCTION IF EXISTS search_documents_vector()',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # Other databases use the in-process index (search/engine.py)
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
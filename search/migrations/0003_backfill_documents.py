@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def backfill_documents(apps, schema_editor):
+    from search.documents import rebuild
+    rebuild(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_postgresql_search'),
+        ('inventory', '0007_category_category_updated_idx_and_more'),
+        ('sales', '0006_customer_customer_updated_idx'),
+        ('purchases', '0005_supplier_supplier_updated_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
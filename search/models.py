@@ -0,0 +1,40 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    Searchable text of a product, partner or document (see search/documents.py)
+    """
+    KIND_CHOICES = [
+        ('product', 'Product'),
+        ('customer', 'Customer'),
+        ('supplier', 'Supplier'),
+        ('sale_order', 'Sale order'),
+        ('invoice', 'Invoice'),
+        ('purchase_invoice', 'Purchase invoice'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255)
+    subtitle = models.CharField(max_length=255, blank=True)
+    # Normalized SKU or document number, prefix matched (barcode scanners)
+    code = models.CharField(max_length=50, blank=True)
+    # Normalized words: the title's weigh more in the ranking
+    title_terms = models.TextField(blank=True)
+    terms = models.TextField(blank=True)
+    # PostgreSQL only, filled by a trigger from title_terms and terms
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'search_documents'
+        unique_together = ['kind', 'object_id']
+        indexes = [
+            # Changes picked up by the in-process index (search/engine.py)
+            models.Index(fields=['updated_at'], name='search_doc_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
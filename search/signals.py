@@ -0,0 +1,35 @@
+"""
+Signal handlers keeping the search documents current
+"""
+from django.db.models.signals import post_delete, post_save
+
+from core.tracking import FieldTracker
+from . import documents
+
+trackers = {}
+
+
+def _saved(kind):
+    tracker = trackers[kind]
+
+    def handler(sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        # Saves that don't touch the indexed fields (totals, status...) cost nothing
+        if created or tracker.previous(instance) != tracker.current(instance):
+            documents.index_on_commit(kind, instance)
+        tracker.commit(instance)
+    return handler
+
+
+def _deleted(kind):
+    def handler(sender, instance, **kwargs):
+        documents.delete_on_commit(kind, instance.pk)
+    return handler
+
+
+for kind, source in documents.SOURCES.items():
+    trackers[kind] = FieldTracker('search', source.fields)
+    trackers[kind].connect(source.model)
+    post_save.connect(_saved(kind), sender=source.model, weak=False, dispatch_uid=f'search_save_{kind}')
+    post_delete.connect(_deleted(kind), sender=source.model, weak=False, dispatch_uid=f'search_delete_{kind}')
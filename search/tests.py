@@ -0,0 +1,148 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.models import User
+from inventory.models import Product
+from sales.models import Customer
+from purchases.models import Supplier
+from .documents import normalize_code, words
+from .engine import memory_index
+from .models import SearchDocument
+
+
+class SearchTest(TestCase):
+    """Tests para la búsqueda global de productos, socios y documentos"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        memory_index.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(
+                name="Laptop Pro 15",
+                sku="LAP-001",
+                description="Portátil de aluminio",
+                price=Decimal('1500.00'),
+                created_by=self.user
+            )
+            self.customer = Customer.objects.create(name="Laptop Repairs Inc", email="info@repairs.com")
+            self.supplier = Supplier.objects.create(
+                name="Distribuidora Café Norte",
+                email="ventas@cafenorte.com",
+                phone="+1234567890",
+                address="Dirección",
+                contact_person="Ana Pérez"
+            )
+
+    def search(self, query, **params):
+        return self.client.get(reverse('search'), {'q': query, **params})
+
+    def test_normalization(self):
+        """Test que las palabras y códigos se normalizan sin acentos ni mayúsculas"""
+        self.assertEqual(words('Café-Norte 2', None), ['cafe', 'norte', '2'])
+        self.assertEqual(normalize_code(' lap 001 '), 'LAP001')
+
+    def test_documents_follow_signals(self):
+        """Test que los documentos se crean, actualizan y eliminan al guardar los modelos"""
+        document = SearchDocument.objects.get(kind='product', object_id=self.product.pk)
+        self.assertEqual(document.code, 'LAP-001')
+        self.assertEqual(document.title_terms, 'laptop pro 15')
+        self.assertIn('portatil', document.terms)
+
+        # Fields that aren't indexed don't rewrite the document
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock_quantity = 5
+            self.product.save()
+        self.assertEqual(
+            SearchDocument.objects.get(pk=document.pk).updated_at, document.updated_at
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = "Notebook Air"
+            self.product.save()
+        document.refresh_from_db()
+        self.assertEqual(document.title_terms, 'notebook air')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer.delete()
+        self.assertFalse(SearchDocument.objects.filter(kind='customer').exists())
+
+    def test_search_ranks_code_matches_first(self):
+        """Test que un prefijo de SKU ubica primero al producto"""
+        response = self.search('lap')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        first, second = response.data['results']
+        self.assertEqual((first['type'], first['id']), ('product', self.product.pk))
+        self.assertEqual((second['type'], second['id']), ('customer', self.customer.pk))
+        self.assertGreater(first['score'], second['score'])
+        self.assertTrue(first['url'].endswith(reverse('product-detail', args=[self.product.pk])))
+
+        # Partial scan of the SKU
+        response = self.search('LAP-00')
+        self.assertEqual([hit['id'] for hit in response.data['results']], [self.product.pk])
+
+    def test_search_requires_every_word(self):
+        """Test que todas las palabras de la consulta deben coincidir, sin acentos"""
+        response = self.search('cafe nor')
+        self.assertEqual(
+            [(hit['type'], hit['id']) for hit in response.data['results']],
+            [('supplier', self.supplier.pk)]
+        )
+
+        response = self.search('laptop repairs')
+        self.assertEqual([hit['type'] for hit in response.data['results']], ['customer'])
+
+        response = self.search('laptop zzz')
+        self.assertEqual(response.data['count'], 0)
+
+    def test_search_types_and_validation(self):
+        """Test que ?types filtra los resultados y los parámetros inválidos devuelven 400"""
+        response = self.search('laptop', types='customer')
+        self.assertEqual([hit['type'] for hit in response.data['results']], ['customer'])
+
+        self.assertEqual(self.search('l').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search('laptop', types='unknown').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search('laptop', limit='x').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_memory_index_picks_up_changes(self):
+        """Test que el índice en memoria refleja cambios y eliminaciones entre búsquedas"""
+        self.assertEqual(self.search('laptop').data['count'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = "Notebook Air"
+            self.product.save()
+        self.assertEqual(self.search('laptop').data['count'], 1)
+        self.assertEqual(self.search('notebook').data['results'][0]['id'], self.product.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer.delete()
+        self.assertEqual(self.search('laptop').data['count'], 0)
+
+    def test_rebuild_command(self):
+        """Test que el comando reconstruye los documentos de todos los modelos"""
+        SearchDocument.objects.all().delete()
+        out = StringIO()
+
+        call_command('rebuild_search_index', stdout=out)
+
+        self.assertEqual(SearchDocument.objects.count(), 3)
+        self.assertIn('product: 1 documentos', out.getvalue())
+        self.assertEqual(self.search('LAP-001').data['results'][0]['id'], self.product.pk)
+
+    def test_search_requires_authentication(self):
+        """Test que la búsqueda requiere autenticación"""
+        response = APIClient().get(reverse('search'), {'q': 'laptop'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
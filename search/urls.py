@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import SearchViewSet
+
+urlpatterns = [
+    path('', SearchViewSet.as_view({'get': 'list'}), name='search'),
+]
@@ -0,0 +1,68 @@
+from django.urls import reverse
+from rest_framework import viewsets, status, permissions
+from rest_framework.response import Response
+
+from . import engine
+from .models import SearchDocument
+
+MIN_QUERY_LENGTH = 2
+MAX_LIMIT = 100
+
+# Detail endpoint of each kind of result
+DETAIL_ROUTES = {
+    'product': 'product-detail',
+    'customer': 'customer-detail',
+    'supplier': 'supplier-detail',
+    'sale_order': 'saleorder-detail',
+    'invoice': 'invoice-detail',
+    'purchase_invoice': 'purchaseinvoice-detail',
+}
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """
+    Search products, customers, suppliers and document numbers at once
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        """
+        Ranked results for ?q= (optional ?types=product,customer,... and ?limit=)
+        """
+        query = request.query_params.get('q', '').strip()
+        if len(query) < MIN_QUERY_LENGTH:
+            return Response(
+                {'error': f'q must have at least {MIN_QUERY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        kinds = [kind for kind in request.query_params.get('types', '').split(',') if kind]
+        valid_kinds = [kind for kind, _ in SearchDocument.KIND_CHOICES]
+        unknown = sorted(set(kinds) - set(valid_kinds))
+        if unknown:
+            return Response(
+                {'error': f"Unknown types: {', '.join(unknown)}. Available: {', '.join(valid_kinds)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+        hits = engine.search(query, kinds=kinds, limit=limit)
+        return Response({
+            'query': query,
+            'count': len(hits),
+            'results': [
+                {
+                    'type': hit.kind,
+                    'id': hit.object_id,
+                    'title': hit.title,
+                    'subtitle': hit.subtitle,
+                    'code': hit.code,
+                    'score': round(hit.score, 4),
+                    'url': request.build_absolute_uri(reverse(DETAIL_ROUTES[hit.kind], args=[hit.object_id])),
+                } for hit in hits
+            ]
+        })
@@ -15,7 +15,9 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         from users.models import Role, User
+        from inventory import counters as category_counters
         from inventory.models import Category
+        from search import documents as search_documents
 
         self.stdout.write(self.style.WARNING('🔍 Verificando datos iniciales...'))
 
@@ -58,6 +60,11 @@ class Command(BaseCommand):
                         self.stdout.write(self.style.SUCCESS(f'   ✅ Cargado: {fixture}'))
                     except Exception as e:
                         self.stdout.write(self.style.WARNING(f'   ⚠️  No se pudo cargar {fixture}: {str(e)}'))
+
+                # loaddata skips the signals that maintain these
+                category_counters.rebuild()
+                search_documents.rebuild()
+                self.stdout.write(self.style.SUCCESS('   ✅ Contadores de categorías e índice de búsqueda actualizados'))
                 
                 self.stdout.write(self.style.SUCCESS('🎉 Datos iniciales cargados exitosamente!'))
         
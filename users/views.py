@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from core.query_plans import QueryPlanMixin
 from .models import User, Role
 from .serializers import (
     UserSerializer, UserCreateSerializer, RoleSerializer,
@@ -22,7 +23,7 @@ class RoleViewSet(viewsets.ModelViewSet):
         return Role.objects.all().order_by('name')
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing users
     """